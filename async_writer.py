@@ -0,0 +1,308 @@
+#This script moves image saves and video frame writes off the capture thread onto a background writer
+import queue
+import threading
+import time
+
+import cv2
+
+from frame_index import open_video_writer, set_avi_frame_rate
+
+class FPSMeter:
+    """
+    Measures the actual capture rate from the time between frames, smoothed with an exponential moving average.
+    """
+    def __init__(self, smoothing=0.1):
+        """
+        Args:
+            smoothing (float): Weight of the newest frame interval in the average.
+        """
+        self.smoothing = smoothing
+        self.interval = None
+        self._last_time = None
+
+    def tick(self):
+        """Marks the arrival of a frame."""
+        now = time.perf_counter()
+        if self._last_time is not None:
+            interval = now - self._last_time
+            if self.interval is None:
+                self.interval = interval
+            else:
+                self.interval += self.smoothing * (interval - self.interval)
+        self._last_time = now
+
+    def fps(self, default=20.0):
+        """Returns the measured FPS, or the default before two frames have been seen."""
+        if not self.interval:
+            return default
+        return 1.0 / self.interval
+
+class AsyncWriter:
+    """
+    Background writer with a bounded queue for image saves and video frames.
+
+    When the queue is full, put operations either wait (block=True) or drop the item and count it,
+    so a slow disk applies backpressure or loses frames instead of stalling capture unexpectedly.
+
+    A failed write never stops the writer thread: the error is recorded in self.errors and
+    returned by close(). Frames sent to a video that could not be opened are refused.
+
+    A video can be given a sink, any object with write(frame, timestamp) and close() methods,
+    which receives every frame after it is written. Sinks run on the writer thread, so slow
+    per-frame work such as landmark tracking should only be queued there and run on a thread of
+    its own (see dataset_collect.LandmarkRecorder), or it delays every following write.
+    """
+    def __init__(self, max_queue=64, block=False):
+        """
+        Starts the writer thread.
+
+        Args:
+            max_queue (int): Maximum number of pending writes.
+            block (bool): If True, callers wait when the queue is full. If False, the write is
+                dropped and counted instead.
+        """
+        self.block = block
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._video_writer = None
+        self._video_failed = False
+        self._video_path = None
+        self._video_sink = None
+        self._video_frames = 0
+        self._video_times = [None, None]
+        self._lock = threading.Lock()
+
+        self.images_written = 0
+        self.frames_written = 0
+        self.images_dropped = 0
+        self.frames_dropped = 0
+        self.frames_failed = 0
+        self.max_queue_depth = 0
+        self.errors = []
+
+        self._thread = threading.Thread(target=self._run, name="AsyncWriter", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Queues an item, applying the blocking or dropping policy. Returns True if queued."""
+        try:
+            self._queue.put(item, block=self.block)
+        except queue.Full:
+            return False
+
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def save_image(self, path, frame):
+        """
+        Queues an image to be saved.
+
+        Args:
+            path (str): Output path of the image.
+            frame (numpy.ndarray): The image. It must not be modified after this call.
+
+        Returns:
+            bool: True if the image was queued, False if it was dropped.
+        """
+        if self._put(("image", path, frame)):
+            return True
+        with self._lock:
+            self.images_dropped += 1
+        return False
+
+    def open_video(self, path, fps, frame_size, fourcc="XVID", keyframe_interval=None, sink=None):
+        """
+        Queues the opening of a new video file. Frames written afterwards go to this file.
+
+        Args:
+            path (str): Output path of the video.
+            fps (float): Frame rate stamped into the file. For AVI files, it is replaced by the
+                rate measured from the frame timestamps when the video is closed.
+            frame_size (tuple): Frame size (width, height).
+            fourcc (str): Four-character codec code.
+            keyframe_interval (int): Optional maximum distance between keyframes, see
+                frame_index.open_video_writer.
+            sink: Optional object whose write(frame, timestamp) is called on the writer thread
+                for every written frame, and close() when the video is closed.
+        """
+        # Control messages are never dropped
+        self._queue.put(("open", path, (fps, frame_size, fourcc, keyframe_interval, sink)))
+
+    def write_frame(self, frame, timestamp=None):
+        """
+        Queues a frame for the open video.
+
+        Args:
+            frame (numpy.ndarray): The frame. It must not be modified after this call.
+            timestamp (float): Optional capture time in seconds, passed to the sink and used to
+                measure the real frame rate of the recording.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped or the video could not
+                be opened.
+        """
+        if self._video_failed:
+            with self._lock:
+                self.frames_failed += 1
+            return False
+        if self._put(("frame", None, (frame, timestamp))):
+            return True
+        with self._lock:
+            self.frames_dropped += 1
+        return False
+
+    def close_video(self):
+        """Queues the closing of the open video."""
+        self._queue.put(("close", None, None))
+
+    def _run(self):
+        """Performs the queued writes in order until close() is called."""
+        while True:
+            kind, path, payload = self._queue.get()
+            try:
+                if kind == "stop":
+                    self._release_video()
+                    return
+                self._handle(kind, path, payload)
+            except Exception as e:
+                self._record_error(kind, path, e)
+                if kind == "open":
+                    self._video_writer = None
+                    self._video_failed = True
+            finally:
+                self._queue.task_done()
+
+    def _handle(self, kind, path, payload):
+        """Performs one queued write."""
+        if kind == "image":
+            if not cv2.imwrite(path, payload):
+                raise IOError("cv2.imwrite failed")
+            with self._lock:
+                self.images_written += 1
+        elif kind == "frame":
+            if self._video_writer is None:
+                with self._lock:
+                    self.frames_failed += 1
+                return
+            frame, timestamp = payload
+            self._video_writer.write(frame)
+            self._video_frames += 1
+            if timestamp is not None:
+                if self._video_times[0] is None:
+                    self._video_times[0] = timestamp
+                self._video_times[1] = timestamp
+            with self._lock:
+                self.frames_written += 1
+            if self._video_sink is not None:
+                self._video_sink.write(frame, timestamp)
+        elif kind == "open":
+            self._release_video()
+            self._video_failed = False
+            fps, frame_size, fourcc, keyframe_interval, sink = payload
+            video_writer = open_video_writer(path, fps, frame_size, fourcc, keyframe_interval)
+            if not video_writer.isOpened():
+                raise IOError("could not open the video writer")
+            self._video_writer = video_writer
+            self._video_path = path
+            self._video_sink = sink
+            self._video_frames = 0
+            self._video_times = [None, None]
+        elif kind == "close":
+            self._release_video()
+
+    def _record_error(self, kind, path, error):
+        with self._lock:
+            self.errors.append((kind, path, str(error).strip()))
+        print(f"Error: Writer failed on {kind} {path or ''}: {str(error).strip()}")
+
+    def _release_video(self):
+        """Closes the open video, stamps its measured frame rate and closes its sink."""
+        if self._video_writer is None:
+            return
+
+        video_writer, self._video_writer = self._video_writer, None
+        sink, self._video_sink = self._video_sink, None
+        try:
+            video_writer.release()
+            first, last = self._video_times
+            if self._video_frames > 1 and first is not None and last > first and self._video_path.lower().endswith(".avi"):
+                set_avi_frame_rate(self._video_path, (self._video_frames - 1) / (last - first))
+        except Exception as e:
+            self._record_error("close", self._video_path, e)
+
+        if sink is not None:
+            try:
+                sink.close()
+            except Exception as e:
+                self._record_error("sink", self._video_path, e)
+
+    def flush(self):
+        """Waits until every queued write has been performed."""
+        self._queue.join()
+
+    def stats(self):
+        """
+        Returns the writer counters.
+
+        Returns:
+            dict: Written, dropped and failed images and frames, the number of errors, and the
+                current and maximum queue depth.
+        """
+        with self._lock:
+            return {
+                "images_written": self.images_written,
+                "images_dropped": self.images_dropped,
+                "frames_written": self.frames_written,
+                "frames_dropped": self.frames_dropped,
+                "frames_failed": self.frames_failed,
+                "errors": len(self.errors),
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    def close(self):
+        """
+        Finishes all queued writes and stops the writer thread.
+
+        Returns:
+            list: (kind, path, message) of every write that failed.
+        """
+        if self._thread.is_alive():
+            self._queue.put(("stop", None, None))
+            self._thread.join()
+        with self._lock:
+            return list(self.errors)
+
+if __name__ == "__main__":
+    import sys
+
+    # Headless example: re-record a video file through the writer, with backpressure instead of drops
+    if len(sys.argv) < 3:
+        print("Usage: python async_writer.py <input_video> <output_video>")
+        exit()
+
+    cap = cv2.VideoCapture(sys.argv[1])
+    if not cap.isOpened():
+        print("Error: Could not open the video file.")
+        exit()
+
+    writer = AsyncWriter(max_queue=32, block=True)
+    meter = FPSMeter()
+    started = False
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        meter.tick()
+
+        if not started:
+            writer.open_video(sys.argv[2], cap.get(cv2.CAP_PROP_FPS) or meter.fps(), (frame.shape[1], frame.shape[0]))
+            started = True
+        writer.write_frame(frame)
+
+    writer.close_video()
+    writer.close()
+    cap.release()
+    print(f"Capture rate: {meter.fps():.1f} FPS, writer stats: {writer.stats()}")
@@ -0,0 +1,226 @@
+#This script yields augmented batches from the split dataset on demand instead of writing augmented copies to disk
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from data_augmentation import ClipAugmenter, build_transform, file_seed, init_worker, seed_transform, worker_transform
+from frame_index import IndexedVideoReader
+from landmark_utils import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+from video_capndpre import reduced_read_flag
+
+def sample_seed(seed, epoch, relative_path):
+    """
+    Derives the seed of one sample in one epoch. It depends only on the base seed, the epoch and
+    the file, so the augmentation stream is the same for any number of workers.
+    """
+    return file_seed(seed, f"{epoch}:{relative_path}")
+
+def load_image(file_path, image_size, transform):
+    """
+    Reads, resizes and augments one image.
+
+    Returns:
+        numpy.ndarray: (height, width, 3) uint8 image, or None if the file cannot be read.
+    """
+    image = cv2.imread(file_path, reduced_read_flag(file_path, image_size))
+    if image is None:
+        print(f"Warning: Failed to read image {file_path}")
+        return None
+    image = cv2.resize(image, image_size, interpolation=cv2.INTER_AREA)
+    return transform(image=image)["image"]
+
+def load_clip(file_path, image_size, transform, clip_length, rng):
+    """
+    Reads a random clip of consecutive frames from a video and augments it. The clip is reached
+    through the video's frame index, so only the frames since the closest keyframe are decoded.
+    The transform parameters are sampled on the first frame and replayed on the others.
+
+    Returns:
+        numpy.ndarray: (clip_length, height, width, 3) uint8 frames, or None if the file cannot
+            be read. Short videos are padded by repeating their last frame.
+    """
+    try:
+        reader = IndexedVideoReader(file_path)
+    except ValueError:
+        print(f"Warning: Failed to read video {file_path}")
+        return None
+
+    with reader:
+        start = rng.randint(0, len(reader) - clip_length) if len(reader) > clip_length else 0
+        frames = reader.read_window(start, clip_length)
+
+    clip = np.empty((clip_length, image_size[1], image_size[0], 3), dtype=np.uint8)
+    augment = ClipAugmenter(transform)
+    count = 0
+    for frame in frames:
+        clip[count] = augment(cv2.resize(frame, image_size, interpolation=cv2.INTER_AREA))
+        count += 1
+
+    if count == 0:
+        print(f"Warning: No frames could be read from {file_path}")
+        return None
+    clip[count:] = clip[count - 1]
+    return clip
+
+def load_batch(samples, epoch, seed, image_size, clip_length=None, transform=None):
+    """
+    Loads and augments one batch. Runs in a worker process or in the calling thread.
+
+    Args:
+        samples (list): (file path, relative path, label index) tuples.
+        epoch (int): Current epoch, part of every sample seed.
+        seed (int): Base seed, or None for unseeded augmentation.
+        image_size (tuple): Output size (width, height).
+        clip_length (int): Frames per video clip, or None to load images.
+        transform: Augmentation pipeline (default: the worker's pipeline).
+
+    Returns:
+        tuple: Stacked samples (uint8) and their label indices. Unreadable files are skipped.
+    """
+    if transform is None:
+        transform = worker_transform()
+
+    items, labels = [], []
+    for file_path, relative_path, label_index in samples:
+        rng = random.Random()
+        if seed is not None:
+            item_seed = sample_seed(seed, epoch, relative_path)
+            seed_transform(transform, item_seed)
+            rng.seed(item_seed)
+
+        if clip_length is None:
+            item = load_image(file_path, image_size, transform)
+        else:
+            item = load_clip(file_path, image_size, transform, clip_length, rng)
+        if item is not None:
+            items.append(item)
+            labels.append(label_index)
+
+    if not items:
+        shape = (0, image_size[1], image_size[0], 3) if clip_length is None else (0, clip_length, image_size[1], image_size[0], 3)
+        return np.zeros(shape, dtype=np.uint8), np.zeros(0, dtype=np.int64)
+    return np.stack(items), np.array(labels, dtype=np.int64)
+
+class AugmentedLoader:
+    """
+    Iterates over augmented batches of one split of the split dataset, augmenting every sample
+    on the fly with the pipeline from data_augmentation.build_transform.
+
+    Batches are prepared ahead by background worker processes. At most `prefetch` batches are
+    in flight at any time, which bounds memory use, and they are yielded in order so the same
+    seed reproduces the same stream regardless of which worker finishes first.
+    """
+    def __init__(self, split_dir="split_dataset", split="train", media="images", batch_size=32,
+                 image_size=(224, 224), clip_length=16, shuffle=True, seed=None, num_workers=2, prefetch=4):
+        """
+        Scans the split for files.
+
+        Args:
+            split_dir (str): Output directory of split_dataset.
+            split (str): "train", "val" or "test".
+            media (str): "images" for single images or "videos" for clips of frames.
+            batch_size (int): Number of samples per batch.
+            image_size (tuple): Output size (width, height) of every image or frame.
+            clip_length (int): Number of consecutive frames per video clip.
+            shuffle (bool): Whether the sample order changes every epoch.
+            seed (int): Seed of the shuffle and of the augmentations.
+            num_workers (int): Number of worker processes (0 loads batches in the calling thread).
+            prefetch (int): Maximum number of batches being prepared or waiting to be consumed.
+        """
+        if media not in ("images", "videos"):
+            raise ValueError(f"Invalid media '{media}'. Use 'images' or 'videos'.")
+
+        self.batch_size = batch_size
+        self.image_size = tuple(image_size)
+        self.clip_length = clip_length if media == "videos" else None
+        self.shuffle = shuffle
+        self.seed = seed
+        self.num_workers = num_workers
+        self.prefetch = max(1, prefetch)
+        self.epoch = 0
+
+        media_dir = os.path.join(split_dir, split, media)
+        extensions = IMAGE_EXTENSIONS if media == "images" else VIDEO_EXTENSIONS
+        self.labels = sorted(d for d in os.listdir(media_dir) if os.path.isdir(os.path.join(media_dir, d))) \
+            if os.path.isdir(media_dir) else []
+        self.samples = []
+        for label_index, label in enumerate(self.labels):
+            label_dir = os.path.join(media_dir, label)
+            for file_name in sorted(os.listdir(label_dir)):
+                if os.path.splitext(file_name)[1].lower() in extensions:
+                    self.samples.append((os.path.join(label_dir, file_name), f"{label}/{file_name}", label_index))
+
+        if not self.samples:
+            print(f"Warning: No {media} found in {media_dir}")
+
+        self._executor = None
+        self._transform = None
+
+    def __len__(self):
+        return (len(self.samples) + self.batch_size - 1) // self.batch_size
+
+    def _batches(self, epoch):
+        """Returns the sample batches of an epoch."""
+        order = list(range(len(self.samples)))
+        if self.shuffle:
+            random.Random(f"{self.seed}:{epoch}" if self.seed is not None else None).shuffle(order)
+        return [
+            [self.samples[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(order), self.batch_size)
+        ]
+
+    def __iter__(self):
+        """
+        Yields the (samples, labels) batches of one epoch. Each new iteration is a new epoch.
+        """
+        epoch = self.epoch
+        self.epoch += 1
+        batches = self._batches(epoch)
+        args = (epoch, self.seed, self.image_size, self.clip_length)
+
+        if self.num_workers <= 0:
+            if self._transform is None:
+                self._transform = build_transform()
+            for batch in batches:
+                yield load_batch(batch, *args, transform=self._transform)
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers, initializer=init_worker)
+
+        pending = deque()
+        try:
+            for batch in batches:
+                if len(pending) >= self.prefetch:
+                    yield pending.popleft().result()
+                pending.append(self._executor.submit(load_batch, batch, *args))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Batches left over by an interrupted epoch are discarded
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    # Example usage: two epochs of augmented training images
+    with AugmentedLoader(split_dir="split_dataset", split="train", batch_size=16, seed=42, num_workers=4) as loader:
+        print(f"{len(loader.samples)} images, {len(loader)} batches per epoch, labels: {loader.labels}")
+        for epoch in range(2):
+            for images, labels in loader:
+                print(f"Epoch {epoch}: batch {images.shape}, labels {labels.tolist()}")
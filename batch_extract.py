@@ -0,0 +1,220 @@
+#This script extracts hand landmarks from an existing split dataset using a pool of worker processes
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from landmark_utils import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, HandLandmarksUtil, extract_file_landmarks
+
+SPLITS = ["train", "val", "test"]
+MEDIA_TYPES = ["images", "videos"]
+
+# Detectors owned by each worker process, keyed by static_image_mode
+_worker_utils = {}
+_worker_settings = {}
+
+def find_split_files(dataset_dir):
+    """
+    Lists the media files of a split_dataset/{train,val,test}/{images,videos}/label tree.
+
+    Args:
+        dataset_dir (str): Root of the split dataset.
+
+    Returns:
+        list: (file_path, split, media_type, label) tuples.
+    """
+    files = []
+    for split in SPLITS:
+        for media_type in MEDIA_TYPES:
+            extensions = IMAGE_EXTENSIONS if media_type == "images" else VIDEO_EXTENSIONS
+            media_dir = os.path.join(dataset_dir, split, media_type)
+            if not os.path.isdir(media_dir):
+                continue
+
+            for label in sorted(os.listdir(media_dir)):
+                label_dir = os.path.join(media_dir, label)
+                if not os.path.isdir(label_dir):
+                    continue
+
+                for file_name in sorted(os.listdir(label_dir)):
+                    if os.path.splitext(file_name)[1].lower() in extensions:
+                        files.append((os.path.join(label_dir, file_name), split, media_type, label))
+    return files
+
+def _init_worker(settings):
+    """Stores the tracker settings; each worker builds its detectors on first use."""
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+    _worker_settings.update(settings)
+
+def _extract(file_path):
+    """
+    Extracts the landmarks of one file inside a worker.
+
+    Returns:
+        tuple: (file_path, points, handedness, scores, worker pid, seconds spent).
+    """
+    start_time = time.perf_counter()
+
+    static = os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
+    if static not in _worker_utils:
+        _worker_utils[static] = HandLandmarksUtil(static_image_mode=static, **_worker_settings)
+
+    points, handedness, scores = extract_file_landmarks(file_path, _worker_utils[static])
+    return file_path, points, handedness, scores, os.getpid(), time.perf_counter() - start_time
+
+def save_split_arrays(output_path, records):
+    """
+    Saves the landmarks of many files as one compact .npz archive.
+
+    The points of all files are concatenated along the frame axis; offsets[i]:offsets[i + 1]
+    selects the frames of file i.
+
+    Args:
+        output_path (str): Path of the .npz file to write.
+        records (list): (file_path, label, points, handedness, scores) tuples.
+    """
+    lengths = [len(points) for _, _, points, _, _ in records]
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    np.savez(
+        output_path,
+        points=np.concatenate([points for _, _, points, _, _ in records]),
+        handedness=np.concatenate([handedness for _, _, _, handedness, _ in records]),
+        scores=np.concatenate([scores for _, _, _, _, scores in records]),
+        offsets=offsets,
+        paths=np.array([file_path for file_path, _, _, _, _ in records]),
+        labels=np.array([label for _, label, _, _, _ in records]),
+    )
+
+def batch_extract(dataset_dir, output_dir="landmarks", num_workers=None, max_num_hands=2,
+                  min_detection_confidence=0.5, min_tracking_confidence=0.5, cache_dir=None):
+    """
+    Extracts the landmarks of every file in a split dataset with a pool of worker processes.
+
+    Images are processed in static image mode and videos in tracking mode. The results are saved
+    as one <split>_<media_type>.npz archive per split and media type.
+
+    Args:
+        dataset_dir (str): Root of the split dataset.
+        output_dir (str): Directory where the archives will be saved.
+        num_workers (int): Number of worker processes (default: number of CPUs).
+        max_num_hands (int): Maximum number of hands to detect.
+        min_detection_confidence (float): Minimum confidence for hand detection.
+        min_tracking_confidence (float): Minimum confidence for hand tracking in videos.
+        cache_dir (str): Optional LandmarkCache directory. Cached files are not re-extracted.
+
+    Returns:
+        dict: Throughput statistics and per-worker load.
+    """
+    if not os.path.exists(dataset_dir):
+        print(f"Error: Dataset directory not found at {dataset_dir}")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    num_workers = num_workers or os.cpu_count()
+    settings = {
+        "max_num_hands": max_num_hands,
+        "min_detection_confidence": min_detection_confidence,
+        "min_tracking_confidence": min_tracking_confidence,
+    }
+
+    files = find_split_files(dataset_dir)
+    landmarks = {}
+
+    cache = None
+    if cache_dir is not None:
+        from landmark_cache import LandmarkCache
+
+        cache = LandmarkCache(cache_dir, settings)
+        for file_path, _, _, _ in files:
+            cached = cache.get(file_path)
+            if cached is not None:
+                landmarks[file_path] = cached
+
+    # Largest files first so the pool does not end waiting on one long video
+    pending = sorted((file_path for file_path, _, _, _ in files if file_path not in landmarks),
+                     key=os.path.getsize, reverse=True)
+    print(f"Extracting landmarks from {len(pending)} files ({len(landmarks)} cached) with {num_workers} workers.")
+
+    worker_load = {}
+    frame_total = 0
+    start_time = time.perf_counter()
+
+    if pending:
+        with Pool(num_workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            for done, (file_path, points, handedness, scores, pid, seconds) in enumerate(
+                    pool.imap_unordered(_extract, pending), start=1):
+                load = worker_load.setdefault(pid, {"files": 0, "frames": 0, "seconds": 0.0})
+                load["files"] += 1
+                load["seconds"] += seconds
+
+                if points is None:
+                    print(f"Warning: Could not read {file_path}")
+                    continue
+
+                load["frames"] += len(points)
+                frame_total += len(points)
+                landmarks[file_path] = (points, handedness, scores)
+                if cache is not None:
+                    cache.put(file_path, points, handedness, scores)
+
+                if done % 100 == 0 or done == len(pending):
+                    elapsed = time.perf_counter() - start_time
+                    print(f"[{done}/{len(pending)}] {done / elapsed:.2f} files/s, {frame_total / elapsed:.1f} frames/s")
+
+    if cache is not None:
+        cache.flush()
+
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+
+    for split in SPLITS:
+        for media_type in MEDIA_TYPES:
+            records = [
+                (file_path, label) + tuple(landmarks[file_path])
+                for file_path, file_split, file_media, label in files
+                if file_split == split and file_media == media_type and file_path in landmarks
+            ]
+            if records:
+                output_path = os.path.join(output_dir, f"{split}_{media_type}.npz")
+                save_split_arrays(output_path, records)
+                print(f"Saved {len(records)} files to {output_path}")
+
+    stats = {
+        "files": len(pending),
+        "frames": frame_total,
+        "seconds": elapsed,
+        "files_per_second": len(pending) / elapsed,
+        "frames_per_second": frame_total / elapsed,
+        "workers": {str(pid): load for pid, load in worker_load.items()},
+    }
+
+    print(f"Extraction complete: {stats['files_per_second']:.2f} files/s, {stats['frames_per_second']:.1f} frames/s")
+    if worker_load:
+        busy = [load["seconds"] for load in worker_load.values()]
+        for pid, load in sorted(worker_load.items()):
+            print(f"  Worker {pid}: {load['files']} files, {load['frames']} frames, {load['seconds']:.2f}s busy")
+        print(f"  Load balance (max / mean busy time): {max(busy) / (sum(busy) / len(busy)):.2f}")
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract hand landmarks from a split dataset.")
+    parser.add_argument("dataset_dir", nargs="?", default="split_dataset", help="Root of the split dataset.")
+    parser.add_argument("--output-dir", default="landmarks", help="Directory for the .npz archives.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--max-num-hands", type=int, default=2)
+    parser.add_argument("--min-detection-confidence", type=float, default=0.5)
+    parser.add_argument("--min-tracking-confidence", type=float, default=0.5)
+    parser.add_argument("--cache-dir", default=None, help="Optional landmark cache directory.")
+    args = parser.parse_args()
+
+    batch_extract(args.dataset_dir, args.output_dir, args.workers, args.max_num_hands,
+                  args.min_detection_confidence, args.min_tracking_confidence, args.cache_dir)
+
+if __name__ == "__main__":
+    main()
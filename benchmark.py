@@ -0,0 +1,289 @@
+#This script benchmarks the tracking and preprocessing pipelines on generated fixtures and compares against a baseline
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+FIXTURE_SEED = 1234
+
+def make_fixture_video(path, frame_count=120, size=(640, 480), fps=30.0, seed=FIXTURE_SEED):
+    """
+    Writes a deterministic synthetic video: a noisy background with moving hand-sized blobs.
+
+    Args:
+        path (str): Output path of the AVI file.
+        frame_count (int): Number of frames to write.
+        size (tuple): Frame size (width, height).
+        fps (float): Frames per second stored in the file.
+        seed (int): Seed of the background noise.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), fps, size)
+
+    for i in range(frame_count):
+        frame = background.copy()
+        center_x = int(width * (0.3 + 0.4 * np.sin(i / 15.0) ** 2))
+        center_y = int(height * (0.4 + 0.2 * np.cos(i / 20.0)))
+        cv2.ellipse(frame, (center_x, center_y), (50, 70), i % 180, 0, 360, (120, 160, 210), -1)
+        cv2.circle(frame, (width - center_x, center_y), 40, (90, 140, 200), -1)
+        writer.write(frame)
+
+    writer.release()
+
+def make_fixture_images(output_dir, count=40, size=(1280, 720), seed=FIXTURE_SEED):
+    """Writes deterministic synthetic JPEG images."""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    for i in range(count):
+        image = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+        # Upscaled noise compresses like a real photo rather than like pure noise
+        image = cv2.resize(image, size, interpolation=cv2.INTER_CUBIC)
+        cv2.imwrite(os.path.join(output_dir, f"image_{i}.jpg"), image)
+
+def _quiet():
+    """Silences the per-file progress prints of the pipelines while they are timed."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def bench_tracker(video_path, frames=120, inference_width=None, roi_mode=False):
+    """
+    Measures HandTracker FPS and latency percentiles on a fixture video. In ROI mode the share of
+    frames that took the ROI path is reported too, since crops are only used while a hand is
+    tracked (never on the synthetic fixture, see run_benchmarks' video argument).
+    """
+    from hand_track import PATH_ROI, HandTracker
+    from profiler import StageProfiler
+
+    profiler = StageProfiler(capacity=frames)
+    tracker = HandTracker(inference_width=inference_width, roi_mode=roi_mode, profiler=profiler)
+    cap = cv2.VideoCapture(video_path)
+    processed = 0
+
+    # Warm up the model so its initialization does not count
+    ret, frame = cap.read()
+    if ret:
+        tracker.process_frame(frame)
+    profiler.reset()
+    tracker.path_counts = dict.fromkeys(tracker.path_counts, 0)
+
+    start_time = time.perf_counter()
+    while processed < frames:
+        ret, frame = cap.read()
+        if not ret:
+            # Loop the fixture until enough frames were processed
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = cap.read()
+            if not ret:
+                break
+        tracker.process_frame(frame, as_array=True)
+        processed += 1
+    elapsed = time.perf_counter() - start_time
+
+    cap.release()
+    tracker.release()
+
+    total = profiler.summary()["stages"]["total"]
+    suffix = (f"_w{inference_width}" if inference_width else "") + ("_roi" if roi_mode else "")
+    metrics = {
+        f"tracker{suffix}_fps": (processed / elapsed, "fps", True),
+        f"tracker{suffix}_p50_ms": (total["p50_ms"], "ms", False),
+        f"tracker{suffix}_p95_ms": (total["p95_ms"], "ms", False),
+        f"tracker{suffix}_p99_ms": (total["p99_ms"], "ms", False),
+    }
+    if roi_mode:
+        metrics[f"tracker{suffix}_share"] = (100.0 * tracker.path_counts[PATH_ROI] / max(processed, 1), "%", True)
+    return metrics
+
+def bench_extract_frames(video_path, work_dir, frame_interval=5):
+    """Measures extract_frames throughput in source frames per second."""
+    from video_capndpre import extract_frames
+
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    output_dir = os.path.join(work_dir, "frames")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    start_time = time.perf_counter()
+    with _quiet():
+        extract_frames(video_path, output_dir=output_dir, frame_interval=frame_interval)
+    elapsed = time.perf_counter() - start_time
+
+    return {"extract_frames_fps": (frame_count / elapsed, "frames/s", True)}
+
+def bench_resize_frames(image_dir, work_dir, size=(224, 224)):
+    """Measures resize_frames throughput in images per second."""
+    from video_capndpre import resize_frames
+
+    image_count = len(os.listdir(image_dir))
+    output_dir = os.path.join(work_dir, "resized")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    start_time = time.perf_counter()
+    with _quiet():
+        resize_frames(image_dir, output_dir=output_dir, size=size)
+    elapsed = time.perf_counter() - start_time
+
+    return {"resize_frames_ips": (image_count / elapsed, "images/s", True)}
+
+def bench_augmentation(video_path, image_dir, work_dir, augment_count=3):
+    """Measures augmentation throughput in output frames per second."""
+    from data_augmentation import augment_images_and_videos
+
+    input_dir = os.path.join(work_dir, "augment_input")
+    label_dir = os.path.join(input_dir, "hello")
+    os.makedirs(label_dir, exist_ok=True)
+    shutil.copy(video_path, label_dir)
+    for file_name in sorted(os.listdir(image_dir))[:10]:
+        shutil.copy(os.path.join(image_dir, file_name), label_dir)
+
+    output_dir = os.path.join(work_dir, "augment_output")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    cap = cv2.VideoCapture(video_path)
+    video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    output_frames = (video_frames + 10) * (augment_count + 1)
+
+    start_time = time.perf_counter()
+    with _quiet():
+        augment_images_and_videos(input_dir, output_dir, augment_count=augment_count, seed=FIXTURE_SEED, stream=True)
+    elapsed = time.perf_counter() - start_time
+
+    return {"augmentation_fps": (output_frames / elapsed, "frames/s", True)}
+
+BENCHMARKS = {
+    "tracker": lambda fixtures, work_dir: {
+        **bench_tracker(fixtures["tracker_video"]),
+        **bench_tracker(fixtures["tracker_video"], inference_width=320),
+        **bench_tracker(fixtures["tracker_video"], roi_mode=True),
+    },
+    "extract_frames": lambda fixtures, work_dir: bench_extract_frames(fixtures["video"], work_dir),
+    "resize_frames": lambda fixtures, work_dir: bench_resize_frames(fixtures["images"], work_dir),
+    "augmentation": lambda fixtures, work_dir: bench_augmentation(fixtures["video"], fixtures["images"], work_dir),
+}
+
+def run_benchmarks(names=None, repeat=3, video=None):
+    """
+    Runs the benchmarks on freshly generated fixtures.
+
+    Args:
+        names (list): Benchmarks to run (default: all of BENCHMARKS).
+        repeat (int): Number of runs per benchmark. The median of each metric is reported.
+        video (str): Optional recording with real hands for the tracker benchmarks. The
+            synthetic fixture has no hand MediaPipe detects, so it only measures the detection
+            path, and ROI mode falls back to full frames on it.
+
+    Returns:
+        dict: Results with environment information and one entry per metric.
+    """
+    names = names or list(BENCHMARKS)
+    # One OpenCV thread keeps the numbers comparable across machines with different core counts
+    cv2.setNumThreads(1)
+
+    metrics = {}
+    with tempfile.TemporaryDirectory(prefix="slr_bench_") as work_dir:
+        fixtures = {"video": os.path.join(work_dir, "fixture.avi"), "images": os.path.join(work_dir, "images")}
+        make_fixture_video(fixtures["video"])
+        fixtures["tracker_video"] = video or fixtures["video"]
+        make_fixture_images(fixtures["images"])
+
+        for name in names:
+            runs = [BENCHMARKS[name](fixtures, work_dir) for _ in range(repeat)]
+            for metric, (_, unit, higher_is_better) in runs[0].items():
+                value = float(np.median([run[metric][0] for run in runs]))
+                metrics[metric] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+                print(f"{metric:<28} {value:10.2f} {unit}")
+
+    return {
+        "tracker_video": os.path.basename(video) if video else "fixture",
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "metrics": metrics,
+    }
+
+def compare_results(results, baseline, threshold=0.1):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): Output of run_benchmarks.
+        baseline (dict): A previous output of run_benchmarks.
+        threshold (float): Allowed relative slowdown before a metric counts as a regression.
+
+    Returns:
+        list: Names of the metrics that regressed.
+    """
+    regressions = []
+    for metric, current in results["metrics"].items():
+        previous = baseline["metrics"].get(metric)
+        if previous is None or previous["value"] <= 0:
+            continue
+
+        change = (current["value"] - previous["value"]) / previous["value"]
+        if not current["higher_is_better"]:
+            change = -change
+
+        status = "ok"
+        if change < -threshold:
+            status = "REGRESSION"
+            regressions.append(metric)
+        print(f"{metric:<28} {previous['value']:10.2f} -> {current['value']:10.2f} {current['unit']:<9} {change:+7.1%}  {status}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tracking and preprocessing pipelines.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the median is reported.")
+    parser.add_argument("--video", help="Recording with real hands for the tracker benchmarks.")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results.")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative slowdown.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.repeat, args.video)
+    with open(args.output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"Results saved: {args.output}")
+
+    if args.save_baseline:
+        shutil.copy(args.output, args.baseline)
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline found at {args.baseline}, run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("tracker_video", "fixture") != results["tracker_video"]:
+        print(f"Warning: The baseline tracked {baseline.get('tracker_video', 'fixture')}, not {results['tracker_video']}.")
+
+    regressions = compare_results(results, baseline, args.threshold)
+    if regressions:
+        print(f"Error: {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}.")
+        return 1
+
+    print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
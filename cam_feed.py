@@ -1,10 +1,14 @@
 import cv2
 
+from frame_source import ThreadedCapture
+
 def open_camera(camera_index=0):
     """
     Opens the camera and displays the feed.
+
+    Frames are read on a background thread so a slow display never makes frames queue up in the driver.
     """
-    cap = cv2.VideoCapture(camera_index)
+    cap = ThreadedCapture(camera_index).start()
     if not cap.isOpened():
         print("Error: Could not access the camera.")
         return
@@ -1,14 +1,21 @@
 import cv2
 import os
 
-def capture_images(output_dir="dataset", image_prefix="img", camera_index=0):
+from async_writer import AsyncWriter
+from frame_dedup import next_file_index
+
+def capture_images(output_dir="dataset", image_prefix="img", camera_index=0, dedup=None):
     """
     Captures images from the camera and saves them to the specified directory.
 
+    Images are saved by a background writer so the camera feed does not stutter.
+
     Args:
         output_dir (str): Directory where the captured images will be saved.
         image_prefix (str): Prefix for the saved image filenames.
         camera_index (int): Index of the camera to use (default: 0).
+        dedup (DedupIndex): Optional near-duplicate filter. Captures too similar to an image
+            already in output_dir or captured before are skipped.
     """
     # Create the output directory if it doesn't exist
     if not os.path.exists(output_dir):
@@ -22,7 +29,12 @@ def capture_images(output_dir="dataset", image_prefix="img", camera_index=0):
 
     print("Press 'c' to capture an image, 'q' to quit.")
 
+    writer = AsyncWriter()
     image_count = 0
+    if dedup is not None:
+        dedup.index_directory(output_dir)
+        # Number new images after the indexed ones instead of overwriting them
+        image_count = next_file_index(output_dir, image_prefix)
 
     while True:
         ret, frame = cap.read()
@@ -37,11 +49,17 @@ def capture_images(output_dir="dataset", image_prefix="img", camera_index=0):
         key = cv2.waitKey(1) & 0xFF
 
         if key == ord('c'):
+            if dedup is not None and not dedup.add_if_new(frame, output_dir):
+                print("Skipped near-duplicate image.")
+                continue
+
             # Save the current frame as an image file
             image_path = os.path.join(output_dir, f"{image_prefix}_{image_count}.jpg")
-            cv2.imwrite(image_path, frame)
-            print(f"Image saved: {image_path}")
-            image_count += 1
+            if writer.save_image(image_path, frame):
+                print(f"Image saved: {image_path}")
+                image_count += 1
+            else:
+                print(f"Warning: Writer queue full, image dropped: {image_path}")
 
         elif key == ord('q'):
             # Quit the image capture loop
@@ -49,6 +67,7 @@ def capture_images(output_dir="dataset", image_prefix="img", camera_index=0):
 
     cap.release()
     cv2.destroyAllWindows()
+    writer.close()
 
 if __name__ == "__main__":
     # Customize the output directory and prefix if needed
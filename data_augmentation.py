@@ -1,8 +1,108 @@
 import os
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import cv2
+import numpy as np
 import albumentations as A
 
-def augment_images_and_videos(input_dir, output_dir, augment_count=5):
+from frame_index import open_video_writer
+from landmark_utils import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+
+# Transform owned by each worker process in parallel mode
+_worker_transform = None
+
+def build_transform():
+    """
+    Builds the Albumentations augmentation pipeline.
+
+    A ReplayCompose is used so the parameters sampled for one frame can be replayed on the
+    following frames of a video.
+    """
+    return A.ReplayCompose([
+        A.HorizontalFlip(p=0.5),
+        A.Rotate(limit=15, p=0.5),
+        A.RandomBrightnessContrast(brightness_limit=0.2, contrast_limit=0.2, p=0.5),
+        A.GaussianBlur(blur_limit=(3, 7), p=0.5)
+    ])
+
+def file_seed(seed, relative_path):
+    """
+    Derives a per-file seed so the augmentations of a file do not depend on processing order.
+
+    Args:
+        seed (int): Base seed for the whole run.
+        relative_path (str): Path of the file relative to the input directory.
+
+    Returns:
+        int: A 32-bit seed.
+    """
+    return (seed + zlib.crc32(relative_path.replace(os.sep, "/").encode("utf-8"))) & 0xFFFFFFFF
+
+def seed_transform(transform, seed):
+    """Seeds every random number generator the augmentation pipeline may draw from."""
+    random.seed(seed)
+    np.random.seed(seed)
+    # Newer Albumentations versions keep their own generator on the Compose
+    if hasattr(transform, "set_random_seed"):
+        transform.set_random_seed(seed)
+
+def init_worker():
+    """Creates the augmentation pipeline once per worker process. Use it as the pool initializer."""
+    global _worker_transform
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+    _worker_transform = build_transform()
+
+def worker_transform():
+    """Returns the augmentation pipeline created by init_worker in this process."""
+    return _worker_transform
+
+class ClipAugmenter:
+    """
+    Augments the frames of one clip consistently: the transform parameters are sampled on the
+    first frame and replayed on every following frame.
+    """
+    def __init__(self, transform):
+        """
+        Args:
+            transform (A.ReplayCompose): The augmentation pipeline.
+        """
+        self.transform = transform
+        self._replayed = None
+
+    def __call__(self, frame):
+        """Returns the augmented frame."""
+        if self._replayed is None:
+            augmented = self.transform(image=frame)
+            # Rebuild the sampled pipeline once instead of on every frame
+            self._replayed = A.ReplayCompose._restore_for_replay(augmented["replay"])
+            return augmented["image"]
+        return self._replayed(force_apply=True, image=frame)["image"]
+
+def _augment_file(task, augment_count, seed, stream, transform=None, keyframe_interval=None):
+    """
+    Augments a single file, seeding the pipeline first if a seed is given.
+
+    Returns:
+        int: Number of frames written.
+    """
+    file_path, output_label_dir, file_name, relative_path = task
+    if transform is None:
+        transform = worker_transform()
+
+    if seed is not None:
+        seed_transform(transform, file_seed(seed, relative_path))
+
+    file_ext = os.path.splitext(file_name)[1].lower()
+    if file_ext in IMAGE_EXTENSIONS:
+        return process_image(file_path, output_label_dir, file_name, transform, augment_count)
+    return process_video(file_path, output_label_dir, file_name, transform, augment_count, stream, keyframe_interval)
+
+def augment_images_and_videos(input_dir, output_dir, augment_count=5, num_workers=1, seed=None, stream=False,
+                              keyframe_interval=None):
     """
     Augments images and videos from the input directory and saves them in the output directory.
 
@@ -10,6 +110,13 @@ def augment_images_and_videos(input_dir, output_dir, augment_count=5):
         input_dir (str): Directory containing the original images and videos.
         output_dir (str): Directory where augmented images and videos will be stored.
         augment_count (int): Number of augmented versions to generate per original file.
+        num_workers (int): Number of worker processes. Each worker builds its own pipeline.
+        seed (int): Optional base seed. Each file is seeded from it and its relative path,
+            so the output is the same for any number of workers.
+        stream (bool): If True, videos are augmented frame by frame in constant memory,
+            see process_video.
+        keyframe_interval (int): Optional maximum distance between keyframes of the written
+            videos, which makes random windows cheap to read (see frame_index.open_video_writer).
     """
     if not os.path.exists(input_dir):
         print(f"Error: Input directory not found at {input_dir}")
@@ -19,15 +126,9 @@ def augment_images_and_videos(input_dir, output_dir, augment_count=5):
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
 
-    # Define augmentation pipeline using Albumentations
-    transform = A.Compose([
-        A.HorizontalFlip(p=0.5),
-        A.Rotate(limit=15, p=0.5),
-        A.RandomBrightnessContrast(brightness_limit=0.2, contrast_limit=0.2, p=0.5),
-        A.GaussianBlur(blur_limit=(3, 7), p=0.5)
-    ])
-
-    for label in os.listdir(input_dir):
+    # Collect the images and videos to process
+    tasks = []
+    for label in sorted(os.listdir(input_dir)):
         label_dir = os.path.join(input_dir, label)
         if not os.path.isdir(label_dir):
             continue
@@ -35,25 +136,42 @@ def augment_images_and_videos(input_dir, output_dir, augment_count=5):
         output_label_dir = os.path.join(output_dir, label)
         os.makedirs(output_label_dir, exist_ok=True)
 
-        for file_name in os.listdir(label_dir):
-            file_path = os.path.join(label_dir, file_name)
+        for file_name in sorted(os.listdir(label_dir)):
             file_ext = os.path.splitext(file_name)[1].lower()
+            if file_ext in IMAGE_EXTENSIONS or file_ext in VIDEO_EXTENSIONS:
+                file_path = os.path.join(label_dir, file_name)
+                tasks.append((file_path, output_label_dir, file_name, os.path.join(label, file_name)))
 
-            if file_ext in ['.jpg', '.png', '.jpeg']:  # Process images
-                process_image(file_path, output_label_dir, file_name, transform, augment_count)
+    total_files = len(tasks)
+    total_frames = 0
+    start_time = time.perf_counter()
 
-            elif file_ext in ['.mp4', '.avi', '.mov']:  # Process videos
-                process_video(file_path, output_label_dir, file_name, transform, augment_count)
+    def report(done, frames, file_name):
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        print(f"[{done}/{total_files}] {file_name} - {done / elapsed:.2f} files/s, {frames / elapsed:.1f} frames/s")
 
-    print("Image and video augmentation complete.")
+    if num_workers <= 1:
+        transform = build_transform()
+        for done, task in enumerate(tasks, start=1):
+            total_frames += _augment_file(task, augment_count, seed, stream, transform, keyframe_interval)
+            report(done, total_frames, task[2])
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker) as executor:
+            futures = {executor.submit(_augment_file, task, augment_count, seed, stream, None, keyframe_interval): task for task in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                total_frames += future.result()
+                report(done, total_frames, futures[future][2])
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Image and video augmentation complete. {total_files} files, {total_frames} frames in {elapsed:.2f}s.")
 
 def process_image(file_path, output_label_dir, file_name, transform, augment_count):
-    """Processes and augments a single image."""
+    """Processes and augments a single image. Returns the number of frames written."""
     image = cv2.imread(file_path)
 
     if image is None:
         print(f"Warning: Failed to read image {file_path}")
-        return
+        return 0
 
     # Save the original image
     original_output_path = os.path.join(output_label_dir, file_name)
@@ -68,14 +186,25 @@ def process_image(file_path, output_label_dir, file_name, transform, augment_cou
         cv2.imwrite(augmented_output_path, augmented_image)
 
     print(f"Augmented images for {file_name} saved in {output_label_dir}")
+    return augment_count + 1
+
+def process_video(file_path, output_label_dir, file_name, transform, augment_count, stream=False, keyframe_interval=None):
+    """
+    Processes and augments a single video. Returns the number of frames written.
 
-def process_video(file_path, output_label_dir, file_name, transform, augment_count):
-    """Processes and augments a single video."""
+    In stream mode every frame is decoded once and written to the original and all augmented
+    outputs at the same time, so memory use does not grow with the clip length. Each augmented
+    output samples its transform parameters on the first frame and replays them on every
+    following frame, which keeps the augmentation consistent over time.
+    """
     cap = cv2.VideoCapture(file_path)
 
     if not cap.isOpened():
         print(f"Error: Failed to read video {file_path}")
-        return
+        return 0
+
+    if stream:
+        return stream_video(cap, output_label_dir, file_name, transform, augment_count, keyframe_interval)
 
     # Extract original video frames
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -94,7 +223,7 @@ def process_video(file_path, output_label_dir, file_name, transform, augment_cou
 
     # Save the original video frames as a video file
     original_video_path = os.path.join(output_label_dir, file_name)
-    save_video(frames, original_video_path, fps, (frame_width, frame_height))
+    save_video(frames, original_video_path, fps, (frame_width, frame_height), keyframe_interval)
 
     # Generate augmented versions
     for i in range(augment_count):
@@ -104,14 +233,49 @@ def process_video(file_path, output_label_dir, file_name, transform, augment_cou
             augmented_frames.append(augmented["image"])
 
         augmented_video_path = os.path.join(output_label_dir, f"{os.path.splitext(file_name)[0]}_aug{i + 1}.avi")
-        save_video(augmented_frames, augmented_video_path, fps, (frame_width, frame_height))
+        save_video(augmented_frames, augmented_video_path, fps, (frame_width, frame_height), keyframe_interval)
+
+    print(f"Augmented videos for {file_name} saved in {output_label_dir}")
+    return len(frames) * (augment_count + 1)
+
+def stream_video(cap, output_label_dir, file_name, transform, augment_count, keyframe_interval=None):
+    """Augments an opened video frame by frame through one open writer per output."""
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    base_name = os.path.splitext(file_name)[0]
+
+    original_writer = open_video_writer(os.path.join(output_label_dir, file_name), fps, frame_size,
+                                        keyframe_interval=keyframe_interval)
+    augmented_writers = [
+        open_video_writer(os.path.join(output_label_dir, f"{base_name}_aug{i + 1}.avi"), fps, frame_size,
+                          keyframe_interval=keyframe_interval)
+        for i in range(augment_count)
+    ]
+    augmenters = [ClipAugmenter(transform) for _ in range(augment_count)]
+    frame_count = 0
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        original_writer.write(frame)
+        for augment, writer in zip(augmenters, augmented_writers):
+            writer.write(augment(frame))
+
+        frame_count += 1
+
+    cap.release()
+    original_writer.release()
+    for writer in augmented_writers:
+        writer.release()
 
     print(f"Augmented videos for {file_name} saved in {output_label_dir}")
+    return frame_count * (augment_count + 1)
 
-def save_video(frames, output_path, fps, frame_size):
-    """Saves a list of frames as a video file."""
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    video_writer = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+def save_video(frames, output_path, fps, frame_size, keyframe_interval=None):
+    """Saves a list of frames as a video file, optionally with a short keyframe interval."""
+    video_writer = open_video_writer(output_path, fps, frame_size, keyframe_interval=keyframe_interval)
 
     for frame in frames:
         video_writer.write(frame)
@@ -120,4 +284,5 @@ def save_video(frames, output_path, fps, frame_size):
 
 if __name__ == "__main__":
     # Example usage
-    augment_images_and_videos(input_dir="dataset", output_dir="augmented_dataset", augment_count=3)
+    augment_images_and_videos(input_dir="dataset", output_dir="augmented_dataset", augment_count=3,
+                              num_workers=os.cpu_count(), seed=42, stream=True)
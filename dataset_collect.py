@@ -1,15 +1,43 @@
 import cv2
 import os
+import queue
+import threading
+import time
 
-def collect_images_and_videos(base_dir="datasets", datasets=None, labels=None, camera_index=0):
+import numpy as np
+
+from async_writer import AsyncWriter, FPSMeter
+from frame_dedup import next_file_index
+from hand_track import HandTracker
+from landmark_utils import LandmarkSequence
+
+def collect_images_and_videos(base_dir="datasets", datasets=None, labels=None, camera_index=0, writer_queue=128,
+                              record_landmarks=False, landmark_dtype=np.float16, max_num_hands=2, dedup=None,
+                              keyframe_interval=None):
     """
     Collects images and videos for each dataset and label, saving them in subdirectories.
 
+    Images and video frames are written by a background writer so recording never stalls the
+    camera loop. Videos are stamped with the rate measured over the recording itself.
+
     Args:
         base_dir (str): Base directory where datasets will be stored.
         datasets (list): List of dataset names (e.g., ['custom_dataset']).
         labels (list): List of labels for classification (e.g., ['hello', 'thanks']).
         camera_index (int): Index of the camera to use.
+        writer_queue (int): Maximum number of pending writes before frames are dropped.
+        record_landmarks (bool): If True, the hand tracker runs on every recorded frame and the
+            landmark sequence is saved next to each video as <video>.landmarks.npz, with points
+            (T, hands, 21, 3), handedness, scores and timestamps in seconds. Tracking runs on its
+            own thread, so neither the camera loop nor the video writer waits for it. Every frame
+            that reaches the video is tracked, so the sequence stays aligned with it; if tracking
+            is slower than the camera, it catches up after the recording.
+        landmark_dtype: Floating point type of the saved landmarks (float16 or float32).
+        max_num_hands (int): Number of hands tracked when recording landmarks.
+        dedup (DedupIndex): Optional near-duplicate filter for captured images. Each label
+            directory is indexed separately, including the images saved in earlier sessions.
+        keyframe_interval (int): Optional maximum distance between keyframes of the recorded
+            videos, so training can read random windows cheaply (see frame_index).
     """
     if datasets is None:
         datasets = []
@@ -21,6 +49,13 @@ def collect_images_and_videos(base_dir="datasets", datasets=None, labels=None, c
         print("Error: Could not access the camera.")
         return
 
+    writer = AsyncWriter(max_queue=writer_queue)
+    fps_meter = FPSMeter()
+
+    recorder = None
+    if record_landmarks:
+        recorder = LandmarkRecorder(HandTracker(max_num_hands=max_num_hands), max_num_hands, landmark_dtype)
+
     for dataset in datasets:
         dataset_dir = os.path.join(base_dir, dataset)
         if not os.path.exists(dataset_dir):
@@ -39,13 +74,18 @@ def collect_images_and_videos(base_dir="datasets", datasets=None, labels=None, c
             image_count = 0
             video_count = 0
             recording = False
-            video_writer = None
+            if dedup is not None:
+                dedup.index_directory(label_dir)
+                # Number new images after the indexed ones instead of overwriting them
+                image_count = next_file_index(label_dir, f"{label}_image")
 
             while True:
                 ret, frame = cap.read()
                 if not ret:
                     print("Error: Failed to capture frame.")
                     break
+                captured = time.perf_counter()
+                fps_meter.tick()
 
                 # Display the camera feed
                 cv2.imshow(f"Collecting - {dataset}/{label}", frame)
@@ -56,43 +96,135 @@ def collect_images_and_videos(base_dir="datasets", datasets=None, labels=None, c
                 if key == ord('c'):
                     # Save the current frame as an image
                     image_path = os.path.join(label_dir, f"{label}_image_{image_count}.jpg")
-                    cv2.imwrite(image_path, frame)
-                    print(f"Image saved: {image_path}")
-                    image_count += 1
+                    if dedup is not None and not dedup.add_if_new(frame, label_dir):
+                        print("Skipped near-duplicate image.")
+                    elif writer.save_image(image_path, frame):
+                        print(f"Image saved: {image_path}")
+                        image_count += 1
+                    else:
+                        print(f"Warning: Writer queue full, image dropped: {image_path}")
 
                 elif key == ord('v'):
                     if not recording:
                         # Start video recording
                         video_path = os.path.join(label_dir, f"{label}_video_{video_count}.avi")
-                        fourcc = cv2.VideoWriter_fourcc(*'XVID')  # Codec for AVI format
-                        fps = 20.0  # Frames per second
+                        fps = fps_meter.fps()  # Provisional, replaced by the recorded rate on close
                         frame_size = (frame.shape[1], frame.shape[0])  # Frame size
-                        video_writer = cv2.VideoWriter(video_path, fourcc, fps, frame_size)
+                        sink = recorder.sink(video_path) if recorder else None
+                        writer.open_video(video_path, fps, frame_size, fourcc="XVID",  # Codec for AVI format
+                                          keyframe_interval=keyframe_interval, sink=sink)
                         print(f"Started recording video: {video_path}")
                         recording = True
+                        record_start = captured
                     else:
-                        # Stop video recording
-                        video_writer.release()
+                        # Stop video recording, the landmarks are saved when the writer closes it
+                        writer.close_video()
                         print(f"Video saved: {video_path}")
                         video_count += 1
                         recording = False
 
                 elif key == ord('q'):
                     # Quit collecting for the current label
-                    if recording and video_writer is not None:
-                        video_writer.release()
+                    if recording:
+                        writer.close_video()
                         print(f"Stopped and saved video: {video_path}")
                         recording = False
                     break
 
                 # Write frames to the video file if recording
-                if recording and video_writer is not None:
-                    video_writer.write(frame)
+                if recording:
+                    writer.write_frame(frame, captured - record_start)
 
     cap.release()
     cv2.destroyAllWindows()
+    errors = writer.close()
+    if recorder is not None:
+        recorder.close()
+    stats = writer.stats()
+    if stats["images_dropped"] or stats["frames_dropped"]:
+        print(f"Warning: Dropped {stats['images_dropped']} images and {stats['frames_dropped']} video frames.")
+    if errors:
+        print(f"Warning: {len(errors)} writes failed, {stats['frames_failed']} video frames were not recorded.")
     print("Data collection complete.")
 
+class LandmarkRecorder:
+    """
+    Tracks the hands of recorded videos on its own thread and saves one landmark sequence per
+    video. The AsyncWriter sinks returned by sink() only queue the written frames, so the video
+    writer never waits for inference. The queue is unbounded: only frames that reach the video
+    get a landmark entry, and none of them may be skipped.
+    """
+    def __init__(self, tracker, max_num_hands, dtype):
+        """
+        Args:
+            tracker (HandTracker): Tracker used for every video. It is released by close().
+            max_num_hands (int): Number of hands stored per frame.
+            dtype: Floating point type of the saved landmarks.
+        """
+        self.tracker = tracker
+        self.max_num_hands = max_num_hands
+        self.dtype = dtype
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="LandmarkRecorder", daemon=True)
+        self._thread.start()
+
+    def sink(self, video_path):
+        """Returns the AsyncWriter sink that records the landmarks of one video."""
+        return _LandmarkSink(self._queue, video_path)
+
+    def _run(self):
+        """Tracks the queued frames clip by clip until close() is called."""
+        video_path, sequence = None, None
+        while True:
+            kind, path, payload = self._queue.get()
+            if kind == "stop":
+                return
+            try:
+                if kind == "frame":
+                    if path != video_path:
+                        # A new clip starts, the tracking state of the previous one can go
+                        self.tracker.engine.reset()
+                        video_path, sequence = path, LandmarkSequence(self.max_num_hands)
+                    if sequence is not None:
+                        arrays = self.tracker.process_frame(payload[0], as_array=True, draw=False)[1]
+                        sequence.append(arrays, payload[1])
+                elif kind == "close" and path == video_path:
+                    save_landmarks(sequence, video_path, self.dtype)
+                    video_path, sequence = None, None
+            except Exception as e:
+                # The sequence would no longer match the video, so the clip gets none
+                print(f"Error: Landmark recording failed for {path}: {e}")
+                sequence = None
+
+    def close(self):
+        """Waits until every queued frame is tracked and saved, then releases the tracker."""
+        pending = self._queue.qsize()
+        if pending:
+            print(f"Tracking the landmarks of {pending} remaining frames...")
+        self._queue.put(("stop", None, None))
+        self._thread.join()
+        self.tracker.release()
+
+class _LandmarkSink:
+    """AsyncWriter sink that hands the frames of one video over to a LandmarkRecorder."""
+    def __init__(self, recorder_queue, video_path):
+        self._queue = recorder_queue
+        self.video_path = video_path
+
+    def write(self, frame, timestamp):
+        self._queue.put(("frame", self.video_path, (frame, timestamp)))
+
+    def close(self):
+        self._queue.put(("close", self.video_path, None))
+
+def save_landmarks(sequence, video_path, dtype):
+    """Saves the landmark sequence of a clip next to its video, if landmarks were recorded."""
+    if sequence is None:
+        return
+    landmarks_path = os.path.splitext(video_path)[0] + ".landmarks.npz"
+    sequence.save(landmarks_path, dtype)
+    print(f"Landmarks saved: {landmarks_path} ({len(sequence)} frames)")
+
 if __name__ == "__main__":
     # Specify only the custom dataset
     datasets = ["custom_dataset"]  # Collect data only for the custom dataset
@@ -1,21 +1,123 @@
 #this script is used to distinguish between the video files and video files and organizes them accordingly in the output dictionary
+import json
 import os
 import shutil
+import stat
 import random
 
-def split_dataset(dataset_dir, output_dir="split_dataset", train_ratio=0.8, val_ratio=0.1):
+SPLITS = ["train", "val", "test"]
+LINK_MODES = ["copy", "hardlink", "symlink", "none"]
+
+def assign_splits(files, assigned, train_ratio, val_ratio, rng):
+    """
+    Assigns files to train/val/test while keeping every existing assignment.
+
+    New files are shuffled and each one goes to the split furthest below its target count,
+    so a fresh split gets exactly the requested proportions and an incremental one stays close.
+
+    Args:
+        files (list): Names of all files of one label and media type.
+        assigned (dict): Existing assignments (file name -> split), updated in place.
+        train_ratio (float): Proportion of files in the training set.
+        val_ratio (float): Proportion of files in the validation set.
+        rng (random.Random): Generator used to shuffle the new files.
+
+    Returns:
+        dict: The assignments of all files.
+    """
+    train_count = int(len(files) * train_ratio)
+    val_count = int(len(files) * val_ratio)
+    targets = {"train": train_count, "val": val_count, "test": len(files) - train_count - val_count}
+    counts = {split: 0 for split in SPLITS}
+    for split in assigned.values():
+        counts[split] += 1
+
+    new_files = sorted(f for f in files if f not in assigned)
+    rng.shuffle(new_files)
+
+    for file_name in new_files:
+        split = max(SPLITS, key=lambda s: targets[s] - counts[s])
+        assigned[file_name] = split
+        counts[split] += 1
+
+    return assigned
+
+def _is_current_copy(src_path, dest_path):
+    """Returns True if dest_path is a regular file with the size of src_path and not older."""
+    src_stat, dest_stat = os.stat(src_path), os.lstat(dest_path)
+    return (stat.S_ISREG(dest_stat.st_mode) and src_stat.st_size == dest_stat.st_size
+            and dest_stat.st_mtime >= src_stat.st_mtime)
+
+def _is_same_file(src_path, dest_path):
+    """Returns True if dest_path is a hardlink to src_path. A dangling symlink is not."""
+    try:
+        return not os.path.islink(dest_path) and os.path.samefile(src_path, dest_path)
+    except OSError:
+        return False
+
+def place_file(src_path, dest_path, link_mode):
+    """
+    Materializes one file of the split, skipping it if it is already in place.
+
+    Returns:
+        str: The link mode actually used ("copy" if a hardlink was not possible).
+    """
+    if os.path.lexists(dest_path):
+        if link_mode == "copy" and _is_current_copy(src_path, dest_path):
+            return link_mode
+        if link_mode == "hardlink":
+            if _is_same_file(src_path, dest_path):
+                return link_mode
+            # A copy left by an earlier run on a file system without hardlinks is still valid
+            if _is_current_copy(src_path, dest_path):
+                return "copy"
+        elif link_mode == "symlink" and os.path.islink(dest_path) and os.readlink(dest_path) == os.path.abspath(src_path):
+            return link_mode
+        os.remove(dest_path)
+
+    if link_mode == "hardlink":
+        try:
+            os.link(src_path, dest_path)
+            return link_mode
+        except OSError:
+            # Different file systems or no hardlink support
+            link_mode = "copy"
+
+    if link_mode == "symlink":
+        os.symlink(os.path.abspath(src_path), dest_path)
+    else:
+        shutil.copy2(src_path, dest_path)
+    return link_mode
+
+def split_dataset(dataset_dir, output_dir="split_dataset", train_ratio=0.8, val_ratio=0.1, seed=None,
+                  link_mode="copy", manifest_path=None):
     """
     Splits the dataset into training, validation, and test sets for both images and videos.
 
+    The split is stratified per label and media type and recorded in a JSON manifest. When the
+    manifest already exists, files keep their split and only new files are assigned, so adding
+    data never moves existing files between splits.
+
     Args:
         dataset_dir (str): Directory containing the dataset with subdirectories for each label.
         output_dir (str): Directory where the split dataset will be stored.
         train_ratio (float): Proportion of data to include in the training set.
         val_ratio (float): Proportion of data to include in the validation set.
+        seed (int): Seed of the shuffle. The same seed and files always give the same split.
+        link_mode (str): How files are placed in output_dir: "copy", "hardlink", "symlink",
+            or "none" to only write the manifest.
+        manifest_path (str): Path of the manifest (default: output_dir/split_manifest.json).
+
+    Returns:
+        dict: The manifest, or None on error.
     """
     if not os.path.exists(dataset_dir):
         print(f"Error: Dataset directory not found at {dataset_dir}")
-        return
+        return None
+
+    if link_mode not in LINK_MODES:
+        print(f"Error: Invalid link mode '{link_mode}'. Use one of {LINK_MODES}.")
+        return None
 
     # Ensure output directory exists
     if not os.path.exists(output_dir):
@@ -26,46 +128,79 @@ def split_dataset(dataset_dir, output_dir="split_dataset", train_ratio=0.8, val_
     test_ratio = 1.0 - train_ratio - val_ratio
     if test_ratio <= 0:
         print("Error: Invalid split ratios. Ensure train_ratio + val_ratio < 1.0.")
-        return
+        return None
 
-    for label in os.listdir(dataset_dir):
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, "split_manifest.json")
+
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as manifest_file:
+            previous = json.load(manifest_file).get("files", {})
+        print(f"Loaded {len(previous)} existing assignments from {manifest_path}")
+
+    manifest = {"seed": seed, "train_ratio": train_ratio, "val_ratio": val_ratio, "files": {}}
+    fallback_warned = False
+
+    for label in sorted(os.listdir(dataset_dir)):
         label_path = os.path.join(dataset_dir, label)
         if not os.path.isdir(label_path):
             continue
 
         # Create label subdirectories for each split and media type
-        for split in ["train", "val", "test"]:
-            for media_type in ["images", "videos"]:
-                split_label_dir = os.path.join(output_dir, split, media_type, label)
-                os.makedirs(split_label_dir, exist_ok=True)
+        if link_mode != "none":
+            for split in SPLITS:
+                for media_type in ["images", "videos"]:
+                    split_label_dir = os.path.join(output_dir, split, media_type, label)
+                    os.makedirs(split_label_dir, exist_ok=True)
 
         # Separate image and video files
         image_files = [f for f in os.listdir(label_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
         video_files = [f for f in os.listdir(label_path) if f.lower().endswith(('.mp4', '.avi', '.mov'))]
 
-        # Shuffle and split files
+        print(f"Split for label '{label}':")
         for files, media_type in zip([image_files, video_files], ["images", "videos"]):
-            random.shuffle(files)
-            train_count = int(len(files) * train_ratio)
-            val_count = int(len(files) * val_ratio)
+            # Seed per label and media type so adding a label does not reshuffle the others
+            rng = random.Random(f"{seed}:{label}:{media_type}") if seed is not None else random.Random()
+            assigned = {
+                f: previous[f"{label}/{f}"]["split"] for f in files
+                if previous.get(f"{label}/{f}", {}).get("media") == media_type
+            }
+            assign_splits(files, assigned, train_ratio, val_ratio, rng)
 
-            train_files = files[:train_count]
-            val_files = files[train_count:train_count + val_count]
-            test_files = files[train_count + val_count:]
+            counts = {split: 0 for split in SPLITS}
+            for file_name in sorted(assigned):
+                split = assigned[file_name]
+                counts[split] += 1
+                manifest["files"][f"{label}/{file_name}"] = {"split": split, "media": media_type, "label": label}
 
-            # Move files to respective directories
-            for file_list, split in zip([train_files, val_files, test_files], ["train", "val", "test"]):
-                for file_name in file_list:
+                if link_mode != "none":
                     src_path = os.path.join(label_path, file_name)
                     dest_path = os.path.join(output_dir, split, media_type, label, file_name)
-                    shutil.copy(src_path, dest_path)
+                    used_mode = place_file(src_path, dest_path, link_mode)
+                    if used_mode != link_mode and not fallback_warned:
+                        print("Warning: Hardlinks are not supported here, copying files instead.")
+                        fallback_warned = True
 
-        print(f"Split for label '{label}':")
-        print(f"  Images: {len(image_files)} files ({len(train_files)} train, {len(val_files)} val, {len(test_files)} test)")
-        print(f"  Videos: {len(video_files)} files ({len(train_files)} train, {len(val_files)} val, {len(test_files)} test)")
+            print(f"  {media_type.capitalize()}: {len(files)} files ({counts['train']} train, {counts['val']} val, {counts['test']} test)")
+
+    # Remove the placed copies or links of files that disappeared from the dataset
+    if link_mode != "none":
+        for key, entry in previous.items():
+            if key not in manifest["files"]:
+                label, file_name = key.split("/", 1)
+                stale_path = os.path.join(output_dir, entry["split"], entry["media"], label, file_name)
+                if os.path.lexists(stale_path):
+                    os.remove(stale_path)
+
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    print(f"Manifest saved: {manifest_path}")
 
     print("Dataset splitting complete.")
+    return manifest
 
 if __name__ == "__main__":
     # Example usage
-    split_dataset(dataset_dir="dataset", output_dir="split_dataset", train_ratio=0.8, val_ratio=0.1)
+    split_dataset(dataset_dir="dataset", output_dir="split_dataset", train_ratio=0.8, val_ratio=0.1,
+                  seed=42, link_mode="hardlink")
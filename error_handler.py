@@ -1,40 +1,235 @@
 #The following script will handle any sort of error that occurs during hand tracking
+import atexit
+import json
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# Handlers that are not closed yet, closed by one exit hook without keeping them alive
+_open_handlers = weakref.WeakSet()
+
+def _close_open_handlers():
+    for handler in list(_open_handlers):
+        handler.close()
+
+atexit.register(_close_open_handlers)
+
+class _LogWriter:
+    """Formats records and appends them to the log file. Shared by the writer thread and the caller."""
+    def __init__(self, log_file, structured, echo):
+        self.log_file = log_file
+        self.structured = structured
+        self.echo = echo
+        self._lock = threading.Lock()
+
+    def format(self, record):
+        if self.structured:
+            return json.dumps(record)
+        repeats = f" (x{record['repeats']})" if record["repeats"] > 1 else ""
+        return f"Error: {record['message']}{repeats}"
+
+    def write(self, records):
+        lines = [self.format(record) for record in records]
+        with self._lock:
+            with open(self.log_file, "a") as log:
+                log.write("\n".join(lines) + "\n")
+        if self.echo:
+            for record in records:
+                repeats = f" (x{record['repeats']})" if record["repeats"] > 1 else ""
+                print(f"Error: {record['message']}{repeats}")
+
+def _run_writer(writer, record_queue, flush_interval):
+    """
+    Writes queued records in batches until a None record arrives. Only the writer and the queue
+    are referenced, so an unused handler can still be garbage collected.
+    """
+    while True:
+        try:
+            batch = [record_queue.get(timeout=flush_interval)]
+        except queue.Empty:
+            continue
+
+        # Drain everything that is already waiting into the same write
+        while True:
+            try:
+                batch.append(record_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = None in batch
+        records = [record for record in batch if record is not None]
+        if records:
+            writer.write(records)
+
+        for _ in batch:
+            record_queue.task_done()
+        if stop:
+            return
+
 class Errorhandler:
     """
     Utility class to handle and log errors during hand tracking or other processes.
+
+    Logging never blocks the caller: records are queued and written in batches by a background
+    thread, and repeats of the same message are rate-limited and counted instead of written again.
+    Only the most recently seen messages keep a counter, so distinct messages cannot grow memory
+    without bound. Records logged after close() are written directly. Open handlers are closed at exit, and the
+    thread of a handler that is garbage collected stops by itself.
     """
-    def __init__(self, log_file="error_log.txt"):
+    def __init__(self, log_file="error_log.txt", rate_limit_interval=5.0, flush_interval=1.0, max_queue=1024,
+                 structured=True, echo=True, max_messages=1024):
         """
         Initializes the ErrorSorter with an optional log file.
 
         Args:
             log_file (str): Path to the file where errors will be logged.
+            rate_limit_interval (float): A message is written at most once per this many seconds.
+                Suppressed repeats are counted and reported with the next written occurrence.
+            flush_interval (float): Maximum number of seconds records wait before being written.
+            max_queue (int): Maximum number of pending records. Extra records are dropped and counted.
+            structured (bool): If True, records are written as JSON lines with a timestamp, the
+                frame index and the occurrence count. If False, the plain "Error: ..." format is used.
+            echo (bool): If True, records are also printed to the console by the writer thread.
+            max_messages (int): Maximum number of distinct messages counted. The least recently
+                seen message is forgotten first, after its suppressed repeats are written.
         """
         self.log_file = log_file
+        self.rate_limit_interval = rate_limit_interval
+        self.flush_interval = flush_interval
+        self.structured = structured
+        self.echo = echo
+        self.max_messages = max_messages
+
+        # message -> [total occurrences, occurrences since last written, time last written],
+        # least recently seen first
+        self.occurrences = OrderedDict()
+        self.dropped = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
 
-    def log_error(self, error_message):
+        self._writer = _LogWriter(log_file, structured, echo)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=_run_writer, args=(self._writer, self._queue, flush_interval),
+                                        name="Errorhandler", daemon=True)
+        self._thread.start()
+        self._finalizer = weakref.finalize(self, self._queue.put, None)
+        self._finalizer.atexit = False
+        _open_handlers.add(self)
+
+    def log_error(self, error_message, frame_index=None):
         """
         Logs an error message to the console and the log file.
 
         Args:
             error_message (str): The error message to log.
+            frame_index (int): Optional index of the frame the error belongs to.
+        """
+        now = time.time()
+        with self._lock:
+            counter = self.occurrences.get(error_message)
+            if counter is None:
+                counter = self.occurrences[error_message] = [0, 0, None]
+                if len(self.occurrences) > self.max_messages:
+                    self._evict(now)
+            else:
+                self.occurrences.move_to_end(error_message)
+            counter[0] += 1
+            counter[1] += 1
+
+            if counter[2] is not None and now - counter[2] < self.rate_limit_interval:
+                # Repeated too soon, only counted
+                return
+
+            record = self._record(now, error_message, frame_index, counter)
+            counter[2] = now
+
+            closed = self._closed
+            if not closed:
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    self.dropped += 1
+
+        if closed:
+            # The writer thread is gone, write synchronously instead of losing the record
+            self._writer.write([record])
+
+    def _evict(self, now):
+        """Forgets the least recently seen message, queuing its suppressed repeats first."""
+        message, counter = self.occurrences.popitem(last=False)
+        self.evicted += 1
+        if counter[1] > 0 and not self._closed:
+            try:
+                self._queue.put_nowait(self._record(now, message, None, counter))
+            except queue.Full:
+                self.dropped += 1
+
+    def _record(self, now, error_message, frame_index, counter):
+        """Builds a record and resets the count of repeats since the last written one."""
+        record = {
+            "time": now,
+            "level": "error",
+            "message": error_message,
+            "frame_index": frame_index,
+            "count": counter[0],
+            "repeats": counter[1],
+        }
+        counter[1] = 0
+        return record
+
+    def flush(self):
+        """Waits until every queued record has been written."""
+        self._queue.join()
+
+    def summary(self):
+        """
+        Returns the occurrence counters.
+
+        Returns:
+            dict: Total occurrences per counted message, and the number of dropped records and
+                of forgotten messages.
         """
-        print(f"Error: {error_message}")
-        with open(self.log_file, "a") as log:
-            log.write(f"Error: {error_message}\n")
+        with self._lock:
+            return {
+                "messages": {message: counter[0] for message, counter in self.occurrences.items()},
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        """Writes the pending records, reports suppressed repeats and stops the writer thread."""
+        if self._closed:
+            return
+
+        # Report repeats that were suppressed since the last written occurrence
+        now = time.time()
+        with self._lock:
+            for message, counter in self.occurrences.items():
+                if counter[1] > 0:
+                    self._queue.put(self._record(now, message, None, counter))
+
+            self._closed = True
+        self._finalizer.detach()
+        _open_handlers.discard(self)
+        self._queue.put(None)
+        self._thread.join()
 
-    def check_frame_error(self, frame):
+    def check_frame_error(self, frame, frame_index=None):
         """
         Validates the frame captured from the camera.
 
         Args:
             frame (numpy.ndarray): The frame to check.
+            frame_index (int): Optional index of the frame, stored with the logged error.
 
         Returns:
             bool: True if the frame is valid, False otherwise.
         """
         if frame is None:
-            self.log_error("Failed to capture frame. Frame is None.")
+            self.log_error("Failed to capture frame. Frame is None.", frame_index)
             return False
         return True
 
@@ -65,10 +260,12 @@ if __name__ == "__main__":
 
     print("Camera feed is running. Press 'q' to quit.")
 
+    frame_index = 0
     while True:
         ret, frame = cap.read()
-        if not ret or not error_handler.check_frame_error(frame):
+        if not ret or not error_handler.check_frame_error(frame, frame_index):
             break
+        frame_index += 1
 
         # Display the frame
         cv2.imshow("Camera Feed", frame)
@@ -0,0 +1,230 @@
+#This script filters near-duplicate frames with a 64-bit perceptual hash and a per-label in-memory index
+import os
+import re
+import shutil
+
+import cv2
+import numpy as np
+
+from landmark_utils import IMAGE_EXTENSIONS
+
+# Number of set bits of every byte value, used to count differing hash bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def dhash(image):
+    """
+    Computes the 64-bit difference hash of an image: the sign of the horizontal gradient of a
+    9x8 grayscale thumbnail. Similar images give hashes that differ in few bits.
+
+    Args:
+        image (numpy.ndarray): BGR or grayscale image.
+
+    Returns:
+        int: The hash.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    thumbnail = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = thumbnail[:, 1:] > thumbnail[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distances(hashes, value):
+    """
+    Returns the number of differing bits between every hash of an array and a value.
+
+    Args:
+        hashes (numpy.ndarray): uint64 hashes.
+        value (int): The hash to compare with.
+
+    Returns:
+        numpy.ndarray: The distances.
+    """
+    differing = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[differing.view(np.uint8)].reshape(len(hashes), 8).sum(axis=1)
+
+def next_file_index(directory, prefix):
+    """
+    Returns the number following the highest existing <prefix>_<number> image of a directory,
+    so new images never overwrite the ones an index was built from.
+
+    Args:
+        directory (str): Directory holding the images.
+        prefix (str): File name prefix, without the trailing underscore.
+
+    Returns:
+        int: The first free number (0 if there is no such image).
+    """
+    if not os.path.isdir(directory):
+        return 0
+
+    pattern = re.compile(re.escape(prefix) + r"_(\d+)$")
+    highest = -1
+    for file_name in os.listdir(directory):
+        stem, file_ext = os.path.splitext(file_name)
+        match = pattern.match(stem)
+        if match and file_ext.lower() in IMAGE_EXTENSIONS:
+            highest = max(highest, int(match.group(1)))
+    return highest + 1
+
+class DedupIndex:
+    """
+    In-memory index of frame hashes, kept separately for each label (or output directory).
+
+    A frame is a near-duplicate when its hash is within max_distance bits of a hash already in
+    the index of its label. With a window, only the most recent hashes are compared, which
+    catches bursts of identical frames while allowing a pose to be recorded again later.
+    """
+    def __init__(self, max_distance=4, window=None):
+        """
+        Args:
+            max_distance (int): Maximum Hamming distance (out of 64 bits) for a near-duplicate.
+            window (int): If set, only the window most recent hashes of a label are compared.
+        """
+        self.max_distance = max_distance
+        self.window = window
+        self._hashes = {}
+        self._counts = {}
+        self.checked = 0
+        self.duplicates = 0
+
+    def _label_hashes(self, label):
+        count = self._counts.get(label, 0)
+        if not count:
+            return np.zeros(0, dtype=np.uint64)
+        start = max(0, count - self.window) if self.window else 0
+        return self._hashes[label][start:count]
+
+    def is_duplicate(self, frame_hash, label):
+        """Returns True if the hash is within max_distance of an indexed hash of the label."""
+        hashes = self._label_hashes(label)
+        return bool(len(hashes)) and int(hamming_distances(hashes, frame_hash).min()) <= self.max_distance
+
+    def add(self, frame_hash, label):
+        """Adds a hash to the index of a label."""
+        count = self._counts.get(label, 0)
+        hashes = self._hashes.get(label)
+        if hashes is None or count == len(hashes):
+            # Grow by doubling so adding stays amortized O(1)
+            grown = np.zeros(max(64, 2 * count), dtype=np.uint64)
+            if hashes is not None:
+                grown[:count] = hashes
+            hashes = self._hashes[label] = grown
+        hashes[count] = frame_hash
+        self._counts[label] = count + 1
+
+    def add_if_new(self, frame, label):
+        """
+        Hashes a frame and adds it to the index unless it is a near-duplicate.
+
+        Args:
+            frame (numpy.ndarray): BGR image.
+            label (str): Label or directory the frame belongs to.
+
+        Returns:
+            bool: True if the frame is new and should be kept, False if it is a near-duplicate.
+        """
+        frame_hash = dhash(frame)
+        self.checked += 1
+        if self.is_duplicate(frame_hash, label):
+            self.duplicates += 1
+            return False
+        self.add(frame_hash, label)
+        return True
+
+    def index_directory(self, directory, label=None):
+        """
+        Adds the images already in a directory to the index, so new frames are also compared
+        with what was saved in earlier sessions.
+
+        Args:
+            directory (str): Directory holding the images.
+            label (str): Label to index them under (default: the directory itself).
+
+        Returns:
+            int: Number of images indexed.
+        """
+        label = directory if label is None else label
+        if not os.path.isdir(directory):
+            return 0
+
+        count = 0
+        for file_name in sorted(os.listdir(directory)):
+            if os.path.splitext(file_name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            # The hash only needs a tiny thumbnail, so decode at reduced size
+            image = cv2.imread(os.path.join(directory, file_name), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if image is not None:
+                self.add(dhash(image), label)
+                count += 1
+        return count
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+def dedup_directory(dataset_dir, max_distance=4, window=None, action="move", duplicates_dir=None):
+    """
+    Removes near-duplicate images from an existing dataset, label by label. Within each label
+    directory, images are visited in name order and an image is a duplicate of an earlier one.
+
+    Args:
+        dataset_dir (str): Directory containing one subdirectory per label.
+        max_distance (int): Maximum Hamming distance for a near-duplicate.
+        window (int): If set, an image is only compared with the window images kept before it.
+        action (str): "report" to only count duplicates, "move" to move them to duplicates_dir,
+            or "delete" to remove them.
+        duplicates_dir (str): Where moved duplicates go (default: <dataset_dir>_duplicates),
+            keeping the label subdirectories.
+
+    Returns:
+        dict: Number of images kept and duplicates found per label.
+    """
+    if not os.path.exists(dataset_dir):
+        print(f"Error: Dataset directory not found at {dataset_dir}")
+        return {}
+
+    if action not in ("report", "move", "delete"):
+        print(f"Error: Invalid action '{action}'. Use 'report', 'move' or 'delete'.")
+        return {}
+
+    if duplicates_dir is None:
+        duplicates_dir = dataset_dir.rstrip("/\\") + "_duplicates"
+
+    index = DedupIndex(max_distance=max_distance, window=window)
+    results = {}
+    for label in sorted(os.listdir(dataset_dir)):
+        label_dir = os.path.join(dataset_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+
+        kept, duplicates = 0, 0
+        for file_name in sorted(os.listdir(label_dir)):
+            if os.path.splitext(file_name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+
+            file_path = os.path.join(label_dir, file_name)
+            image = cv2.imread(file_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if image is None:
+                print(f"Warning: Failed to read image {file_path}")
+                continue
+
+            frame_hash = dhash(image)
+            if not index.is_duplicate(frame_hash, label):
+                index.add(frame_hash, label)
+                kept += 1
+                continue
+
+            duplicates += 1
+            if action == "move":
+                os.makedirs(os.path.join(duplicates_dir, label), exist_ok=True)
+                shutil.move(file_path, os.path.join(duplicates_dir, label, file_name))
+            elif action == "delete":
+                os.remove(file_path)
+
+        results[label] = {"kept": kept, "duplicates": duplicates}
+        print(f"Label '{label}': kept {kept} images, {duplicates} near-duplicates ({action})")
+
+    return results
+
+if __name__ == "__main__":
+    # Example usage: list the near-duplicates of a dataset without touching it
+    dedup_directory(dataset_dir="dataset", max_distance=4, action="report")
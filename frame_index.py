@@ -0,0 +1,411 @@
+#This script builds keyframe index sidecars for videos and reads arbitrary frames or windows by seeking to the nearest keyframe
+import os
+import struct
+import tempfile
+import zipfile
+
+import cv2
+import numpy as np
+
+from landmark_utils import VIDEO_EXTENSIONS
+
+# Flag of an idx1 entry that holds a keyframe
+AVIIF_KEYFRAME = 0x10
+
+_IDX1_ENTRY = np.dtype([("id", "S4"), ("flags", "<u4"), ("offset", "<u4"), ("size", "<u4")])
+
+# Default keyframe distance of the codecs used by the writers. OpenCV cannot change it for
+# encoded output, so a shorter interval needs an intra-only codec
+CODEC_KEYFRAME_INTERVALS = {"MJPG": 1, "XVID": 12}
+
+_warned_codec_switches = set()
+
+def index_path(video_path):
+    """Returns the path of the index sidecar of a video: <video>.frameindex.npz."""
+    return os.path.splitext(video_path)[0] + ".frameindex.npz"
+
+def parse_avi_index(video_path):
+    """
+    Reads the keyframe flags of the first video stream from the idx1 chunk of an AVI file,
+    without decoding anything.
+
+    Returns:
+        tuple: (frames,) boolean keyframe flags and the frame rate, or None if the file is not
+            an AVI with a legacy index (e.g. an OpenDML file larger than 1 GB).
+    """
+    with open(video_path, "rb") as video_file:
+        header = video_file.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"AVI ":
+            return None
+
+        video_stream, fps, entries = None, 0.0, None
+        while True:
+            chunk = video_file.read(8)
+            if len(chunk) < 8:
+                break
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            padded = size + (size & 1)
+
+            if chunk_id == b"LIST" and video_file.read(4) == b"hdrl":
+                hdrl = video_file.read(size - 4)
+                video_stream, fps = _parse_hdrl(hdrl)
+                video_file.seek(padded - size, os.SEEK_CUR)
+            elif chunk_id == b"LIST":
+                video_file.seek(padded - 4, os.SEEK_CUR)
+            elif chunk_id == b"idx1":
+                entries = np.frombuffer(video_file.read(size), dtype=_IDX1_ENTRY)
+                break
+            else:
+                video_file.seek(padded, os.SEEK_CUR)
+
+    if entries is None or video_stream is None:
+        return None
+
+    # Video chunks of stream n are named "nndc" (compressed) or "nndb" (uncompressed)
+    prefix = b"%02d" % video_stream
+    ids = entries["id"]
+    is_video = (np.char.startswith(ids, prefix) & (np.char.endswith(ids, b"dc") | np.char.endswith(ids, b"db")))
+    return (entries["flags"][is_video] & AVIIF_KEYFRAME) != 0, fps
+
+def _parse_hdrl(hdrl):
+    """Returns the number and frame rate of the first video stream of an AVI header list."""
+    offset, stream = 0, 0
+    while offset + 8 <= len(hdrl):
+        chunk_id, size = struct.unpack("<4sI", hdrl[offset:offset + 8])
+        if chunk_id == b"LIST" and hdrl[offset + 8:offset + 12] == b"strl":
+            strh = hdrl.find(b"strh", offset + 12, offset + 8 + size)
+            if strh >= 0 and hdrl[strh + 8:strh + 12] == b"vids":
+                scale, rate = struct.unpack("<II", hdrl[strh + 28:strh + 36])
+                return stream, rate / scale if scale else 0.0
+            stream += 1
+        offset += 8 + size + (size & 1)
+    return None, 0.0
+
+def set_avi_frame_rate(video_path, fps):
+    """
+    Rewrites the frame rate stamped in the header of an AVI file, in place. Used when the real
+    rate of a recording is only known once it ends.
+
+    Args:
+        video_path (str): Path to the AVI file.
+        fps (float): The new frame rate.
+
+    Returns:
+        bool: True if the header was updated, False if the file is not an AVI with a video stream.
+    """
+    if fps <= 0:
+        return False
+
+    with open(video_path, "r+b") as video_file:
+        header = video_file.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"AVI ":
+            return False
+
+        while True:
+            chunk = video_file.read(8)
+            if len(chunk) < 8:
+                return False
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"LIST" and video_file.read(4) == b"hdrl":
+                hdrl_start = video_file.tell()
+                hdrl = video_file.read(size - 4)
+                break
+            video_file.seek(size + (size & 1) - (4 if chunk_id == b"LIST" else 0), os.SEEK_CUR)
+
+        strh = hdrl.find(b"strh")
+        while strh >= 0 and hdrl[strh + 8:strh + 12] != b"vids":
+            strh = hdrl.find(b"strh", strh + 4)
+        if strh < 0:
+            return False
+
+        # Stream header: rate / scale frames per second
+        video_file.seek(hdrl_start + strh + 28)
+        video_file.write(struct.pack("<II", 1000, int(round(fps * 1000))))
+
+        # Main header: microseconds per frame
+        avih = hdrl.find(b"avih")
+        if avih >= 0:
+            video_file.seek(hdrl_start + avih + 8)
+            video_file.write(struct.pack("<I", int(round(1e6 / fps))))
+    return True
+
+def probe_keyframes(video_path):
+    """
+    Finds the keyframes of any video by reading its packets without decoding them, where the
+    OpenCV build supports raw reads. Otherwise only the first frame is known to be a keyframe,
+    which keeps reads correct but makes them decode from the start.
+
+    Returns:
+        tuple: (frames,) boolean keyframe flags, (frames,) timestamps in milliseconds and the frame rate.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    raw = hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME") and cap.set(cv2.CAP_PROP_FORMAT, -1)
+
+    keyframes, timestamps = [], []
+    while cap.grab():
+        keyframes.append(bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)) if raw else not keyframes)
+        timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+    cap.release()
+    return np.array(keyframes, dtype=bool), np.array(timestamps, dtype=np.float64), fps
+
+def build_frame_index(video_path, save=True):
+    """
+    Builds the frame index of a video: frame count, frame rate, keyframe numbers and per-frame
+    timestamps. AVI files are indexed from their idx1 chunk, other files by probing.
+
+    Args:
+        video_path (str): Path to the video.
+        save (bool): If True, the index is saved as a sidecar next to the video.
+
+    Returns:
+        dict: The index, or None if the video cannot be read.
+    """
+    if not os.path.exists(video_path):
+        print(f"Error: Video file not found at {video_path}")
+        return None
+
+    parsed = parse_avi_index(video_path) if video_path.lower().endswith(".avi") else None
+    if parsed is not None and len(parsed[0]) and parsed[1] > 0:
+        flags, fps = parsed
+        # AVI frames have a constant duration
+        timestamps = np.arange(len(flags), dtype=np.float64) * (1000.0 / fps)
+        method = "idx1"
+    else:
+        flags, timestamps, fps = probe_keyframes(video_path)
+        method = "probe"
+
+    if not len(flags):
+        print(f"Error: Could not read frames from {video_path}")
+        return None
+
+    flags[0] = True  # Decoding can always start at the first frame
+    stat = os.stat(video_path)
+    index = {
+        "frame_count": len(flags),
+        "fps": float(fps),
+        "keyframes": np.flatnonzero(flags),
+        "timestamps": timestamps,
+        "method": method,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+    }
+
+    if save:
+        _save_index(index_path(video_path), index)
+    return index
+
+def _save_index(path, index):
+    """
+    Saves an index sidecar through a unique temporary file that is renamed into place, so
+    concurrent builders of the same video never write to the same file. A sidecar that cannot
+    be written (e.g. on a read-only dataset) is skipped with a warning, and the index is only
+    kept in memory.
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as index_file:
+            np.savez(index_file, **index)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not save frame index {path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _read_index(path):
+    """Reads an index sidecar, returning None if it is unreadable or incomplete."""
+    try:
+        with np.load(path) as data:
+            index = {key: data[key] for key in data.files}
+        index["frame_count"] = int(index["frame_count"])
+        index["fps"] = float(index["fps"])
+        index["method"] = str(index["method"])
+        missing = {"keyframes", "timestamps"} - index.keys()
+        if missing:
+            raise KeyError(", ".join(sorted(missing)))
+        index["source_size"] = int(index["source_size"])
+        index["source_mtime"] = float(index["source_mtime"])
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+        print(f"Warning: Ignoring unreadable frame index {path}: {e}")
+        return None
+    return index
+
+def load_frame_index(video_path, rebuild=True):
+    """
+    Loads the index sidecar of a video, building it if it is missing, unreadable or older than
+    the video.
+
+    Returns:
+        dict: The index, or None if it could not be loaded or built.
+    """
+    path = index_path(video_path)
+    if os.path.exists(path) and os.path.exists(video_path):
+        index = _read_index(path)
+        stat = os.stat(video_path)
+        if index is not None and index["source_size"] == stat.st_size and index["source_mtime"] == stat.st_mtime:
+            return index
+    return build_frame_index(video_path) if rebuild else None
+
+def index_directory(dataset_dir):
+    """
+    Builds the missing or stale index sidecars of every video below a directory.
+
+    Returns:
+        int: Number of videos indexed.
+    """
+    count = 0
+    for root, _, files in os.walk(dataset_dir):
+        for file_name in sorted(files):
+            if os.path.splitext(file_name)[1].lower() in VIDEO_EXTENSIONS:
+                if load_frame_index(os.path.join(root, file_name)) is not None:
+                    count += 1
+    print(f"Indexed {count} videos in {dataset_dir}")
+    return count
+
+class IndexedVideoReader:
+    """
+    Random-access video reader. A frame is reached by seeking to the closest keyframe at or
+    before it and grabbing forward, and reads that continue from the current position do not
+    seek at all.
+    """
+    def __init__(self, video_path, index=None):
+        """
+        Args:
+            video_path (str): Path to the video.
+            index (dict): Frame index of the video (default: the sidecar, built if needed).
+        """
+        self.video_path = video_path
+        self.index = index if index is not None else load_frame_index(video_path)
+        if self.index is None:
+            raise ValueError(f"Could not index {video_path}")
+
+        self.keyframes = self.index["keyframes"]
+        self.cap = cv2.VideoCapture(video_path)
+        self._next = 0  # Number of the frame the next grab returns
+        self.seeks = 0
+        self.frames_grabbed = 0
+
+    def __len__(self):
+        return self.index["frame_count"]
+
+    def timestamp(self, frame_number):
+        """Returns the timestamp of a frame in milliseconds."""
+        return float(self.index["timestamps"][frame_number])
+
+    def _move_to(self, frame_number):
+        """Positions the capture so the next grab returns the given frame."""
+        keyframe = int(self.keyframes[np.searchsorted(self.keyframes, frame_number, side="right") - 1])
+        # Grabbing forward beats seeking when the current position is past the keyframe
+        if not keyframe <= self._next <= frame_number:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self._next = keyframe
+            self.seeks += 1
+
+        while self._next < frame_number:
+            if not self.cap.grab():
+                return False
+            self._next += 1
+            self.frames_grabbed += 1
+        return True
+
+    def read_frame(self, frame_number):
+        """
+        Reads one frame.
+
+        Returns:
+            numpy.ndarray: The frame, or None if it is out of range or cannot be decoded.
+        """
+        if not 0 <= frame_number < len(self) or not self._move_to(frame_number):
+            return None
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._next += 1
+        self.frames_grabbed += 1
+        return frame
+
+    def read_window(self, start, length, step=1):
+        """
+        Reads a window of frames with one seek at most.
+
+        Args:
+            start (int): Number of the first frame.
+            length (int): Number of frames in the window.
+            step (int): Distance between the frames of the window.
+
+        Returns:
+            list: The frames. Shorter than length if the window runs past the end of the video.
+        """
+        frames = []
+        for frame_number in range(start, min(start + length * step, len(self)), step):
+            frame = self.read_frame(frame_number)
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+
+    def release(self):
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def open_video_writer(output_path, fps, frame_size, fourcc="XVID", keyframe_interval=None):
+    """
+    Opens a video writer, optionally with a short keyframe interval so windowed reads of the
+    file only need to decode a few frames.
+
+    OpenCV cannot set the keyframe distance of encoded output, so the codec keeps its default
+    distance (CODEC_KEYFRAME_INTERVALS, 12 frames for XVID). If keyframe_interval is shorter
+    than that, or the codec's default is unknown, the video is written as MJPG instead, where
+    every frame is a keyframe, and a warning is printed once per codec.
+
+    Args:
+        output_path (str): Path of the video.
+        fps (float): Frame rate stamped into the file.
+        frame_size (tuple): Frame size (width, height).
+        fourcc (str): Four-character codec code.
+        keyframe_interval (int): Maximum number of frames between keyframes, or None for the
+            codec default.
+
+    Returns:
+        cv2.VideoWriter: The writer.
+    """
+    if not keyframe_interval:
+        return cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+    default_interval = CODEC_KEYFRAME_INTERVALS.get(fourcc)
+    if default_interval is None or keyframe_interval < default_interval:
+        if (fourcc, keyframe_interval) not in _warned_codec_switches:
+            _warned_codec_switches.add((fourcc, keyframe_interval))
+            print(f"Warning: {fourcc} cannot keep keyframes within {keyframe_interval} frames, writing MJPG instead")
+        fourcc = "MJPG"
+    return cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Example usage: index a video and read random windows from it
+    if len(sys.argv) < 2:
+        print("Usage: python frame_index.py <video> [window_length]")
+        exit()
+
+    window_length = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    index = build_frame_index(sys.argv[1])
+    if index is None:
+        exit()
+    print(f"{index['frame_count']} frames at {index['fps']:.1f} FPS, {len(index['keyframes'])} keyframes ({index['method']})")
+
+    rng = np.random.default_rng(0)
+    with IndexedVideoReader(sys.argv[1], index) as reader:
+        start_time = time.perf_counter()
+        for start in rng.integers(0, max(1, len(reader) - window_length), 20):
+            reader.read_window(int(start), window_length)
+        elapsed = time.perf_counter() - start_time
+        print(f"20 random windows of {window_length} frames in {elapsed:.2f}s, "
+              f"{reader.seeks} seeks, {reader.frames_grabbed} frames grabbed")
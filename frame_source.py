@@ -0,0 +1,187 @@
+#This script reads frames from a camera or video file on a background thread so the processing loop never waits on cap.read()
+import threading
+import time
+from collections import deque
+
+import cv2
+
+class ThreadedCapture:
+    """
+    Reads frames from a camera index or a video file on its own thread into a small bounded buffer.
+    """
+    def __init__(self, source=0, buffer_size=2, latest_only=True, realtime=False):
+        """
+        Initializes the capture source. Call start() before reading.
+
+        Args:
+            source (int or str): Camera index or path to a video file.
+            buffer_size (int): Maximum number of frames held in the buffer.
+            latest_only (bool): If True, read() returns the newest buffered frame and drops the
+                older ones, and the reader thread drops the oldest frame when the buffer is full.
+                If False, frames are returned in order, the reader thread waits for the consumer
+                and no frame is ever dropped.
+            realtime (bool): Only used for video files. If True, frames are read at the file's
+                native FPS, like a live camera, instead of as fast as possible.
+        """
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1.")
+
+        self.source = source
+        self.buffer_size = buffer_size
+        self.latest_only = latest_only
+        self.realtime = realtime
+
+        self.cap = cv2.VideoCapture(source)
+        self.is_file = isinstance(source, str)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0.0
+
+        self.frames_read = 0
+        self.frames_dropped = 0
+        # Time (time.perf_counter) at which the frame last returned by read() was captured
+        self.last_capture_time = None
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._running = False
+        self._finished = False
+        self._thread = None
+
+    def isOpened(self):
+        """Returns True if the underlying capture was opened successfully."""
+        return self.cap.isOpened()
+
+    def start(self):
+        """
+        Starts the reader thread.
+
+        Returns:
+            ThreadedCapture: The capture itself, so it can be chained after the constructor.
+        """
+        if self._thread is not None:
+            return self
+
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, name="ThreadedCapture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _reader(self):
+        """Reads frames until the source ends or release() is called."""
+        frame_period = 1.0 / self.fps if self.is_file and self.realtime and self.fps > 0 else 0.0
+        next_time = time.perf_counter()
+
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            captured = time.perf_counter()
+
+            with self._condition:
+                if len(self._buffer) >= self.buffer_size:
+                    if self.latest_only:
+                        # Drop the oldest frame so the consumer only sees fresh ones
+                        self._buffer.popleft()
+                        self.frames_dropped += 1
+                    else:
+                        while self._running and len(self._buffer) >= self.buffer_size:
+                            self._condition.wait()
+                        if not self._running:
+                            break
+
+                self._buffer.append((frame, captured))
+                self.frames_read += 1
+                self._condition.notify_all()
+
+            if frame_period:
+                next_time += frame_period
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Returns the next frame from the buffer, waiting for one if the buffer is empty. In
+        latest_only mode this is the newest frame, and the older buffered frames are dropped.
+        The time the frame was captured is stored in self.last_capture_time.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait for a frame (None waits forever).
+
+        Returns:
+            bool: True if a frame was returned, False if the source has ended or timed out.
+            numpy.ndarray: The frame, or None.
+        """
+        with self._condition:
+            if not self._buffer and not self._finished:
+                self._condition.wait_for(lambda: self._buffer or self._finished, timeout)
+
+            if not self._buffer:
+                return False, None
+
+            if self.latest_only:
+                frame, self.last_capture_time = self._buffer.pop()
+                self.frames_dropped += len(self._buffer)
+                self._buffer.clear()
+            else:
+                frame, self.last_capture_time = self._buffer.popleft()
+            self._condition.notify_all()
+            return True, frame
+
+    def finished(self):
+        """Returns True once the source has ended and every buffered frame has been read."""
+        with self._condition:
+            return self._finished and not self._buffer
+
+    def stats(self):
+        """
+        Returns the capture counters.
+
+        Returns:
+            dict: Frames read, frames dropped and the current buffer fill.
+        """
+        with self._condition:
+            return {
+                "frames_read": self.frames_read,
+                "frames_dropped": self.frames_dropped,
+                "buffered": len(self._buffer),
+            }
+
+    def release(self):
+        """Stops the reader thread and releases the underlying capture."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.cap.release()
+
+if __name__ == "__main__":
+    import sys
+
+    # Pass a video file path to read from a file instead of the default camera
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    capture = ThreadedCapture(source, latest_only=not isinstance(source, str)).start()
+
+    if not capture.isOpened():
+        print("Error: Could not open the capture source.")
+        exit()
+
+    start_time = time.perf_counter()
+    while True:
+        ret, frame = capture.read(timeout=1.0)
+        if not ret:
+            break
+
+    elapsed = time.perf_counter() - start_time
+    stats = capture.stats()
+    capture.release()
+    print(f"Read {stats['frames_read']} frames in {elapsed:.2f}s, dropped {stats['frames_dropped']}.")
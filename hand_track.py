@@ -1,68 +1,247 @@
 #This script uses MediaPipe to track hands and their landmarks in real-time from a webcam feed
+from collections import namedtuple
+
 import cv2
-import mediapipe as mp
+import numpy as np
+
+from frame_source import ThreadedCapture
+from landmark_utils import LandmarkArrays
+from profiler import NULL_PROFILER, StageProfiler, print_summary
+from tracker_engine import TrackerEngine
+
+# Inference paths reported in HandTracker.last_path
+PATH_FULL = "full"
+PATH_ROI = "roi"
+
+# Result of a crop, with the landmarks remapped to the full frame
+CropResults = namedtuple("CropResults", ["multi_hand_landmarks", "multi_hand_world_landmarks", "multi_handedness"])
 
 class HandTracker:
-    def __init__(self, max_num_hands=2, detection_confidence=0.7, tracking_confidence=0.7):
+    def __init__(self, max_num_hands=2, detection_confidence=0.7, tracking_confidence=0.7,
+                 inference_width=None, roi_mode=False, roi_margin=0.3, redetect_interval=30, profiler=None,
+                 shared=None):
         """
         Initializes the HandTracker using MediaPipe Hands.
 
+        MediaPipe and the model are only loaded when the first frame is processed.
+
         Args:
             max_num_hands (int): Maximum number of hands to detect.
             detection_confidence (float): Minimum confidence value for hand detection.
             tracking_confidence (float): Minimum confidence value for hand tracking.
+            inference_width (int): If set, frames wider than this are downscaled to this width
+                (keeping the aspect ratio) before color conversion and inference.
+            roi_mode (bool): If True, only a crop around the last known hands is processed.
+                The full frame is used when no hand is tracked or every redetect_interval frames.
+                Crops go through a separate tracking-mode model, so palm detection only runs on
+                them when it loses the hand, and the full-frame model never sees crop coordinates.
+            roi_margin (float): Margin added around the hand box, as a fraction of its size.
+            redetect_interval (int): Maximum number of consecutive ROI frames before a full
+                frame is processed again to pick up new hands.
+            profiler (StageProfiler): Optional profiler that records the time spent in each stage.
+            shared (bool): If True, reuse the pooled model of any other tracker with the same
+                settings. Only share between trackers that process the same stream.
         """
         self.max_num_hands = max_num_hands
         self.detection_confidence = detection_confidence
         self.tracking_confidence = tracking_confidence
+        self.inference_width = inference_width
+        self.roi_mode = roi_mode
+        self.roi_margin = roi_margin
+        self.redetect_interval = redetect_interval
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
 
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        # Hand box in pixels (x0, y0, x1, y1) and how many ROI frames ran since the last full frame
+        self.roi_box = None
+        self.roi_frames = 0
+        self.last_path = None
+        self.last_results = None
+        self.path_counts = {PATH_FULL: 0, PATH_ROI: 0}
+
+        self.engine = TrackerEngine(
             static_image_mode=False,
             max_num_hands=self.max_num_hands,
             min_detection_confidence=self.detection_confidence,
-            min_tracking_confidence=self.tracking_confidence
+            min_tracking_confidence=self.tracking_confidence,
+            shared=shared
         )
-        self.mp_draw = mp.solutions.drawing_utils
+        self.roi_engine = TrackerEngine(
+            static_image_mode=False,
+            max_num_hands=self.max_num_hands,
+            min_detection_confidence=self.detection_confidence,
+            min_tracking_confidence=self.tracking_confidence
+        ) if roi_mode else None
+        self.arrays = LandmarkArrays(self.max_num_hands)
+
+    @property
+    def hands(self):
+        """The underlying MediaPipe Hands model."""
+        return self.engine.hands
 
-    def process_frame(self, frame):
+    def process_frame(self, frame, as_array=False, draw=True, out=None, in_place=False):
         """
         Processes a frame to detect hands and their landmarks.
 
         Args:
             frame (numpy.ndarray): Input image frame (BGR format).
+            as_array (bool): If True, return the landmarks as a LandmarkArrays instead of a list.
+            draw (bool): If False, nothing is drawn or copied and the input frame is returned.
+            out (numpy.ndarray): Optional buffer with the frame's shape to draw into, which
+                avoids allocating a copy on every frame.
+            in_place (bool): If True, the landmarks are drawn directly on the input frame.
 
         Returns:
-            annotated_frame (numpy.ndarray): Frame with hand landmarks drawn.
-            hand_landmarks (list): List of hand landmarks detected.
+            annotated_frame (numpy.ndarray): Frame with hand landmarks drawn. Unless out or
+                in_place is given, this is a new copy of the frame.
+            hand_landmarks (list or LandmarkArrays): Hand landmarks detected, normalized to the
+                full frame. The LandmarkArrays buffers are reused and overwritten on the next call.
+
+        The inference path the frame took ("full" or "roi") is stored in self.last_path and
+        counted in self.path_counts. The raw MediaPipe result is kept in self.last_results.
         """
+        profiler = self.profiler
+        frame_start = profiler.now()
+
+        results = None
+        if self.roi_mode and self.roi_box is not None and self.roi_frames < self.redetect_interval:
+            results = self._infer(frame, self.roi_box)
+            if results.multi_hand_landmarks:
+                self.last_path = PATH_ROI
+                self.roi_frames += 1
+            else:
+                # Tracking lost inside the crop, fall back to the full frame
+                results = None
+
+        if results is None:
+            results = self._infer(frame, None)
+            self.last_path = PATH_FULL
+            self.roi_frames = 0
+            if self.roi_mode:
+                # The next crop starts from the new box, not from the state of the previous crops
+                self.roi_engine.reset()
+
+        self.path_counts[self.last_path] += 1
+        self.last_results = results
+        if self.roi_mode:
+            self.roi_box = self._hand_box(results, frame.shape)
+
+        output = self.render(frame, results, as_array=as_array, draw=draw, out=out, in_place=in_place)
+        profiler.record("total", frame_start)
+        profiler.frame_done()
+        return output
+
+    def render(self, frame, results, as_array=False, draw=True, out=None, in_place=False):
+        """
+        Builds the output of process_frame from a MediaPipe result, e.g. to show the result of an
+        earlier frame again. The arguments are those of process_frame.
+
+        Returns:
+            tuple: The annotated frame and the landmarks, as returned by process_frame.
+        """
+        profiler = self.profiler
+        start = profiler.now()
+        annotated_frame = frame
+        if draw:
+            if not in_place:
+                if out is None:
+                    out = np.empty_like(frame)
+                np.copyto(out, frame)
+                annotated_frame = out
+                start = profiler.record("copy", start)
+            # Draw landmarks on the frame
+            self.engine.draw(annotated_frame, results)
+            start = profiler.record("draw", start)
+
+        if as_array:
+            self.arrays.fill(results)
+            profiler.record("fill", start)
+            return annotated_frame, self.arrays
+        return annotated_frame, list(results.multi_hand_landmarks or [])
+
+    def _infer(self, frame, box):
+        """
+        Runs MediaPipe on the frame or on a crop of it, at the configured inference resolution.
+
+        Landmarks are returned normalized to the full frame, whatever crop or scale was used.
+        Downscaling keeps the aspect ratio, so only crops need to be mapped back, into a new result
+        that leaves the one returned by MediaPipe untouched.
+        """
+        profiler = self.profiler
+        start = profiler.now()
+
+        if box is not None:
+            x0, y0, x1, y1 = box
+            image = frame[y0:y1, x0:x1]
+        else:
+            image = frame
+
+        if self.inference_width is not None and image.shape[1] > self.inference_width:
+            scale = self.inference_width / image.shape[1]
+            image = cv2.resize(image, (self.inference_width, max(int(round(image.shape[0] * scale)), 1)),
+                               interpolation=cv2.INTER_AREA)
+            start = profiler.record("resize", start)
+
         # Convert the frame to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        start = profiler.record("convert", start)
 
         # Process the frame to detect hands
-        results = self.hands.process(rgb_frame)
-
-        annotated_frame = frame.copy()
-        hand_landmarks = []
+        engine = self.engine if box is None else self.roi_engine
+        results = engine.process(rgb_frame)
+        start = profiler.record("inference", start)
 
-        if results.multi_hand_landmarks:
+        if box is not None and results.multi_hand_landmarks:
+            frame_height, frame_width = frame.shape[:2]
+            crop_width, crop_height = x1 - x0, y1 - y0
+            remapped = []
             for hand_landmark in results.multi_hand_landmarks:
-                # Draw landmarks on the frame
-                self.mp_draw.draw_landmarks(
-                    annotated_frame, hand_landmark, self.mp_hands.HAND_CONNECTIONS
-                )
-                hand_landmarks.append(hand_landmark)
+                hand_copy = type(hand_landmark)()
+                hand_copy.CopyFrom(hand_landmark)
+                for landmark in hand_copy.landmark:
+                    landmark.x = (landmark.x * crop_width + x0) / frame_width
+                    landmark.y = (landmark.y * crop_height + y0) / frame_height
+                    # z uses roughly the same scale as x
+                    landmark.z = landmark.z * crop_width / frame_width
+                remapped.append(hand_copy)
+            results = CropResults(remapped, results.multi_hand_world_landmarks, results.multi_handedness)
+            profiler.record("remap", start)
+
+        return results
+
+    def _hand_box(self, results, frame_shape):
+        """Returns the pixel box around all detected hands plus the margin, or None."""
+        if not results.multi_hand_landmarks:
+            return None
+
+        frame_height, frame_width = frame_shape[:2]
+        xs = [landmark.x for hand in results.multi_hand_landmarks for landmark in hand.landmark]
+        ys = [landmark.y for hand in results.multi_hand_landmarks for landmark in hand.landmark]
+        min_x, max_x = min(xs) * frame_width, max(xs) * frame_width
+        min_y, max_y = min(ys) * frame_height, max(ys) * frame_height
+
+        # Square-ish box so the crop keeps enough context around a thin hand
+        size = max(max_x - min_x, max_y - min_y) * (1.0 + 2.0 * self.roi_margin)
+        center_x, center_y = (min_x + max_x) / 2.0, (min_y + max_y) / 2.0
 
-        return annotated_frame, hand_landmarks
+        x0 = int(max(center_x - size / 2.0, 0))
+        y0 = int(max(center_y - size / 2.0, 0))
+        x1 = int(min(center_x + size / 2.0, frame_width))
+        y1 = int(min(center_y + size / 2.0, frame_height))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        return x0, y0, x1, y1
 
     def release(self):
         """Releases resources used by the HandTracker."""
-        self.hands.close()
+        self.engine.close()
+        if self.roi_engine is not None:
+            self.roi_engine.close()
 
 if __name__ == "__main__":
     # Example usage
-    tracker = HandTracker()
-    cap = cv2.VideoCapture(0)
+    profiler = StageProfiler(dump_path="hand_track_profile.json")
+    tracker = HandTracker(profiler=profiler)
+    cap = ThreadedCapture(0).start()
 
     if not cap.isOpened():
         print("Error: Could not access the camera.")
@@ -80,7 +259,9 @@ if __name__ == "__main__":
         annotated_frame, hand_landmarks = tracker.process_frame(frame)
 
         # Display the frame
+        start = profiler.now()
         cv2.imshow("Hand Tracker", annotated_frame)
+        profiler.record("display", start)
 
         # Exit the loop if 'q' is pressed
         if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -89,3 +270,4 @@ if __name__ == "__main__":
     cap.release()
     cv2.destroyAllWindows()
     tracker.release()
+    print_summary(profiler.summary())
@@ -0,0 +1,277 @@
+#This script augments landmark sequences directly, as a fast alternative to augmenting the pixels of every frame
+import glob
+import os
+import time
+
+import numpy as np
+
+from landmark_utils import HANDEDNESS_LEFT, HANDEDNESS_NONE, HANDEDNESS_RIGHT, load_landmark_sequence
+
+# Landmarks are normalized image coordinates, so geometric transforms are centered on the image
+CENTER = np.array([0.5, 0.5, 0.0], dtype=np.float32)
+
+def pad_sequences(sequences):
+    """
+    Stacks sequences of different lengths into one batch. Padding frames hold no hands.
+
+    Args:
+        sequences (list): (points, handedness) tuples with (T, hands, 21, 3) and (T, hands) arrays.
+
+    Returns:
+        tuple: (B, T, hands, 21, 3) points, (B, T, hands) handedness and (B,) lengths.
+    """
+    lengths = np.array([len(points) for points, _ in sequences])
+    num_hands = sequences[0][0].shape[1]
+    points = np.zeros((len(sequences), lengths.max(), num_hands, 21, 3), dtype=np.float32)
+    handedness = np.full((len(sequences), lengths.max(), num_hands), HANDEDNESS_NONE, dtype=np.int8)
+    for i, (seq_points, seq_handedness) in enumerate(sequences):
+        points[i, :lengths[i]] = seq_points
+        handedness[i, :lengths[i]] = seq_handedness
+    return points, handedness, lengths
+
+def mirror(points, handedness, mask):
+    """
+    Mirrors the selected sequences horizontally. Left and right hands swap their handedness,
+    as they would in a mirrored video.
+
+    Args:
+        points (numpy.ndarray): (B, T, hands, 21, 3) landmarks, modified in place.
+        handedness (numpy.ndarray): (B, T, hands) handedness codes, modified in place.
+        mask (numpy.ndarray): (B,) booleans selecting the sequences to mirror.
+    """
+    points[mask, ..., 0] = 1.0 - points[mask, ..., 0]
+    selected = handedness[mask]
+    handedness[mask] = np.where(selected == HANDEDNESS_LEFT, HANDEDNESS_RIGHT,
+                                np.where(selected == HANDEDNESS_RIGHT, HANDEDNESS_LEFT, selected))
+
+def rotation_matrices(roll, pitch, yaw):
+    """
+    Builds one 3D rotation matrix per sequence.
+
+    Args:
+        roll (numpy.ndarray): (B,) in-plane rotation in radians (around the camera axis).
+        pitch (numpy.ndarray): (B,) rotation around the x axis in radians.
+        yaw (numpy.ndarray): (B,) rotation around the y axis in radians.
+
+    Returns:
+        numpy.ndarray: (B, 3, 3) float32 matrices.
+    """
+    cos_r, sin_r = np.cos(roll), np.sin(roll)
+    cos_p, sin_p = np.cos(pitch), np.sin(pitch)
+    cos_y, sin_y = np.cos(yaw), np.sin(yaw)
+    zeros, ones = np.zeros_like(roll), np.ones_like(roll)
+
+    rot_z = np.stack([cos_r, -sin_r, zeros, sin_r, cos_r, zeros, zeros, zeros, ones], axis=-1).reshape(-1, 3, 3)
+    rot_x = np.stack([ones, zeros, zeros, zeros, cos_p, -sin_p, zeros, sin_p, cos_p], axis=-1).reshape(-1, 3, 3)
+    rot_y = np.stack([cos_y, zeros, sin_y, zeros, ones, zeros, -sin_y, zeros, cos_y], axis=-1).reshape(-1, 3, 3)
+    return (rot_z @ rot_x @ rot_y).astype(np.float32)
+
+def transform(points, matrices, scales, shifts):
+    """
+    Rotates and scales every sequence around the image center, then translates it.
+
+    Args:
+        points (numpy.ndarray): (B, T, hands, 21, 3) landmarks.
+        matrices (numpy.ndarray): (B, 3, 3) rotation matrices.
+        scales (numpy.ndarray): (B,) scale factors.
+        shifts (numpy.ndarray): (B, 3) translations.
+
+    Returns:
+        numpy.ndarray: The transformed landmarks.
+    """
+    centered = points - CENTER
+    rotated = np.einsum("bthlj,bij->bthli", centered, matrices * scales[:, None, None])
+    return rotated + CENTER + shifts[:, None, None, None, :]
+
+def time_warp(points, handedness, lengths, speeds, timestamps=None):
+    """
+    Resamples every sequence at a different speed with linear interpolation. A speed above 1
+    makes the sign faster (the end is padded with empty frames), below 1 slower (the end is cut).
+
+    Args:
+        points (numpy.ndarray): (B, T, hands, 21, 3) landmarks.
+        handedness (numpy.ndarray): (B, T, hands) handedness codes.
+        lengths (numpy.ndarray): (B,) number of valid frames per sequence.
+        speeds (numpy.ndarray): (B,) playback speed factors.
+        timestamps (numpy.ndarray): Optional (B, T) frame times in seconds. They are sampled at
+            the same positions as the points and rescaled by the speed, so the warped sequence
+            keeps a consistent clock.
+
+    Returns:
+        tuple: The resampled points, handedness, lengths and timestamps (None if not given).
+    """
+    batch, frames = points.shape[:2]
+    new_lengths = np.minimum(np.ceil(lengths / speeds).astype(np.int64), frames)
+    # Empty sequences stay empty, the others keep at least one frame
+    new_lengths = np.where(lengths > 0, np.maximum(new_lengths, 1), 0)
+    last = np.maximum(lengths - 1, 0)[:, None]
+
+    source = np.arange(frames)[None, :] * speeds[:, None]
+    source = np.minimum(source, last)
+    before = np.floor(source).astype(np.int64)
+    after = np.minimum(before + 1, last)
+    weight = (source - before).astype(np.float32)[:, :, None, None, None]
+
+    rows = np.arange(batch)[:, None]
+    warped = points[rows, before] * (1.0 - weight) + points[rows, after] * weight
+    nearest = np.where(weight[:, :, 0, 0, 0] < 0.5, before, after)
+    warped_handedness = handedness[rows, nearest]
+
+    # A hand that is missing at either end of the interval has no valid interpolation
+    missing = (handedness[rows, before] == HANDEDNESS_NONE) | (handedness[rows, after] == HANDEDNESS_NONE)
+    warped_handedness[missing] = HANDEDNESS_NONE
+
+    padding = np.arange(frames)[None, :] >= new_lengths[:, None]
+    warped_handedness[padding] = HANDEDNESS_NONE
+
+    warped_timestamps = None
+    if timestamps is not None and frames:
+        time_weight = weight[:, :, 0, 0, 0]
+        sampled = timestamps[rows, before] * (1.0 - time_weight) + timestamps[rows, after] * time_weight
+        start = timestamps[:, :1]
+        warped_timestamps = start + (sampled - start) / speeds[:, None]
+    elif timestamps is not None:
+        warped_timestamps = np.array(timestamps, dtype=np.float64)
+    return warped, warped_handedness, new_lengths, warped_timestamps
+
+def augment_batch(points, handedness, lengths=None, rng=None, mirror_prob=0.5, max_rotation=15.0,
+                  max_tilt=10.0, scale_range=(0.9, 1.1), max_shift=0.05, jitter_std=0.003,
+                  max_time_warp=0.2, dropout_prob=0.05, timestamps=None):
+    """
+    Augments a whole batch of landmark sequences at once. Every sequence gets its own random
+    parameters, drawn in one call per transform.
+
+    Args:
+        points (numpy.ndarray): (B, T, hands, 21, 3) landmarks.
+        handedness (numpy.ndarray): (B, T, hands) handedness codes.
+        lengths (numpy.ndarray): (B,) number of valid frames per sequence (default: all T).
+        rng (numpy.random.Generator): Random generator (default: a fresh unseeded one).
+        mirror_prob (float): Probability of mirroring a sequence.
+        max_rotation (float): Maximum in-plane rotation in degrees.
+        max_tilt (float): Maximum out-of-plane rotation in degrees (0 for 2D rotation only).
+        scale_range (tuple): Range of the scale factor.
+        max_shift (float): Maximum translation in normalized image coordinates.
+        jitter_std (float): Standard deviation of the per-landmark noise.
+        max_time_warp (float): Maximum relative change of the playback speed.
+        dropout_prob (float): Probability of a frame losing its hands, as on a tracking miss.
+        timestamps (numpy.ndarray): Optional (B, T) frame times in seconds, warped with the points.
+
+    Returns:
+        tuple: The augmented points (float32), handedness, lengths and timestamps (None if not given).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    points = np.array(points, dtype=np.float32)
+    handedness = np.array(handedness, dtype=np.int8)
+    batch, frames = points.shape[:2]
+    lengths = np.full(batch, frames) if lengths is None else np.asarray(lengths)
+
+    if mirror_prob > 0:
+        mirror(points, handedness, rng.random(batch) < mirror_prob)
+
+    matrices = rotation_matrices(
+        np.radians(rng.uniform(-max_rotation, max_rotation, batch)),
+        np.radians(rng.uniform(-max_tilt, max_tilt, batch)),
+        np.radians(rng.uniform(-max_tilt, max_tilt, batch)),
+    )
+    scales = rng.uniform(scale_range[0], scale_range[1], batch).astype(np.float32)
+    shifts = np.zeros((batch, 3), dtype=np.float32)
+    shifts[:, :2] = rng.uniform(-max_shift, max_shift, (batch, 2))
+    points = transform(points, matrices, scales, shifts)
+
+    if jitter_std > 0:
+        points += rng.normal(0.0, jitter_std, points.shape).astype(np.float32)
+
+    if timestamps is not None:
+        timestamps = np.array(timestamps, dtype=np.float64)
+    if max_time_warp > 0:
+        speeds = rng.uniform(1.0 - max_time_warp, 1.0 + max_time_warp, batch)
+        points, handedness, lengths, timestamps = time_warp(points, handedness, lengths, speeds, timestamps)
+
+    if dropout_prob > 0:
+        handedness[rng.random((batch, frames)) < dropout_prob] = HANDEDNESS_NONE
+
+    # Keep empty slots at zero, as the tracker leaves them
+    points *= (handedness != HANDEDNESS_NONE)[..., None, None]
+    return points.astype(np.float32, copy=False), handedness, lengths, timestamps
+
+def augment_landmark_sequences(input_dir, output_dir, augment_count=5, seed=None, batch_size=64, **kwargs):
+    """
+    Augments every landmark sequence (*.landmarks.npz) below the input directory and saves the
+    original and augmented versions in the output directory, keeping the label subdirectories.
+
+    Args:
+        input_dir (str): Directory containing the recorded sequences.
+        output_dir (str): Directory where the sequences will be stored.
+        augment_count (int): Number of augmented versions to generate per sequence.
+        seed (int): Optional seed, the same seed and files always give the same output.
+        batch_size (int): Number of source sequences augmented per vectorized call.
+        **kwargs: Passed on to augment_batch.
+
+    Returns:
+        int: Number of augmented sequences written.
+    """
+    if not os.path.exists(input_dir):
+        print(f"Error: Input directory not found at {input_dir}")
+        return 0
+
+    paths = sorted(glob.glob(os.path.join(input_dir, "**", "*.landmarks.npz"), recursive=True))
+    if not paths:
+        print(f"Warning: No landmark sequences found in {input_dir}")
+        return 0
+
+    rng = np.random.default_rng(seed)
+    written = 0
+    start_time = time.perf_counter()
+
+    for start in range(0, len(paths), batch_size):
+        batch_paths = paths[start:start + batch_size]
+        sequences = [load_landmark_sequence(path) for path in batch_paths]
+        points, handedness, lengths = pad_sequences([(s["points"], s["handedness"]) for s in sequences])
+        timestamps = np.zeros(points.shape[:2], dtype=np.float64)
+        for i, sequence in enumerate(sequences):
+            timestamps[i, :lengths[i]] = sequence["timestamps"]
+
+        # Every source sequence is repeated augment_count times and augmented in one call
+        aug_points, aug_handedness, aug_lengths, aug_timestamps = augment_batch(
+            np.repeat(points, augment_count, axis=0), np.repeat(handedness, augment_count, axis=0),
+            np.repeat(lengths, augment_count), rng=rng, timestamps=np.repeat(timestamps, augment_count, axis=0),
+            **kwargs
+        )
+
+        for i, (path, sequence) in enumerate(zip(batch_paths, sequences)):
+            output_path = os.path.join(output_dir, os.path.relpath(path, input_dir))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            base_path = output_path[:-len(".landmarks.npz")]
+            save_sequence(output_path, sequence["points"], sequence["handedness"], sequence["timestamps"],
+                          sequence["scores"])
+
+            for j in range(augment_count):
+                k = i * augment_count + j
+                length = aug_lengths[k]
+                save_sequence(f"{base_path}_aug{j + 1}.landmarks.npz", aug_points[k, :length],
+                              aug_handedness[k, :length], aug_timestamps[k, :length])
+                written += 1
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Augmented {len(paths)} sequences into {written} in {elapsed:.2f}s "
+          f"({written / max(elapsed, 1e-9):.0f} sequences/s)")
+    return written
+
+def save_sequence(path, points, handedness, timestamps, scores=None, dtype=np.float16):
+    """
+    Saves a sequence in the format of LandmarkSequence.save. Without scores (augmented frames),
+    every present hand gets a score of 1.
+    """
+    if scores is None:
+        scores = np.where(handedness != HANDEDNESS_NONE, 1.0, 0.0)
+    np.savez_compressed(
+        path,
+        points=points.astype(dtype),
+        handedness=handedness,
+        scores=scores.astype(dtype),
+        timestamps=np.asarray(timestamps, dtype=np.float64),
+    )
+
+if __name__ == "__main__":
+    # Example usage
+    augment_landmark_sequences(input_dir="datasets", output_dir="augmented_landmarks", augment_count=10, seed=42)
@@ -0,0 +1,347 @@
+#This script caches the hand landmarks of dataset files so MediaPipe only runs on new or changed files
+import glob
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from landmark_utils import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, HandLandmarksUtil, extract_file_landmarks
+
+INDEX_VERSION = 2
+
+# Shards are rewritten once more than this many exist, or once most of their frames are dead
+MAX_SHARDS = 16
+
+SHARD_FILE_PATTERN = re.compile(r"shard_(\d+)_\w+\.npy$")
+
+class LandmarkCache:
+    """
+    Persistent per-file landmark cache stored as memory-mapped .npy shards with a JSON index.
+
+    Every cached file owns a contiguous run of frames in one shard. Lookups return slices of the
+    memory-mapped shard, so nothing is copied or read from disk until the data is used. New entries
+    are staged in memory and written as a new shard on flush(). The cache assumes a single writer.
+
+    When a file changes, its old entry is dropped on the next flush. Shards without live entries
+    are deleted, and the live entries are rewritten into one shard when too many shards exist or
+    most of the stored frames are dead.
+    """
+    def __init__(self, cache_dir, settings, use_content_hash=False):
+        """
+        Opens or creates the cache for a given set of tracker settings.
+
+        Args:
+            cache_dir (str): Root directory of the cache.
+            settings (dict): Tracker settings the landmarks depend on. Each distinct set of
+                settings gets its own subdirectory, so changing them never returns stale data.
+            use_content_hash (bool): If True, files are keyed by the SHA-1 of their content.
+                Otherwise they are keyed by absolute path, size and modification time, which
+                avoids reading the file.
+        """
+        self.settings = settings
+        self.use_content_hash = use_content_hash
+
+        settings_json = json.dumps(settings, sort_keys=True)
+        settings_key = hashlib.sha1(settings_json.encode("utf-8")).hexdigest()[:12]
+        self.cache_dir = os.path.join(cache_dir, settings_key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.index = self._load_index()
+
+        self._shards = {}
+        self._pending = {}
+
+    def _load_index(self):
+        """Loads the index, starting a new one if it is missing or from another version."""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as index_file:
+                index = json.load(index_file)
+            if index.get("version") == INDEX_VERSION:
+                return index
+            print(f"Warning: Ignoring landmark cache index with unknown version at {self.index_path}")
+
+        return {"version": INDEX_VERSION, "settings": self.settings, "shard_count": 0, "shards": {}, "entries": {}}
+
+    def file_key(self, file_path):
+        """
+        Computes the cache key of a file.
+
+        Args:
+            file_path (str): Path to the file.
+
+        Returns:
+            str: The key under which the file's landmarks are stored.
+        """
+        if self.use_content_hash:
+            digest = hashlib.sha1()
+            with open(file_path, "rb") as media_file:
+                for block in iter(lambda: media_file.read(1 << 20), b""):
+                    digest.update(block)
+            return f"sha1:{digest.hexdigest()}"
+
+        stat = os.stat(file_path)
+        return f"stat:{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _shard(self, shard_id):
+        """Returns the memory-mapped points, handedness and scores arrays of a shard."""
+        if shard_id not in self._shards:
+            prefix = os.path.join(self.cache_dir, f"shard_{shard_id:05d}")
+            self._shards[shard_id] = (
+                np.load(f"{prefix}_points.npy", mmap_mode="r"),
+                np.load(f"{prefix}_handedness.npy", mmap_mode="r"),
+                np.load(f"{prefix}_scores.npy", mmap_mode="r"),
+            )
+        return self._shards[shard_id]
+
+    def get(self, file_path, key=None):
+        """
+        Looks up the landmarks of a file.
+
+        Args:
+            file_path (str): Path to the file.
+            key (str): Precomputed key of the file, to avoid computing it twice.
+
+        Returns:
+            tuple: (points, handedness, scores) views of shape (frames, hands, 21, 3),
+                (frames, hands) and (frames, hands), or None if the file is not cached or has changed.
+        """
+        if key is None:
+            key = self.file_key(file_path)
+
+        if key in self._pending:
+            return self._pending[key][1:]
+
+        entry = self.index["entries"].get(key)
+        if entry is None:
+            return None
+
+        start, end = entry["start"], entry["start"] + entry["length"]
+        return tuple(array[start:end] for array in self._shard(entry["shard"]))
+
+    def put(self, file_path, points, handedness, scores=None, key=None):
+        """
+        Stages the landmarks of a file. They are written to disk on the next flush().
+
+        Args:
+            file_path (str): Path to the file.
+            points (numpy.ndarray): float32 array of shape (frames, hands, 21, 3).
+            handedness (numpy.ndarray): int8 array of shape (frames, hands).
+            scores (numpy.ndarray): Optional float32 handedness scores of shape (frames, hands).
+            key (str): Precomputed key of the file.
+        """
+        if key is None:
+            key = self.file_key(file_path)
+        handedness = np.asarray(handedness, dtype=np.int8)
+        scores = np.zeros(handedness.shape, dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32)
+        self._pending[key] = (file_path, np.asarray(points, dtype=np.float32), handedness, scores)
+
+    def flush(self):
+        """
+        Writes all staged entries into a new shard, drops the entries they replace, removes or
+        compacts dead shards and saves the index.
+        """
+        if not self._pending:
+            return
+
+        entries = self._write_shard([(key,) + value for key, value in self._pending.items()])
+
+        # A file that changed gets a new key, the entry under its old key is now dead
+        new_paths = {entry["path"] for entry in entries.values()}
+        self.index["entries"] = {
+            key: entry for key, entry in self.index["entries"].items()
+            if key in entries or entry["path"] not in new_paths
+        }
+        self.index["entries"].update(entries)
+        self._pending.clear()
+
+        live = self._live_frames()
+        stored = sum(self.index["shards"].values())
+        if len(live) > MAX_SHARDS or stored > 2 * sum(live.values()):
+            self.compact()
+        else:
+            self.index["shards"] = {shard: frames for shard, frames in self.index["shards"].items() if shard in live}
+            self._save_index()
+            self._remove_dead_shards()
+
+    def _write_shard(self, items):
+        """
+        Writes (key, path, points, handedness, scores) items as the next shard.
+
+        Returns:
+            dict: The index entries of the items.
+        """
+        shard_id = self.index["shard_count"]
+        prefix = os.path.join(self.cache_dir, f"shard_{shard_id:05d}")
+
+        entries = {}
+        start = 0
+        for key, file_path, points, _, _ in items:
+            entries[key] = {"path": file_path, "shard": shard_id, "start": start, "length": len(points)}
+            start += len(points)
+
+        _save_atomic(f"{prefix}_points.npy", np.concatenate([item[2] for item in items]))
+        _save_atomic(f"{prefix}_handedness.npy", np.concatenate([item[3] for item in items]))
+        _save_atomic(f"{prefix}_scores.npy", np.concatenate([item[4] for item in items]))
+
+        self.index["shard_count"] = shard_id + 1
+        self.index["shards"][str(shard_id)] = start
+        return entries
+
+    def _live_frames(self):
+        """Returns the number of frames still referenced by the index, per shard id (as str)."""
+        live = {}
+        for entry in self.index["entries"].values():
+            shard = str(entry["shard"])
+            live[shard] = live.get(shard, 0) + entry["length"]
+        return live
+
+    def compact(self):
+        """Rewrites every live entry into a single new shard and deletes the old shards."""
+        if not self.index["entries"]:
+            self.index["shards"] = {}
+        else:
+            items = []
+            for key, entry in self.index["entries"].items():
+                points, handedness, scores = self.get(entry["path"], key)
+                items.append((key, entry["path"], np.array(points), np.array(handedness), np.array(scores)))
+            self.index["shards"] = {}
+            self.index["entries"] = self._write_shard(items)
+
+        # The new index must be on disk before the shards it no longer uses are deleted
+        self._save_index()
+        self._remove_dead_shards()
+
+    def _remove_dead_shards(self):
+        """Deletes the shard files the index no longer references."""
+        live = {int(shard) for shard in self.index["shards"]}
+        for shard_id in [shard_id for shard_id in self._shards if shard_id not in live]:
+            del self._shards[shard_id]
+
+        for path in glob.glob(os.path.join(self.cache_dir, "shard_*.npy")):
+            match = SHARD_FILE_PATTERN.search(os.path.basename(path))
+            if match and int(match.group(1)) not in live:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still mapped by a caller on some platforms, retried on the next flush
+                    pass
+
+    def _save_index(self):
+        """Writes the index through a temporary file so it is never left half-written."""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(tmp_path, self.index_path)
+
+    def get_or_extract(self, file_paths, extract_fn):
+        """
+        Returns the landmarks of many files, extracting only the ones that are not cached yet.
+
+        Args:
+            file_paths (list): Paths of the files to look up.
+            extract_fn (callable): Called as extract_fn(file_path) for every missing file and must
+                return (points, handedness, scores), or (None, None, None) if the file cannot be read.
+
+        Returns:
+            dict: Maps each readable file path to its (points, handedness, scores) arrays.
+        """
+        results = {}
+        extracted = 0
+
+        for file_path in file_paths:
+            key = self.file_key(file_path)
+            cached = self.get(file_path, key)
+            if cached is None:
+                points, handedness, scores = extract_fn(file_path)
+                if points is None:
+                    print(f"Warning: Could not extract landmarks from {file_path}")
+                    continue
+                self.put(file_path, points, handedness, scores, key)
+                extracted += 1
+            results[file_path] = key
+
+        self.flush()
+        print(f"Landmark cache: {len(results) - extracted} cached, {extracted} extracted.")
+        return {file_path: self.get(file_path, key) for file_path, key in results.items()}
+
+    def __contains__(self, file_path):
+        key = self.file_key(file_path)
+        return key in self._pending or key in self.index["entries"]
+
+    def __len__(self):
+        return len(self.index["entries"]) + len(self._pending)
+
+def _save_atomic(path, array):
+    """Saves an array through a temporary file that is renamed into place."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as array_file:
+        np.save(array_file, array)
+    os.replace(tmp_path, path)
+
+def find_media_files(dataset_dir):
+    """
+    Finds every image and video below a dataset directory.
+
+    Args:
+        dataset_dir (str): Root of a dataset, split dataset or augmented dataset tree.
+
+    Returns:
+        list: Sorted paths of the media files.
+    """
+    media_files = []
+    for root, _, files in os.walk(dataset_dir):
+        for file_name in files:
+            file_ext = os.path.splitext(file_name)[1].lower()
+            if file_ext in IMAGE_EXTENSIONS or file_ext in VIDEO_EXTENSIONS:
+                media_files.append(os.path.join(root, file_name))
+    return sorted(media_files)
+
+def cache_dataset(dataset_dir, cache_dir="landmark_cache", max_num_hands=2, min_detection_confidence=0.5,
+                  min_tracking_confidence=0.5, use_content_hash=False):
+    """
+    Extracts and caches the landmarks of every image and video in a dataset directory.
+
+    Only files that are new or changed since the last run go through MediaPipe.
+
+    Args:
+        dataset_dir (str): Root of the dataset tree.
+        cache_dir (str): Root directory of the cache.
+        max_num_hands (int): Maximum number of hands to detect.
+        min_detection_confidence (float): Minimum confidence for hand detection.
+        min_tracking_confidence (float): Minimum confidence for hand tracking in videos.
+        use_content_hash (bool): Key files by content hash instead of path, size and mtime.
+
+    Returns:
+        dict: Maps each readable file path to its (points, handedness, scores) arrays.
+    """
+    if not os.path.exists(dataset_dir):
+        print(f"Error: Dataset directory not found at {dataset_dir}")
+        return {}
+
+    settings = {
+        "max_num_hands": max_num_hands,
+        "min_detection_confidence": min_detection_confidence,
+        "min_tracking_confidence": min_tracking_confidence,
+    }
+    cache = LandmarkCache(cache_dir, settings, use_content_hash)
+
+    # Both detectors are only built if a file actually needs extracting
+    utils = {}
+
+    def extract(file_path):
+        static = os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
+        if static not in utils:
+            utils[static] = HandLandmarksUtil(static_image_mode=static, max_num_hands=max_num_hands,
+                                              min_detection_confidence=min_detection_confidence,
+                                              min_tracking_confidence=min_tracking_confidence)
+        return extract_file_landmarks(file_path, utils[static])
+
+    return cache.get_or_extract(find_media_files(dataset_dir), extract)
+
+if __name__ == "__main__":
+    # Example usage
+    landmarks = cache_dataset(dataset_dir="split_dataset", cache_dir="landmark_cache")
+    print(f"Landmarks available for {len(landmarks)} files.")
@@ -0,0 +1,252 @@
+#This script talks to landmark_service.py and generates load against it to measure latency and throughput
+import argparse
+import base64
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from landmark_service import (OPCODE_BINARY, OPCODE_CLOSE, OPCODE_TEXT, decode_binary, read_ws_message,
+                              websocket_accept, write_ws_message)
+
+class LandmarkClient:
+    """
+    HTTP client of the landmark service. The connection is kept alive between requests.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, timeout=30.0):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def detect(self, jpeg, response_format="binary", session=None):
+        """
+        Sends one JPEG or PNG encoded frame.
+
+        Args:
+            jpeg (bytes): The encoded frame.
+            response_format (str): "binary" or "json".
+            session (str): Optional session id, so consecutive frames keep their tracking state.
+
+        Returns:
+            tuple or dict: (handedness, scores, points) for binary responses, the parsed document
+                for JSON responses.
+        """
+        path = f"/landmarks?format={response_format}" + (f"&session={session}" if session else "")
+        self.connection.request("POST", path, body=jpeg, headers={"Content-Type": "image/jpeg"})
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Request failed with status {response.status}: {body[:200]!r}")
+        return decode_binary(body) if response_format == "binary" else json.loads(body)
+
+    def metrics(self):
+        """Returns the metrics of the service."""
+        self.connection.request("GET", "/metrics")
+        return json.loads(self.connection.getresponse().read())
+
+    def close(self):
+        self.connection.close()
+
+class WebSocketSession:
+    """
+    WebSocket session with the landmark service. The service keeps a tracker for the session,
+    so frames should be sent in order.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, response_format="binary", timeout=30.0):
+        self.response_format = response_format
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile("rb")
+        self.wfile = self.sock.makefile("wb")
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        self.wfile.write((
+            f"GET /ws?format={response_format} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            f"Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+            f"Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("ascii"))
+        self.wfile.flush()
+
+        status = self.rfile.readline()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if b" 101 " not in status or headers.get("sec-websocket-accept") != websocket_accept(key):
+            raise ConnectionError(f"WebSocket handshake failed: {status!r}")
+
+    def detect(self, jpeg):
+        """
+        Sends one encoded frame and waits for its landmarks.
+
+        Returns:
+            tuple or dict: See LandmarkClient.detect.
+        """
+        write_ws_message(self.wfile, OPCODE_BINARY, jpeg, mask=True)
+        opcode, payload = read_ws_message(self.rfile)
+        if opcode is None or opcode == OPCODE_CLOSE:
+            raise ConnectionError("The service closed the session.")
+        if opcode == OPCODE_TEXT:
+            document = json.loads(payload)
+            if "error" in document:
+                raise RuntimeError(document["error"])
+            return document
+        return decode_binary(payload)
+
+    def close(self):
+        try:
+            write_ws_message(self.wfile, OPCODE_CLOSE, b"", mask=True)
+        except OSError:
+            pass
+        self.sock.close()
+
+def load_frames(video_path=None, count=30, size=(640, 480), quality=90):
+    """
+    Encodes the frames sent by the load generator, once up front so encoding is not measured.
+
+    Args:
+        video_path (str): Video to take the frames from. Without it, synthetic frames are used.
+        count (int): Maximum number of frames.
+        size (tuple): Size (width, height) of the synthetic frames.
+        quality (int): JPEG quality.
+
+    Returns:
+        list: JPEG encoded frames.
+    """
+    frames = []
+    if video_path is not None:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            print(f"Warning: Could not read frames from {video_path}, using synthetic frames.")
+
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [cv2.GaussianBlur(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8), (9, 9), 0)
+                  for _ in range(count)]
+
+    return [cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes() for frame in frames]
+
+def run_load(host="127.0.0.1", port=8765, clients=8, requests=100, mode="ws", response_format="binary",
+             video_path=None):
+    """
+    Runs concurrent clients against the service, each sending its frames back to back.
+
+    Args:
+        host (str): Service address.
+        port (int): Service port.
+        clients (int): Number of concurrent clients.
+        requests (int): Number of frames sent by each client.
+        mode (str): "ws" for WebSocket sessions, "http" for stateless HTTP requests.
+        response_format (str): "binary" or "json".
+        video_path (str): Optional video to take the frames from.
+
+    Returns:
+        dict: Client-side throughput and latency percentiles, errors, and the service metrics
+            (None if unavailable), or None if a client could not connect.
+    """
+    frames = load_frames(video_path)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    barrier = threading.Barrier(clients + 1)
+
+    def client_loop(index):
+        try:
+            if mode == "ws":
+                client = WebSocketSession(host, port, response_format)
+                send = client.detect
+            else:
+                client = LandmarkClient(host, port)
+                send = lambda jpeg: client.detect(jpeg, response_format)
+        except (ConnectionError, OSError) as e:
+            print(f"Error: Client {index} could not connect: {e}")
+            # Release every other thread waiting at the barrier
+            barrier.abort()
+            return
+
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            client.close()
+            return
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                send(frames[(index + i) % len(frames)])
+                latencies[index].append(time.perf_counter() - start)
+            except (RuntimeError, ConnectionError, OSError) as e:
+                errors[index] += 1
+                if errors[index] == 1:
+                    print(f"Error: Client {index}: {e}")
+        client.close()
+
+    threads = [threading.Thread(target=client_loop, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        for thread in threads:
+            thread.join()
+        print(f"Error: Could not connect all clients to {host}:{port}.")
+        return None
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+
+    samples = np.array([latency for client in latencies for latency in client]) * 1000.0
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+    metrics_client = LandmarkClient(host, port)
+    try:
+        service_metrics = metrics_client.metrics()
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read the service metrics: {e}")
+        service_metrics = None
+    metrics_client.close()
+
+    return {
+        "mode": mode,
+        "clients": clients,
+        "requests": int(len(samples)),
+        "errors": sum(errors),
+        "elapsed_s": elapsed,
+        "requests_per_second": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "service": service_metrics,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate load against the landmark service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Service address")
+    parser.add_argument("--port", type=int, default=8765, help="Service port")
+    parser.add_argument("--clients", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="Frames sent by each client")
+    parser.add_argument("--mode", choices=["ws", "http"], default="ws", help="WebSocket sessions or HTTP requests")
+    parser.add_argument("--format", choices=["binary", "json"], default="binary", help="Response format")
+    parser.add_argument("--video", default=None, help="Video to take the frames from")
+    args = parser.parse_args()
+
+    result = run_load(args.host, args.port, args.clients, args.requests, args.mode, args.format, args.video)
+    if result is None:
+        exit(1)
+    service = result.pop("service")
+    print(f"{result['requests']} requests from {result['clients']} {result['mode']} clients in {result['elapsed_s']:.2f}s: "
+          f"{result['requests_per_second']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+          f"p99 {result['p99_ms']:.1f} ms, {result['errors']} errors")
+    if service is not None:
+        print(f"Service: mean batch size {service['mean_batch_size']:.2f}, max queue depth {service['max_queue_depth']}, "
+              f"{service['sessions']} sessions, rejected {service['rejected']}")
@@ -0,0 +1,176 @@
+#This script computes normalized hand landmark features for arbitrarily batched arrays in single vectorized calls
+import numpy as np
+
+from landmark_utils import HANDEDNESS_LEFT, HANDEDNESS_NONE, NUM_LANDMARKS
+
+# Landmark indices of the fingertips (thumb to pinky)
+FINGERTIPS = np.array([4, 8, 12, 16, 20])
+
+# Landmark chains from the wrist to each fingertip
+FINGER_CHAINS = np.array([
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+])
+
+# Landmark used with the wrist to measure the hand size (base of the middle finger)
+SCALE_LANDMARK = 9
+
+_TIP_PAIRS = np.triu_indices(len(FINGERTIPS), k=1)
+_JOINT_PREV = FINGER_CHAINS[:, :3].ravel()
+_JOINT = FINGER_CHAINS[:, 1:4].ravel()
+_JOINT_NEXT = FINGER_CHAINS[:, 2:5].ravel()
+
+NUM_TIP_DISTANCES = len(_TIP_PAIRS[0])
+NUM_JOINT_ANGLES = len(_JOINT)
+HAND_FEATURE_SIZE = NUM_LANDMARKS * 3 + NUM_TIP_DISTANCES + NUM_JOINT_ANGLES + 1
+
+def feature_size(num_hands):
+    """Returns the length of the feature vector compute_features produces per frame."""
+    return num_hands * HAND_FEATURE_SIZE
+
+def order_hands(points, handedness):
+    """
+    Reorders the hand slots by handedness (left, right, then empty slots) so each hand always
+    lands in the same slot regardless of MediaPipe's detection order.
+
+    Args:
+        points (numpy.ndarray): (..., hands, 21, 3) landmarks.
+        handedness (numpy.ndarray): (..., hands) handedness codes.
+
+    Returns:
+        tuple: The reordered points and handedness.
+    """
+    key = np.where(handedness == HANDEDNESS_NONE, np.iinfo(np.int8).max, handedness)
+    order = np.argsort(key, axis=-1, kind="stable")
+    points = np.take_along_axis(points, order[..., None, None], axis=-3)
+    handedness = np.take_along_axis(handedness, order, axis=-1)
+    return points, handedness
+
+def wrist_relative(points):
+    """Returns the landmarks relative to the wrist of their hand."""
+    return points - points[..., :1, :]
+
+def mirror_left_hands(relative, handedness):
+    """
+    Mirrors the x axis of left hands in place so both hands share the right hand's frame.
+
+    Args:
+        relative (numpy.ndarray): (..., hands, 21, 3) wrist-relative landmarks.
+        handedness (numpy.ndarray): (..., hands) handedness codes.
+    """
+    relative[..., 0] *= np.where(handedness == HANDEDNESS_LEFT, -1.0, 1.0)[..., None].astype(relative.dtype)
+    return relative
+
+def normalize_scale(relative):
+    """
+    Divides wrist-relative landmarks in place by the 2D wrist to middle finger base distance,
+    which removes the effect of the distance to the camera.
+    """
+    scale = np.linalg.norm(relative[..., SCALE_LANDMARK, :2], axis=-1)
+    scale = np.where(scale < 1e-6, 1.0, scale).astype(relative.dtype)
+    relative /= scale[..., None, None]
+    return relative
+
+def fingertip_distances(points):
+    """
+    Returns the distances between every pair of fingertips.
+
+    Returns:
+        numpy.ndarray: (..., hands, 10) distances.
+    """
+    tips = points[..., FINGERTIPS, :]
+    return np.linalg.norm(tips[..., _TIP_PAIRS[0], :] - tips[..., _TIP_PAIRS[1], :], axis=-1)
+
+def joint_angles(points):
+    """
+    Returns the bending angle at the three inner joints of every finger.
+
+    Returns:
+        numpy.ndarray: (..., hands, 15) angles in radians, pi for a straight joint.
+    """
+    before = points[..., _JOINT_PREV, :] - points[..., _JOINT, :]
+    after = points[..., _JOINT_NEXT, :] - points[..., _JOINT, :]
+    norms = np.linalg.norm(before, axis=-1) * np.linalg.norm(after, axis=-1)
+    cosine = (before * after).sum(axis=-1) / np.maximum(norms, 1e-9)
+    return np.arccos(np.clip(cosine, -1.0, 1.0))
+
+def compute_features(points, handedness, mirror=True, order=True, out=None):
+    """
+    Computes the normalized features of any batch of frames in one vectorized call.
+
+    For each hand slot the features are the wrist-relative, scale-normalized landmarks (63),
+    the pairwise fingertip distances (10), the finger joint angles (15) and a presence flag (1).
+    Empty slots are all zeros.
+
+    Args:
+        points (numpy.ndarray): (..., hands, 21, 3) landmarks, e.g. (batch, T, hands, 21, 3).
+        handedness (numpy.ndarray): (..., hands) handedness codes.
+        mirror (bool): If True, left hands are mirrored into the right hand's frame.
+        order (bool): If True, hand slots are ordered by handedness first.
+        out (numpy.ndarray): Optional C-contiguous float32 array of shape (..., feature_size(hands))
+            to write into.
+
+    Returns:
+        numpy.ndarray: (..., feature_size(hands)) float32 features.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    handedness = np.asarray(handedness)
+    if order:
+        points, handedness = order_hands(points, handedness)
+
+    present = (handedness != HANDEDNESS_NONE).astype(np.float32)
+    relative = wrist_relative(points)
+    if mirror:
+        mirror_left_hands(relative, handedness)
+    normalize_scale(relative)
+    relative *= present[..., None, None]
+
+    leading_shape = points.shape[:-3]
+    num_hands = points.shape[-3]
+    if out is None:
+        out = np.empty(leading_shape + (feature_size(num_hands),), dtype=np.float32)
+    elif not out.flags.c_contiguous:
+        # Reshaping a non-contiguous array copies it, and the features would be lost
+        raise ValueError("out must be C-contiguous")
+
+    per_hand = out.reshape(leading_shape + (num_hands, HAND_FEATURE_SIZE))
+    end = NUM_LANDMARKS * 3
+    per_hand[..., :end] = relative.reshape(leading_shape + (num_hands, end))
+    per_hand[..., end:end + NUM_TIP_DISTANCES] = fingertip_distances(relative)
+    end += NUM_TIP_DISTANCES
+    per_hand[..., end:end + NUM_JOINT_ANGLES] = joint_angles(relative) * present[..., None]
+    per_hand[..., -1] = present
+    return out
+
+def compute_archive_features(archive_path, output_path, chunk_size=65536, **kwargs):
+    """
+    Computes the features of every frame of a batch_extract archive, in chunks so the
+    temporaries stay small. The landmarks of the archive are read into memory in full (.npz
+    members cannot be memory-mapped), while the features are written to a memory-mapped .npy
+    file as they are computed.
+
+    Args:
+        archive_path (str): Archive written by batch_extract.
+        output_path (str): Path of the (frames, features) .npy file to write.
+        chunk_size (int): Number of frames processed per call.
+        **kwargs: Passed on to compute_features.
+
+    Returns:
+        int: Number of frames processed.
+    """
+    with np.load(archive_path) as data:
+        points = data["points"]
+        handedness = data["handedness"]
+
+    features = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32,
+                                         shape=(len(points), feature_size(points.shape[1])))
+    for start in range(0, len(points), chunk_size):
+        end = start + chunk_size
+        compute_features(points[start:end], handedness[start:end], out=features[start:end], **kwargs)
+
+    features.flush()
+    print(f"Features saved: {output_path} ({len(points)} frames)")
+    return len(points)
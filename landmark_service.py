@@ -0,0 +1,575 @@
+#This script serves hand landmarks to other local processes over HTTP and WebSocket so only one process loads MediaPipe
+import argparse
+import base64
+import hashlib
+import json
+import queue
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from hand_track import HandTracker
+from landmark_utils import NUM_LANDMARKS, HandLandmarksUtil
+from profiler import StageProfiler
+
+# Binary response: magic, number of hands, then handedness (int8), scores (float32) and points (float32)
+BINARY_MAGIC = b"LMK1"
+# Raw frame request over WebSocket: magic, width and height (uint16), then the BGR pixels
+RAW_MAGIC = b"RAW0"
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+# Close code sent when a message is larger than the service accepts
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+# Largest request body or WebSocket message accepted, enough for a raw 4K BGR frame
+MAX_FRAME_BYTES = 32 * 1024 * 1024
+
+# Outcomes of LandmarkService.submit, with their HTTP status and error message
+STATUS_OK = "ok"
+STATUS_OVERLOADED = "overloaded"
+STATUS_TOO_MANY_SESSIONS = "too_many_sessions"
+STATUS_TIMEOUT = "timeout"
+STATUS_FAILED = "failed"
+HTTP_STATUS = {
+    STATUS_OVERLOADED: (503, "Service overloaded"),
+    STATUS_TOO_MANY_SESSIONS: (503, "Too many sessions"),
+    STATUS_TIMEOUT: (504, "Inference timed out"),
+    STATUS_FAILED: (500, "Inference failed"),
+}
+
+def encode_binary(handedness, scores, points):
+    """Packs the landmarks of one frame into the compact binary response format."""
+    return b"".join([
+        BINARY_MAGIC, struct.pack("<B", len(points)),
+        handedness.astype(np.int8).tobytes(), scores.astype(np.float32).tobytes(),
+        points.astype(np.float32).tobytes(),
+    ])
+
+def decode_binary(data):
+    """
+    Unpacks a binary response.
+
+    Returns:
+        tuple: (hands,) handedness, (hands,) scores and (hands, 21, 3) points.
+    """
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Not a landmark response.")
+    num_hands = data[4]
+    offset = 5
+    handedness = np.frombuffer(data, dtype=np.int8, count=num_hands, offset=offset)
+    offset += num_hands
+    scores = np.frombuffer(data, dtype=np.float32, count=num_hands, offset=offset)
+    offset += 4 * num_hands
+    points = np.frombuffer(data, dtype=np.float32, count=num_hands * NUM_LANDMARKS * 3, offset=offset)
+    return handedness, scores, points.reshape(num_hands, NUM_LANDMARKS, 3)
+
+def encode_json(handedness, scores, points):
+    """Returns the landmarks of one frame as a JSON document."""
+    return json.dumps({
+        "num_hands": len(points),
+        "handedness": handedness.tolist(),
+        "scores": [round(float(s), 4) for s in scores],
+        "points": np.round(points, 5).tolist(),
+    }).encode("utf-8")
+
+def decode_frame(data, width=None, height=None):
+    """
+    Decodes a request body into a BGR frame. JPEG and PNG are decoded with OpenCV, raw frames
+    are BGR pixels with the size given by the arguments or by a RAW_MAGIC header.
+
+    Returns:
+        numpy.ndarray: The frame, or None if it cannot be decoded.
+    """
+    if data[:4] == RAW_MAGIC and len(data) >= 8:
+        width, height = struct.unpack("<HH", data[4:8])
+        data = memoryview(data)[8:]
+
+    if width and height:
+        if len(data) != width * height * 3:
+            return None
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    if not len(data):
+        return None
+    try:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
+def websocket_accept(key):
+    """Computes the Sec-WebSocket-Accept value of a handshake."""
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+
+def read_ws_message(rfile, max_size=None):
+    """
+    Reads one complete WebSocket message, joining fragmented frames and unmasking the payload.
+
+    Args:
+        rfile: Stream to read from.
+        max_size (int): If set, larger messages raise a ValueError before their payload is read.
+
+    Returns:
+        tuple: (opcode, payload bytes), or (None, None) if the connection closed.
+    """
+    opcode, chunks, total = None, [], 0
+    while True:
+        header = rfile.read(2)
+        if len(header) < 2:
+            return None, None
+        fin, frame_opcode = header[0] & 0x80, header[0] & 0x0F
+        masked, length = header[1] & 0x80, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", rfile.read(8))[0]
+        total += length
+        if max_size is not None and total > max_size:
+            raise ValueError(f"WebSocket message larger than {max_size} bytes.")
+        mask = rfile.read(4) if masked else None
+        payload = rfile.read(length)
+        if len(payload) < length:
+            return None, None
+
+        if mask:
+            unmasked = np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)
+            payload = unmasked.tobytes()
+
+        # Control frames may arrive between the fragments of a message
+        if frame_opcode >= OPCODE_CLOSE:
+            return frame_opcode, payload
+        if frame_opcode != OPCODE_CONTINUATION:
+            opcode = frame_opcode
+        chunks.append(payload)
+        if fin:
+            return opcode, b"".join(chunks)
+
+def write_ws_message(wfile, opcode, payload, mask=False):
+    """Writes one unfragmented WebSocket message. Clients must set mask=True."""
+    length = len(payload)
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack(">H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack(">Q", length)
+
+    if mask:
+        key = np.random.bytes(4)
+        header += key
+        payload = (np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(key, dtype=np.uint8), length)).tobytes()
+    wfile.write(bytes(header) + payload)
+    wfile.flush()
+
+class _Request:
+    """One frame waiting for inference."""
+    __slots__ = ("frame", "session", "enqueued", "deadline", "done", "result", "status")
+
+    def __init__(self, frame, session, timeout):
+        self.frame = frame
+        self.session = session
+        self.enqueued = time.perf_counter()
+        # Past the deadline nobody waits for the result, so the frame is dropped unprocessed
+        self.deadline = self.enqueued + timeout
+        self.done = threading.Event()
+        self.result = None
+        self.status = STATUS_FAILED
+
+class LandmarkService:
+    """
+    Runs every inference on a single thread that owns the models.
+
+    Requests from all connections go through one queue. The inference thread drains everything
+    pending in one pass, so under load many requests are served per wake-up. MediaPipe Hands
+    has no multi-image API, so the frames of a batch still run one after the other.
+
+    Stateless requests use a shared static image mode detector. A session (a WebSocket
+    connection, or HTTP requests with the same session parameter) gets its own tracker in
+    tracking mode, which keeps the tracking state between its frames. Every session holds its
+    own MediaPipe model, so their number is capped. Trackers are only created and released by
+    the inference thread, closed sessions hand theirs over to it.
+    """
+    def __init__(self, max_num_hands=2, max_queue=256, max_batch=32, session_timeout=60.0, inference_width=None,
+                 max_sessions=32, max_frame_bytes=MAX_FRAME_BYTES):
+        """
+        Args:
+            max_num_hands (int): Maximum number of hands to detect per frame.
+            max_queue (int): Maximum number of pending frames. Further requests are rejected.
+            max_batch (int): Maximum number of requests handled per pass of the inference thread.
+            session_timeout (float): Seconds of inactivity after which a session is dropped.
+            inference_width (int): If set, session frames are downscaled to this width for inference.
+            max_sessions (int): Maximum number of open sessions. Frames of new sessions are
+                rejected until an existing one is closed or times out.
+            max_frame_bytes (int): Largest request body or WebSocket message accepted.
+        """
+        self.max_num_hands = max_num_hands
+        self.max_batch = max_batch
+        self.max_sessions = max_sessions
+        self.max_frame_bytes = max_frame_bytes
+        self.session_timeout = session_timeout
+        self.inference_width = inference_width
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._static = HandLandmarksUtil(static_image_mode=True, max_num_hands=max_num_hands)
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        # Trackers of closed sessions, released by the inference thread
+        self._retired = []
+
+        self._profiler = StageProfiler()
+        self._metrics_lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LandmarkInference", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, session=None, timeout=10.0):
+        """
+        Queues a frame and waits for its landmarks.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+            session (str): Session id, or None for a stateless request.
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            str: One of the STATUS_* values.
+            tuple: (handedness, scores, points) of the detected hands if the status is STATUS_OK,
+                otherwise None.
+        """
+        if session is not None and not self._open_session(session):
+            with self._metrics_lock:
+                self.rejected += 1
+            return STATUS_TOO_MANY_SESSIONS, None
+
+        request = _Request(frame, session, timeout)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._metrics_lock:
+                self.rejected += 1
+            return STATUS_OVERLOADED, None
+
+        with self._metrics_lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        if not request.done.wait(timeout):
+            return STATUS_TIMEOUT, None
+
+        with self._metrics_lock:
+            self.requests += 1
+            self._profiler.record("request", request.enqueued)
+            self._profiler.frame_done()
+        return request.status, request.result
+
+    def _open_session(self, session):
+        """Registers a session if it is new and the limit allows it. Returns False if it does not."""
+        with self._sessions_lock:
+            entry = self._sessions.get(session)
+            if entry is None:
+                if len(self._sessions) >= self.max_sessions:
+                    return False
+                # The tracker is built by the inference thread, which owns the models
+                entry = self._sessions[session] = [None, 0.0]
+            entry[1] = time.monotonic()
+            return True
+
+    def _tracker(self, session):
+        """Returns the tracker of a session, creating it on first use."""
+        with self._sessions_lock:
+            entry = self._sessions.get(session)
+            if entry is None:
+                # Closed while the frame was queued, the frame still gets a tracker of its own
+                entry = self._sessions[session] = [None, 0.0]
+            if entry[0] is None:
+                entry[0] = HandTracker(max_num_hands=self.max_num_hands, inference_width=self.inference_width, shared=False)
+            entry[1] = time.monotonic()
+            return entry[0]
+
+    def close_session(self, session):
+        """
+        Drops a session. Its tracker may still be running a frame, so it is handed over to the
+        inference thread, which releases it on its next pass.
+        """
+        with self._sessions_lock:
+            entry = self._sessions.pop(session, None)
+            if entry is not None and entry[0] is not None:
+                self._retired.append(entry[0])
+
+    def _release_retired(self):
+        """Releases the trackers of closed sessions. Only called by the inference thread."""
+        with self._sessions_lock:
+            retired, self._retired = self._retired, []
+        for tracker in retired:
+            tracker.release()
+
+    def _expire_sessions(self):
+        now = time.monotonic()
+        with self._sessions_lock:
+            expired = [s for s, entry in self._sessions.items() if now - entry[1] > self.session_timeout]
+        for session in expired:
+            self.close_session(session)
+
+    def _run(self):
+        """Inference thread: drains the queue in batches until close() is called."""
+        last_expiry = time.monotonic()
+        while self._running:
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch and batch[0] is not None:
+                with self._metrics_lock:
+                    self.batches += 1
+                    self._profiler.record("queue_wait", batch[0].enqueued)
+
+            for request in batch:
+                if request is None:
+                    continue
+                start = time.perf_counter()
+                if start > request.deadline:
+                    # submit() already returned STATUS_TIMEOUT
+                    request.status = STATUS_TIMEOUT
+                    request.done.set()
+                    continue
+                try:
+                    if request.session is None:
+                        arrays, _ = self._static.process_frame(request.frame, as_array=True, draw=False)
+                    else:
+                        _, arrays = self._tracker(request.session).process_frame(request.frame, as_array=True, draw=False)
+                    count = arrays.num_hands
+                    request.result = (arrays.handedness[:count].copy(), arrays.scores[:count].copy(),
+                                      arrays.points[:count].copy())
+                    request.status = STATUS_OK
+                except Exception as e:
+                    print(f"Error: Inference failed: {e}")
+                with self._metrics_lock:
+                    self._profiler.record("inference", start)
+                request.done.set()
+
+            if time.monotonic() - last_expiry > 5.0:
+                self._expire_sessions()
+                last_expiry = time.monotonic()
+            self._release_retired()
+
+    def metrics(self):
+        """
+        Returns the service metrics.
+
+        Returns:
+            dict: Request, batch and rejection counters, current and maximum queue depth,
+                active sessions, and request, queue wait and inference latency percentiles.
+        """
+        with self._metrics_lock:
+            summary = self._profiler.summary()
+            metrics = {
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests_per_second": summary["fps"],
+                "latency": summary["stages"],
+            }
+        with self._sessions_lock:
+            metrics["sessions"] = len(self._sessions)
+        return metrics
+
+    def close(self):
+        """Stops the inference thread and releases every model."""
+        self._running = False
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join()
+        for session in list(self._sessions):
+            self.close_session(session)
+        self._release_retired()
+        self._static.release()
+
+class LandmarkRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+        POST /landmarks?format=json|binary&session=<id>   JPEG/PNG body, or raw BGR pixels with
+                                                          X-Width and X-Height headers
+        GET  /ws?format=json|binary                       WebSocket session, one frame per message
+        GET  /metrics                                     Service metrics as JSON
+        GET  /health                                      Liveness check
+    """
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the cost of small requests
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            self._send(200, json.dumps(self.service.metrics()).encode("utf-8"))
+        elif url.path == "/health":
+            self._send(200, b'{"status": "ok"}')
+        elif url.path == "/ws":
+            self._websocket(parse_qs(url.query).get("format", ["binary"])[0])
+        else:
+            self._send_error(404, "Not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/landmarks":
+            self._send_error(404, "Not found")
+            return
+
+        params = parse_qs(url.query)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            width, height = int(self.headers.get("X-Width", 0)), int(self.headers.get("X-Height", 0))
+            if length < 0 or width < 0 or height < 0:
+                raise ValueError
+        except ValueError:
+            self.close_connection = True
+            self._send_error(400, "Content-Length, X-Width and X-Height must be non-negative integers")
+            return
+        if length > self.service.max_frame_bytes:
+            # The body is never read, so the connection cannot be reused
+            self.close_connection = True
+            self._send_error(413, f"Frames are limited to {self.service.max_frame_bytes} bytes")
+            return
+
+        body = self.rfile.read(length)
+        frame = decode_frame(body, width, height)
+        if frame is None:
+            self._send_error(400, "Could not decode the frame")
+            return
+
+        status, result = self.service.submit(frame, session=params.get("session", [None])[0])
+        if status != STATUS_OK:
+            self._send_error(*HTTP_STATUS[status])
+        elif params.get("format", ["json"])[0] == "binary":
+            self._send(200, encode_binary(*result), "application/octet-stream")
+        else:
+            self._send(200, encode_json(*result))
+
+    def _websocket(self, response_format):
+        """Runs a WebSocket session until the client disconnects."""
+        key = self.headers.get("Sec-WebSocket-Key")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+            self._send_error(400, "Expected a WebSocket upgrade")
+            return
+
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", websocket_accept(key))
+        self.end_headers()
+        self.wfile.flush()
+
+        session = uuid.uuid4().hex
+        try:
+            while True:
+                opcode, payload = read_ws_message(self.rfile, self.service.max_frame_bytes)
+                if opcode is None or opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    write_ws_message(self.wfile, OPCODE_PONG, payload)
+                    continue
+                if opcode not in (OPCODE_BINARY, OPCODE_TEXT):
+                    continue
+
+                frame = decode_frame(payload)
+                if frame is None:
+                    status, result, error = None, None, "Could not decode the frame"
+                else:
+                    status, result = self.service.submit(frame, session=session)
+                    error = HTTP_STATUS[status][1] if status != STATUS_OK else None
+                if error is not None:
+                    write_ws_message(self.wfile, OPCODE_TEXT, json.dumps({"error": error}).encode("utf-8"))
+                elif response_format == "binary":
+                    write_ws_message(self.wfile, OPCODE_BINARY, encode_binary(*result))
+                else:
+                    write_ws_message(self.wfile, OPCODE_TEXT, encode_json(*result))
+
+            write_ws_message(self.wfile, OPCODE_CLOSE, b"")
+        except ValueError:
+            try:
+                write_ws_message(self.wfile, OPCODE_CLOSE, struct.pack(">H", CLOSE_MESSAGE_TOO_BIG))
+            except OSError:
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.service.close_session(session)
+            self.close_connection = True
+
+def serve(host="127.0.0.1", port=8765, **service_kwargs):
+    """
+    Runs the service until interrupted.
+
+    Args:
+        host (str): Address to bind. The service is meant for local clients only.
+        port (int): Port to listen on.
+        **service_kwargs: Passed on to LandmarkService.
+    """
+    if host not in ("127.0.0.1", "localhost", "::1"):
+        print(f"Warning: Binding to {host} exposes the service beyond this machine.")
+
+    service = LandmarkService(**service_kwargs)
+    handler = type("Handler", (LandmarkRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Landmark service listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve hand landmarks over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--max-num-hands", type=int, default=2, help="Maximum number of hands per frame")
+    parser.add_argument("--max-queue", type=int, default=256, help="Maximum number of pending frames")
+    parser.add_argument("--inference-width", type=int, default=None, help="Downscale session frames to this width")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, max_num_hands=args.max_num_hands, max_queue=args.max_queue,
+          inference_width=args.inference_width)
@@ -1,49 +1,171 @@
-import mediapipe as mp
+import os
+from itertools import chain
+
 import cv2
 import numpy as np
 
+from frame_source import ThreadedCapture
+from profiler import NULL_PROFILER, StageProfiler, print_summary
+from tracker_engine import TrackerEngine
+
+NUM_LANDMARKS = 21
+
+IMAGE_EXTENSIONS = ['.jpg', '.png', '.jpeg']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov']
+
+# Handedness codes stored in LandmarkArrays.handedness
+HANDEDNESS_NONE = -1
+HANDEDNESS_LEFT = 0
+HANDEDNESS_RIGHT = 1
+
+class LandmarkArrays:
+    """
+    Preallocated NumPy buffers holding the hand landmarks of one frame.
+
+    The same buffers are refilled on every frame, so copy them if they need to outlive the next call.
+    """
+    def __init__(self, max_num_hands=2):
+        """
+        Allocates the buffers.
+
+        Args:
+            max_num_hands (int): Maximum number of hands that can be stored.
+        """
+        self.points = np.zeros((max_num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.full(max_num_hands, HANDEDNESS_NONE, dtype=np.int8)
+        self.scores = np.zeros(max_num_hands, dtype=np.float32)
+        self.num_hands = 0
+
+    def fill(self, results):
+        """
+        Copies the landmarks of a MediaPipe Hands result into the buffers.
+
+        Args:
+            results: The object returned by mediapipe.solutions.hands.Hands.process.
+
+        Returns:
+            LandmarkArrays: The buffers themselves.
+        """
+        hands = results.multi_hand_landmarks or []
+        handedness = results.multi_handedness or []
+        count = min(len(hands), len(self.points))
+
+        for i in range(count):
+            extract_landmark_array(hands[i], out=self.points[i])
+            if i < len(handedness):
+                classification = handedness[i].classification[0]
+                self.handedness[i] = HANDEDNESS_LEFT if classification.label == "Left" else HANDEDNESS_RIGHT
+                self.scores[i] = classification.score
+            else:
+                self.handedness[i] = HANDEDNESS_NONE
+                self.scores[i] = 0.0
+
+        self.points[count:] = 0.0
+        self.handedness[count:] = HANDEDNESS_NONE
+        self.scores[count:] = 0.0
+        self.num_hands = count
+        return self
+
+    def valid_points(self):
+        """Returns a view of the points of the hands detected in the last frame."""
+        return self.points[:self.num_hands]
+
+def extract_landmark_array(hand_landmarks, out=None):
+    """
+    Converts a single hand's landmarks to a (21, 3) float32 array.
+
+    Args:
+        hand_landmarks (mediapipe.framework.formats.landmark_pb2.NormalizedLandmarkList):
+            The landmarks of a detected hand.
+        out (numpy.ndarray): Optional (21, 3) float32 array to write into.
+
+    Returns:
+        numpy.ndarray: The (x, y, z) coordinates of each landmark.
+    """
+    coords = np.fromiter(
+        chain.from_iterable((lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark),
+        dtype=np.float32, count=NUM_LANDMARKS * 3
+    ).reshape(NUM_LANDMARKS, 3)
+
+    if out is None:
+        return coords
+    out[:] = coords
+    return out
+
 class HandLandmarksUtil:
     """
     Utility class for detecting and processing hand landmarks using MediaPipe.
     """
-    def __init__(self, static_image_mode=False, max_num_hands=2, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    def __init__(self, static_image_mode=False, max_num_hands=2, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 profiler=None, shared=None):
         """
         Initializes the MediaPipe Hand module.
 
+        MediaPipe and the model are only loaded when the first frame is processed.
+
         Args:
             static_image_mode (bool): Whether to treat input images as static.
             max_num_hands (int): Maximum number of hands to detect.
             min_detection_confidence (float): Minimum confidence for hand detection.
             min_tracking_confidence (float): Minimum confidence for hand tracking.
+            profiler (StageProfiler): Optional profiler that records the time spent in each stage.
+            shared (bool): If True, reuse the pooled model of any other detector with the same
+                settings. Defaults to True in static image mode and False in tracking mode.
         """
-        self.hands = mp.solutions.hands.Hands(
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.max_num_hands = max_num_hands
+        self.arrays = LandmarkArrays(max_num_hands)
+        self.engine = TrackerEngine(
             static_image_mode=static_image_mode,
             max_num_hands=max_num_hands,
             min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=min_tracking_confidence
+            min_tracking_confidence=min_tracking_confidence,
+            shared=shared
         )
-        self.mp_draw = mp.solutions.drawing_utils
 
-    def process_frame(self, frame):
+    @property
+    def hands(self):
+        """The underlying MediaPipe Hands model."""
+        return self.engine.hands
+
+    def process_frame(self, frame, as_array=False, draw=True, out=None):
         """
         Processes a single frame to detect hand landmarks.
 
         Args:
             frame (numpy.ndarray): The input frame from the camera.
+            as_array (bool): If True, return the landmarks as a LandmarkArrays instead of a list.
+            draw (bool): If False, the landmarks are not drawn on the frame.
+            out (numpy.ndarray): Optional buffer with the frame's shape. The frame is copied into
+                it and the landmarks are drawn there instead of on the input frame.
 
         Returns:
-            list: A list of detected hand landmarks.
-            numpy.ndarray: The annotated frame with landmarks drawn.
+            list or LandmarkArrays: The detected hand landmarks. The LandmarkArrays buffers are
+                reused and overwritten on the next call.
+            numpy.ndarray: The annotated frame with landmarks drawn (out if given, otherwise
+                the input frame, drawn in place).
         """
+        profiler = self.profiler
+        frame_start = start = profiler.now()
+
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+        start = profiler.record("convert", start)
+        results = self.engine.process(rgb_frame)
+        start = profiler.record("inference", start)
+
+        if as_array:
+            self.arrays.fill(results)
+            start = profiler.record("fill", start)
 
-        landmarks_list = []
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                landmarks_list.append(hand_landmarks)
-                self.mp_draw.draw_landmarks(frame, hand_landmarks, mp.solutions.hands.HAND_CONNECTIONS)
+        landmarks_list = list(results.multi_hand_landmarks or [])
+        if draw:
+            frame = self.engine.draw(frame, results, out)
+            profiler.record("draw", start)
+        profiler.record("total", frame_start)
+        profiler.frame_done()
 
+        if as_array:
+            return self.arrays, frame
         return landmarks_list, frame
 
     def extract_landmark_points(self, hand_landmarks):
@@ -56,15 +178,138 @@ class HandLandmarksUtil:
 
         Returns:
             list: A list of (x, y, z) tuples for each landmark.
+                Use extract_landmark_array for a NumPy array instead.
         """
         points = []
         for landmark in hand_landmarks.landmark:
             points.append((landmark.x, landmark.y, landmark.z))
         return points
 
+    def release(self):
+        """Releases the MediaPipe model used by the detector."""
+        self.engine.close()
+
+class LandmarkSequence:
+    """
+    Growable per-frame landmark sequence: points (T, hands, 21, 3), handedness and scores (T, hands)
+    and a timestamp per frame. Storage grows by doubling, so appending does not allocate per frame.
+    """
+    def __init__(self, max_num_hands=2, capacity=256):
+        """
+        Args:
+            max_num_hands (int): Number of hand slots per frame.
+            capacity (int): Number of frames allocated up front.
+        """
+        capacity = max(capacity, 1)
+        self.points = np.zeros((capacity, max_num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.full((capacity, max_num_hands), HANDEDNESS_NONE, dtype=np.int8)
+        self.scores = np.zeros((capacity, max_num_hands), dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.length = 0
+
+    def append(self, arrays, timestamp=0.0):
+        """
+        Appends the landmarks of one frame.
+
+        Args:
+            arrays (LandmarkArrays): Landmarks of the frame.
+            timestamp (float): Time of the frame in seconds.
+        """
+        if self.length == len(self.points):
+            self.points = np.concatenate([self.points, np.zeros_like(self.points)])
+            self.handedness = np.concatenate([self.handedness, np.full_like(self.handedness, HANDEDNESS_NONE)])
+            self.scores = np.concatenate([self.scores, np.zeros_like(self.scores)])
+            self.timestamps = np.concatenate([self.timestamps, np.zeros_like(self.timestamps)])
+
+        i = self.length
+        self.points[i] = arrays.points
+        self.handedness[i] = arrays.handedness
+        self.scores[i] = arrays.scores
+        self.timestamps[i] = timestamp
+        self.length += 1
+
+    def save(self, path, dtype=np.float16):
+        """
+        Saves the sequence as a compressed .npz file with points, handedness, scores and timestamps.
+
+        Args:
+            path (str): Output path.
+            dtype: Floating point type of the points and scores (float16 halves the size).
+        """
+        np.savez_compressed(
+            path,
+            points=self.points[:self.length].astype(dtype),
+            handedness=self.handedness[:self.length],
+            scores=self.scores[:self.length].astype(dtype),
+            timestamps=self.timestamps[:self.length],
+        )
+
+    def __len__(self):
+        return self.length
+
+def load_landmark_sequence(path):
+    """
+    Loads a sequence saved by LandmarkSequence.save.
+
+    Returns:
+        dict: points (float32), handedness, scores (float32) and timestamps arrays.
+    """
+    with np.load(path) as data:
+        return {
+            "points": data["points"].astype(np.float32),
+            "handedness": data["handedness"],
+            "scores": data["scores"].astype(np.float32),
+            "timestamps": data["timestamps"],
+        }
+
+def extract_file_landmarks(file_path, hand_util):
+    """
+    Runs a HandLandmarksUtil over an image or over every frame of a video.
+
+    Use a static_image_mode util for images and a tracking one for videos. The tracker is reset
+    before each video so tracking state does not leak between files.
+
+    Args:
+        file_path (str): Path to an image or video file.
+        hand_util (HandLandmarksUtil): The landmark detector to use.
+
+    Returns:
+        numpy.ndarray: float32 points of shape (frames, max_num_hands, 21, 3), or None if the
+            file could not be read. Images have a single frame.
+        numpy.ndarray: int8 handedness codes of shape (frames, max_num_hands).
+        numpy.ndarray: float32 handedness scores of shape (frames, max_num_hands).
+    """
+    if os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS:
+        frame = cv2.imread(file_path)
+        if frame is None:
+            return None, None, None
+        arrays, _ = hand_util.process_frame(frame, as_array=True, draw=False)
+        return arrays.points[np.newaxis].copy(), arrays.handedness[np.newaxis].copy(), arrays.scores[np.newaxis].copy()
+
+    cap = cv2.VideoCapture(file_path)
+    if not cap.isOpened():
+        return None, None, None
+
+    hand_util.engine.reset()
+
+    sequence = LandmarkSequence(hand_util.max_num_hands, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        arrays, _ = hand_util.process_frame(frame, as_array=True, draw=False)
+        sequence.append(arrays)
+
+    cap.release()
+    length = len(sequence)
+    return sequence.points[:length], sequence.handedness[:length], sequence.scores[:length]
+
 if __name__ == "__main__":
-    cap = cv2.VideoCapture(0)
-    hand_util = HandLandmarksUtil()
+    cap = ThreadedCapture(0).start()
+    profiler = StageProfiler(dump_path="landmark_profile.json")
+    hand_util = HandLandmarksUtil(profiler=profiler)
 
     print("Hand landmarks detection is running. Press 'q' to quit.")
 
@@ -75,10 +320,14 @@ if __name__ == "__main__":
             break
 
         landmarks, annotated_frame = hand_util.process_frame(frame)
+        start = profiler.now()
         cv2.imshow("Hand Landmarks", annotated_frame)
+        profiler.record("display", start)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
     cap.release()
     cv2.destroyAllWindows()
+    hand_util.release()
+    print_summary(profiler.summary())
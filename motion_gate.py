@@ -0,0 +1,190 @@
+#This script skips hand tracking inference on static frames by gating the tracker with a cheap motion score
+import time
+
+import cv2
+
+from frame_source import ThreadedCapture
+from hand_track import HandTracker
+
+class MotionGate:
+    """
+    Decides whether a frame differs enough from the last processed frame to be worth running
+    inference on.
+
+    The motion score is the fraction of pixels whose gray level changed by more than
+    pixel_delta between small grayscale versions of the frame and of the last processed frame.
+    Counting changed pixels instead of averaging the difference keeps a small moving hand from
+    being diluted by a large static background. Comparing with the last processed frame instead
+    of the previous one means slow movements still add up and open the gate.
+    """
+    def __init__(self, threshold=0.005, pixel_delta=15, downscale_width=64, max_reuse=15):
+        """
+        Args:
+            threshold (float): Minimum fraction of changed pixels for a frame to be processed.
+            pixel_delta (int): Minimum gray level change for a pixel to count as changed.
+            downscale_width (int): Width the frame is shrunk to before comparing. Area averaging
+                also removes most of the sensor noise.
+            max_reuse (int): Maximum number of consecutive skipped frames. After that a frame is
+                processed even if the scene looks static, so new hands are never missed for long.
+        """
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.downscale_width = downscale_width
+        self.max_reuse = max_reuse
+
+        self.reference = None
+        self.reused = 0
+        self.last_score = 0.0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.downscale_width, max(1, round(height * self.downscale_width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def should_process(self, frame):
+        """
+        Scores a frame and decides whether it must be processed. When it returns True the frame
+        becomes the new reference.
+
+        Args:
+            frame (numpy.ndarray): Input image frame (BGR format).
+
+        Returns:
+            bool: True if inference should run on the frame.
+        """
+        small = self._small_gray(frame)
+        if self.reference is None or self.reference.shape != small.shape:
+            self.last_score = float("inf")
+        else:
+            changed = cv2.threshold(cv2.absdiff(small, self.reference), self.pixel_delta, 255, cv2.THRESH_BINARY)[1]
+            self.last_score = cv2.countNonZero(changed) / changed.size
+
+        if self.last_score > self.threshold or self.reused >= self.max_reuse:
+            self.reference = small
+            self.reused = 0
+            return True
+
+        self.reused += 1
+        return False
+
+    def reset(self):
+        """Forgets the reference frame, so the next frame is always processed."""
+        self.reference = None
+        self.reused = 0
+
+class GatedTracker:
+    """
+    HandTracker wrapper that only runs inference on frames with motion. On static frames the
+    landmarks of the last processed frame are returned again.
+    """
+    def __init__(self, tracker=None, gate=None):
+        """
+        Args:
+            tracker (HandTracker): The tracker to gate (default: a new HandTracker).
+            gate (MotionGate): The motion gate (default: a MotionGate with default settings).
+        """
+        self.tracker = tracker if tracker is not None else HandTracker()
+        self.gate = gate if gate is not None else MotionGate()
+        self.last_skipped = False
+
+        self.frames = 0
+        self.skipped = 0
+        self.gate_time = 0.0
+        self.inference_time = 0.0
+        self.reuse_time = 0.0
+
+    def process_frame(self, frame, as_array=False, draw=True, out=None, in_place=False):
+        """
+        Processes a frame like HandTracker.process_frame, skipping inference on static frames.
+
+        Returns:
+            tuple: The annotated frame and the landmarks, as returned by HandTracker.process_frame.
+                self.last_skipped tells whether the landmarks were reused.
+        """
+        start = time.perf_counter()
+        process = self.gate.should_process(frame) or self.tracker.last_results is None
+        gated = time.perf_counter()
+        self.gate_time += gated - start
+        self.frames += 1
+        self.last_skipped = not process
+
+        if process:
+            result = self.tracker.process_frame(frame, as_array=as_array, draw=draw, out=out, in_place=in_place)
+            self.inference_time += time.perf_counter() - gated
+            return result
+
+        self.skipped += 1
+        result = self.tracker.render(frame, self.tracker.last_results, as_array=as_array, draw=draw, out=out,
+                                     in_place=in_place)
+        self.reuse_time += time.perf_counter() - gated
+        return result
+
+    def stats(self):
+        """
+        Returns the gating statistics.
+
+        The savings are estimated from the measured wall time of a processed frame: every
+        skipped frame saves one inference, minus the cost of gating all frames and of reusing
+        results. Wall time is not CPU time, MediaPipe may run inference on several threads.
+
+        Returns:
+            dict: Frame counts, skipped fraction, mean gate and inference times in milliseconds
+                and the estimated fraction of tracking wall time saved.
+        """
+        processed = self.frames - self.skipped
+        mean_inference = self.inference_time / processed if processed else 0.0
+        ungated_time = self.frames * mean_inference
+        gated_time = self.gate_time + self.inference_time + self.reuse_time
+        return {
+            "frames": self.frames,
+            "processed": processed,
+            "skipped": self.skipped,
+            "skip_fraction": self.skipped / self.frames if self.frames else 0.0,
+            "mean_gate_ms": 1000.0 * self.gate_time / self.frames if self.frames else 0.0,
+            "mean_inference_ms": 1000.0 * mean_inference,
+            "estimated_wall_time_savings": 1.0 - gated_time / ungated_time if ungated_time > 0 else 0.0,
+        }
+
+    def reset(self):
+        """Forces inference on the next frame, e.g. after switching sources."""
+        self.gate.reset()
+
+    def release(self):
+        """Releases the underlying tracker."""
+        self.tracker.release()
+
+if __name__ == "__main__":
+    import sys
+
+    # Pass a video file path to run headless on a file instead of the default camera
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    headless = isinstance(source, str)
+    cap = ThreadedCapture(source, latest_only=not headless).start()
+
+    if not cap.isOpened():
+        print("Error: Could not open the capture source.")
+        exit()
+
+    tracker = GatedTracker(HandTracker(), MotionGate(threshold=0.005, max_reuse=15))
+    print("Gated hand tracking is running." + ("" if headless else " Press 'q' to quit."))
+
+    while True:
+        ret, frame = cap.read(timeout=1.0)
+        if not ret:
+            break
+
+        annotated_frame, hand_landmarks = tracker.process_frame(frame, draw=not headless)
+        if not headless:
+            cv2.imshow("Gated Hand Tracker", annotated_frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    tracker.release()
+
+    stats = tracker.stats()
+    print(f"Skipped {stats['skipped']}/{stats['frames']} frames ({100 * stats['skip_fraction']:.1f}%), "
+          f"gate {stats['mean_gate_ms']:.3f} ms/frame, inference {stats['mean_inference_ms']:.2f} ms/frame, "
+          f"estimated tracking wall time saved: {100 * stats['estimated_wall_time_savings']:.1f}%")
@@ -0,0 +1,345 @@
+#This script tracks hands on many camera and video streams at once with a fixed pool of worker processes
+import argparse
+import multiprocessing
+import queue
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from frame_source import ThreadedCapture
+from profiler import StageProfiler
+
+def _worker_main(task_queue, result_queue, tracker_kwargs):
+    """
+    Worker process loop. The worker keeps one HandTracker per stream it serves, so the tracking
+    state of a stream is never mixed with another one.
+
+    Tasks are (stream_id, frame_index, slot_name, shape) tuples pointing at a frame in shared
+    memory, the name of a slot the runner has retired and unlinked (str), and None to stop.
+    """
+    from hand_track import HandTracker
+
+    cv2.setNumThreads(1)
+    trackers = {}
+    buffers = {}
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        if isinstance(task, str):
+            # The runner replaced the slot, drop the mapping so its memory can be freed
+            buffer = buffers.pop(task, None)
+            if buffer is not None:
+                buffer.close()
+            continue
+
+        stream_id, frame_index, slot_name, shape = task
+        buffer = buffers.get(slot_name)
+        if buffer is None:
+            # The runner owns and unlinks the slot, the worker only closes its mapping
+            buffer = buffers[slot_name] = shared_memory.SharedMemory(name=slot_name)
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=buffer.buf)
+
+        tracker = trackers.get(stream_id)
+        if tracker is None:
+            tracker = trackers[stream_id] = HandTracker(shared=False, **tracker_kwargs)
+
+        start = time.perf_counter()
+        _, arrays = tracker.process_frame(frame, as_array=True, draw=False)
+        inference_time = time.perf_counter() - start
+        del frame
+
+        result_queue.put((stream_id, frame_index, slot_name, arrays.points.copy(),
+                          arrays.handedness.copy(), arrays.num_hands, inference_time))
+
+    for tracker in trackers.values():
+        tracker.release()
+    for buffer in buffers.values():
+        buffer.close()
+
+class _Stream:
+    """State of one input stream inside the runner."""
+    def __init__(self, stream_id, source, capture, worker, profile_capacity):
+        self.stream_id = stream_id
+        self.source = source
+        self.capture = capture
+        self.worker = worker
+        self.profiler = StageProfiler(capacity=profile_capacity)
+        self.free_slots = []
+        self.slots = {}
+        self.capture_times = {}
+        self.frame_index = 0
+        self.frames_processed = 0
+        self.done = False
+
+    @property
+    def in_flight(self):
+        return len(self.capture_times)
+
+class MultiStreamRunner:
+    """
+    Tracks hands on any mix of camera indices and video files.
+
+    Frames are passed to the workers through shared memory. Each stream is pinned to one worker
+    (stream i goes to worker i % num_workers) so tracking stays valid from frame to frame.
+    Streams are polled round-robin and each one may have at most max_in_flight frames being
+    processed. A stream that is ahead of the workers does not queue more work: its capture keeps
+    only the newest frames and drops the others, so an overloaded host degrades each stream's
+    frame rate evenly instead of building up latency.
+    """
+    def __init__(self, sources, num_workers=4, max_in_flight=2, realtime=True, max_num_hands=2,
+                 detection_confidence=0.7, tracking_confidence=0.7, inference_width=None,
+                 profile_capacity=1024):
+        """
+        Args:
+            sources (list): Camera indices (int) and video file paths (str).
+            num_workers (int): Number of worker processes, each with its own models.
+            max_in_flight (int): Maximum number of frames of one stream being processed at once.
+            realtime (bool): If True, video files are read at their native FPS like cameras.
+                If False, they are read as fast as the workers consume them, without drops.
+            max_num_hands (int): Maximum number of hands to detect per frame.
+            detection_confidence (float): Minimum confidence for hand detection.
+            tracking_confidence (float): Minimum confidence for hand tracking.
+            inference_width (int): If set, frames are downscaled to this width for inference.
+            profile_capacity (int): Number of latency samples kept per stream.
+        """
+        self.sources = list(sources)
+        self.num_workers = max(1, min(num_workers, len(self.sources)))
+        self.max_in_flight = max(1, max_in_flight)
+        self.realtime = realtime
+        self.profile_capacity = profile_capacity
+        self.tracker_kwargs = {
+            "max_num_hands": max_num_hands,
+            "detection_confidence": detection_confidence,
+            "tracking_confidence": tracking_confidence,
+            "inference_width": inference_width,
+        }
+
+        self.streams = []
+        self._workers = []
+        self._task_queues = []
+        self._result_queue = None
+        self._next_stream = 0
+
+    def start(self):
+        """Starts the worker processes, then the captures."""
+        # Workers are started before any capture thread exists. The resource tracker is started
+        # first, so forked workers share it with the runner instead of starting their own, which
+        # would unlink the runner's slots when they exit
+        resource_tracker.ensure_running()
+        self._result_queue = multiprocessing.Queue()
+        for _ in range(self.num_workers):
+            task_queue = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_worker_main, args=(task_queue, self._result_queue, self.tracker_kwargs),
+                                             daemon=True)
+            worker.start()
+            self._task_queues.append(task_queue)
+            self._workers.append(worker)
+
+        for stream_id, source in enumerate(self.sources):
+            is_file = isinstance(source, str)
+            capture = ThreadedCapture(source, buffer_size=self.max_in_flight,
+                                      latest_only=not is_file or self.realtime,
+                                      realtime=is_file and self.realtime).start()
+            if not capture.isOpened():
+                print(f"Error: Could not open stream {stream_id} ({source}).")
+            self.streams.append(_Stream(stream_id, source, capture, stream_id % self.num_workers, self.profile_capacity))
+        return self
+
+    def _slot_for(self, stream, frame):
+        """Returns a free shared memory slot large enough for the frame, creating it if needed."""
+        while stream.free_slots:
+            name = stream.free_slots.pop()
+            if stream.slots[name].size >= frame.nbytes:
+                return name
+            # The resolution changed, the slot is too small
+            slot = stream.slots.pop(name)
+            slot.close()
+            slot.unlink()
+            # No task uses a free slot anymore, so the worker can close its mapping too
+            self._task_queues[stream.worker].put(name)
+
+        slot = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        stream.slots[slot.name] = slot
+        return slot.name
+
+    def _schedule(self):
+        """
+        Gives every stream, in round-robin order, the chance to submit one frame.
+
+        Returns:
+            int: Number of frames submitted.
+        """
+        submitted = 0
+        count = len(self.streams)
+        for offset in range(count):
+            stream = self.streams[(self._next_stream + offset) % count]
+            if stream.done or stream.in_flight >= self.max_in_flight:
+                continue
+
+            ret, frame = stream.capture.read(timeout=0)
+            if not ret:
+                if stream.capture.finished():
+                    stream.done = True
+                continue
+
+            name = self._slot_for(stream, frame)
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=stream.slots[name].buf)[...] = frame
+            # Latency is measured from capture, so time spent in the capture buffer counts too
+            stream.capture_times[stream.frame_index] = stream.capture.last_capture_time
+            self._task_queues[stream.worker].put((stream.stream_id, stream.frame_index, name, frame.shape))
+            stream.frame_index += 1
+            submitted += 1
+
+        # The next round starts one stream further, so no stream is always served first
+        self._next_stream = (self._next_stream + 1) % max(count, 1)
+        return submitted
+
+    def _collect(self, timeout, on_result):
+        """
+        Handles the results available within the timeout.
+
+        Returns:
+            int: Number of results handled.
+        """
+        handled = 0
+        while True:
+            try:
+                result = self._result_queue.get(timeout=timeout) if handled == 0 else self._result_queue.get_nowait()
+            except queue.Empty:
+                return handled
+
+            stream_id, frame_index, slot_name, points, handedness, num_hands, inference_time = result
+            stream = self.streams[stream_id]
+            capture_time = stream.capture_times.pop(frame_index)
+            stream.free_slots.append(slot_name)
+
+            now = stream.profiler.now()
+            stream.profiler.record("latency", capture_time)
+            stream.profiler.record("inference", now - inference_time)
+            stream.profiler.frame_done()
+            stream.frames_processed += 1
+            handled += 1
+
+            if on_result is not None:
+                on_result(stream_id, frame_index, points, handedness, num_hands)
+
+    def run(self, duration=None, on_result=None):
+        """
+        Processes all streams until every one has ended or the duration has elapsed.
+
+        Args:
+            duration (float): Maximum number of seconds to run (None runs until all streams end).
+            on_result (callable): Called as on_result(stream_id, frame_index, points, handedness,
+                num_hands) for every processed frame.
+
+        Returns:
+            dict: Per-stream statistics, see stats().
+        """
+        if not self._workers:
+            self.start()
+
+        start_time = time.perf_counter()
+        while True:
+            submitted = self._schedule()
+            handled = self._collect(0.0 if submitted else 0.005, on_result)
+
+            in_flight = sum(stream.in_flight for stream in self.streams)
+            if in_flight == 0 and all(stream.done for stream in self.streams):
+                break
+            if duration is not None and time.perf_counter() - start_time >= duration:
+                break
+            if not submitted and not handled and in_flight == 0:
+                time.sleep(0.001)
+
+        # Let the frames still being processed come back before reporting
+        while any(stream.in_flight for stream in self.streams):
+            if not self._collect(1.0, on_result):
+                break
+        return self.stats()
+
+    def stats(self):
+        """
+        Returns per-stream statistics.
+
+        Returns:
+            list: One dict per stream with the source, processed and dropped frames, FPS and
+                latency and inference percentiles in milliseconds.
+        """
+        stats = []
+        for stream in self.streams:
+            summary = stream.profiler.summary()
+            capture_stats = stream.capture.stats()
+            stats.append({
+                "stream": stream.stream_id,
+                "source": stream.source,
+                "worker": stream.worker,
+                "frames_processed": stream.frames_processed,
+                "frames_dropped": capture_stats["frames_dropped"],
+                "fps": summary["fps"],
+                "latency": summary["stages"].get("latency"),
+                "inference": summary["stages"].get("inference"),
+            })
+        return stats
+
+    def close(self):
+        """Stops the captures and the workers and frees the shared memory."""
+        for stream in self.streams:
+            stream.capture.release()
+
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
+
+        for stream in self.streams:
+            for slot in stream.slots.values():
+                slot.close()
+                slot.unlink()
+            stream.slots.clear()
+
+        self._workers = []
+        self._task_queues = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+def print_stream_stats(stats):
+    """Prints the per-stream statistics as a small table."""
+    for stream in stats:
+        latency = stream["latency"] or {"p50_ms": 0.0, "p95_ms": 0.0}
+        print(f"  [{stream['stream']}] {str(stream['source']):<30} worker {stream['worker']}  "
+              f"{stream['fps']:6.1f} FPS  {stream['frames_processed']:6d} frames  {stream['frames_dropped']:6d} dropped  "
+              f"latency p50 {latency['p50_ms']:7.2f} ms  p95 {latency['p95_ms']:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Track hands on several camera or video streams at once.")
+    parser.add_argument("sources", nargs="+", help="Camera indices and/or video file paths")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="Frames of one stream processed at once")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run (default: until all streams end)")
+    parser.add_argument("--no-realtime", action="store_true", help="Read video files as fast as possible, without drops")
+    parser.add_argument("--inference-width", type=int, default=None, help="Downscale frames to this width for inference")
+    args = parser.parse_args()
+
+    sources = [int(source) if source.isdigit() else source for source in args.sources]
+    with MultiStreamRunner(sources, num_workers=args.workers, max_in_flight=args.max_in_flight,
+                           realtime=not args.no_realtime, inference_width=args.inference_width) as runner:
+        start_time = time.perf_counter()
+        stats = runner.run(duration=args.duration)
+        elapsed = time.perf_counter() - start_time
+
+    total = sum(stream["frames_processed"] for stream in stats)
+    print(f"Processed {total} frames from {len(stats)} streams in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.1f} FPS total)")
+    print_stream_stats(stats)
+
+if __name__ == "__main__":
+    main()
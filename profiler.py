@@ -0,0 +1,142 @@
+#This script records per-stage latencies of the hand-tracking loop in fixed-size ring buffers
+import atexit
+import json
+import time
+
+import numpy as np
+
+class StageProfiler:
+    """
+    Low-overhead latency recorder. Each stage keeps its most recent timings in a fixed-size ring buffer.
+
+    Typical use inside a hot path:
+
+        start = profiler.now()
+        ...convert...
+        start = profiler.record("convert", start)
+        ...inference...
+        profiler.record("inference", start)
+        profiler.frame_done()
+    """
+    def __init__(self, capacity=1024, dump_path=None):
+        """
+        Initializes the profiler.
+
+        Args:
+            capacity (int): Number of most recent samples kept per stage.
+            dump_path (str): If set, the summary is written to this JSON file when the process exits.
+        """
+        self.capacity = capacity
+        self.enabled = True
+        self._samples = {}
+        self._counts = {}
+        self._frame_times = np.zeros(capacity, dtype=np.float64)
+        self._frame_count = 0
+
+        if dump_path is not None:
+            atexit.register(self.dump_json, dump_path)
+
+    def now(self):
+        """Returns the current time in seconds from a monotonic clock."""
+        return time.perf_counter()
+
+    def record(self, stage, start):
+        """
+        Records the time elapsed since start for a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            start (float): Value previously returned by now() or record().
+
+        Returns:
+            float: The current time, to be used as the start of the next stage.
+        """
+        end = time.perf_counter()
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = np.zeros(self.capacity, dtype=np.float64)
+            self._counts[stage] = 0
+
+        count = self._counts[stage]
+        samples[count % self.capacity] = end - start
+        self._counts[stage] = count + 1
+        return end
+
+    def frame_done(self):
+        """Marks the end of a frame, used to compute the FPS."""
+        self._frame_times[self._frame_count % self.capacity] = time.perf_counter()
+        self._frame_count += 1
+
+    def stage_samples(self, stage):
+        """Returns the recorded samples of a stage in seconds, in ring buffer order."""
+        count = self._counts.get(stage, 0)
+        return self._samples[stage][:min(count, self.capacity)] if count else np.zeros(0)
+
+    def fps(self):
+        """Returns the average frames per second over the frames held in the buffer."""
+        count = min(self._frame_count, self.capacity)
+        if count < 2:
+            return 0.0
+
+        times = self._frame_times[:count]
+        span = times.max() - times.min()
+        return (count - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        """
+        Summarizes the recorded timings.
+
+        Returns:
+            dict: Per-stage count, mean, p50, p95 and p99 in milliseconds, plus the FPS.
+        """
+        stages = {}
+        for stage in self._samples:
+            samples = self.stage_samples(stage) * 1000.0
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            stages[stage] = {
+                "count": self._counts[stage],
+                "mean_ms": float(samples.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+            }
+        return {"fps": self.fps(), "frames": self._frame_count, "stages": stages}
+
+    def dump_json(self, path):
+        """Writes the summary to a JSON file."""
+        with open(path, "w") as profile_file:
+            json.dump(self.summary(), profile_file, indent=2)
+        print(f"Profile saved: {path}")
+
+    def reset(self):
+        """Discards all recorded samples."""
+        self._samples.clear()
+        self._counts.clear()
+        self._frame_count = 0
+
+class NullProfiler:
+    """
+    Profiler that records nothing. Used when profiling is turned off so the hot path pays
+    only for a few empty method calls.
+    """
+    enabled = False
+
+    def now(self):
+        return 0.0
+
+    def record(self, stage, start):
+        return 0.0
+
+    def frame_done(self):
+        pass
+
+    def summary(self):
+        return {"fps": 0.0, "frames": 0, "stages": {}}
+
+NULL_PROFILER = NullProfiler()
+
+def print_summary(summary):
+    """Prints a profiler summary as a small table."""
+    print(f"FPS: {summary['fps']:.1f} over {summary['frames']} frames")
+    for stage, stats in summary["stages"].items():
+        print(f"  {stage:<12} p50 {stats['p50_ms']:7.2f} ms   p95 {stats['p95_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms")
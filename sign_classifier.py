@@ -0,0 +1,402 @@
+#This script recognizes signs in real time from a sliding window over the tracker's landmark stream
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from frame_source import ThreadedCapture
+from hand_track import HandTracker
+from landmark_features import compute_features, feature_size
+from landmark_utils import load_landmark_sequence
+
+class SlidingWindow:
+    """
+    Fixed-size ring buffer of per-frame features with incrementally updated window statistics.
+
+    Each push updates running sums in O(feature size) instead of recomputing over the window.
+    The window features are the mean, the standard deviation and the motion (newest minus
+    oldest frame) of every frame feature.
+    """
+    def __init__(self, window_size, feature_size, resync_interval=1000):
+        """
+        Args:
+            window_size (int): Number of frames in the window.
+            feature_size (int): Length of the per-frame feature vector.
+            resync_interval (int): The running sums are recomputed exactly every this many pushes
+                so floating point drift cannot build up.
+        """
+        self.window_size = window_size
+        self.buffer = np.zeros((window_size, feature_size), dtype=np.float64)
+        self._sum = np.zeros(feature_size, dtype=np.float64)
+        self._sum_sq = np.zeros(feature_size, dtype=np.float64)
+        self._features = np.zeros(3 * feature_size, dtype=np.float32)
+        self.count = 0
+        self.resync_interval = resync_interval
+
+    def push(self, features):
+        """Adds the features of a new frame, replacing the oldest one once the window is full."""
+        i = self.count % self.window_size
+        outgoing = self.buffer[i]
+        if self.count >= self.window_size:
+            self._sum -= outgoing
+            self._sum_sq -= outgoing * outgoing
+
+        outgoing[:] = features
+        self._sum += outgoing
+        self._sum_sq += outgoing * outgoing
+        self.count += 1
+
+        if self.count % self.resync_interval == 0:
+            self._sum = self.buffer.sum(axis=0)
+            self._sum_sq = (self.buffer * self.buffer).sum(axis=0)
+
+    def is_full(self):
+        return self.count >= self.window_size
+
+    def features(self):
+        """
+        Returns the window features. The returned array is reused by the next call.
+
+        Returns:
+            numpy.ndarray: float32 vector of length 3 * feature_size.
+        """
+        n = min(self.count, self.window_size)
+        size = len(self._sum)
+        mean = self._sum / n
+        variance = np.maximum(self._sum_sq / n - mean * mean, 0.0)
+
+        newest = self.buffer[(self.count - 1) % self.window_size]
+        oldest = self.buffer[self.count % self.window_size] if self.count >= self.window_size else self.buffer[0]
+
+        self._features[:size] = mean
+        self._features[size:2 * size] = np.sqrt(variance)
+        self._features[2 * size:] = newest - oldest
+        return self._features
+
+    def reset(self):
+        self.count = 0
+        self.buffer[:] = 0.0
+        self._sum[:] = 0.0
+        self._sum_sq[:] = 0.0
+
+def sequence_windows(points, handedness, window_size, stride=1):
+    """
+    Computes the window features of every window of a recorded sequence, exactly as the live
+    recognizer would see them.
+
+    Args:
+        points (numpy.ndarray): (T, hands, 21, 3) landmarks.
+        handedness (numpy.ndarray): (T, hands) handedness codes.
+        window_size (int): Number of frames per window.
+        stride (int): Only every stride-th full window is returned.
+
+    Returns:
+        numpy.ndarray: (windows, features) float32 array, empty if the sequence is too short.
+    """
+    # The per-frame features of the whole sequence are computed in one vectorized call
+    frame_features = compute_features(points, handedness)
+    window = SlidingWindow(window_size, frame_features.shape[1])
+    rows = []
+
+    for t in range(len(points)):
+        window.push(frame_features[t])
+        if window.is_full() and (window.count - window_size) % stride == 0:
+            rows.append(window.features().copy())
+
+    if not rows:
+        return np.zeros((0, 3 * frame_features.shape[1]), dtype=np.float32)
+    return np.stack(rows)
+
+class SignClassifier:
+    """
+    Softmax regression over window features, trained with plain NumPy on the CPU.
+    """
+    def __init__(self, labels=None, window_size=15):
+        self.labels = list(labels) if labels is not None else []
+        self.window_size = window_size
+        self.weights = None
+        self.bias = None
+        self.mean = None
+        self.std = None
+
+    def fit(self, features, targets, epochs=300, learning_rate=0.5, l2=1e-4):
+        """
+        Trains the classifier with full-batch gradient descent.
+
+        Args:
+            features (numpy.ndarray): (samples, features) window features.
+            targets (numpy.ndarray): (samples,) label indices into self.labels.
+            epochs (int): Number of gradient steps.
+            learning_rate (float): Step size.
+            l2 (float): Weight decay.
+        """
+        self.mean = features.mean(axis=0)
+        self.std = features.std(axis=0) + 1e-6
+        x = (features - self.mean) / self.std
+
+        num_classes = len(self.labels)
+        one_hot = np.eye(num_classes, dtype=np.float32)[targets]
+        self.weights = np.zeros((x.shape[1], num_classes), dtype=np.float32)
+        self.bias = np.zeros(num_classes, dtype=np.float32)
+
+        for _ in range(epochs):
+            probabilities = _softmax(x @ self.weights + self.bias)
+            error = (probabilities - one_hot) / len(x)
+            self.weights -= learning_rate * (x.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    def predict_proba(self, features):
+        """
+        Returns class probabilities for one feature vector or a batch of them.
+        """
+        return _softmax(((features - self.mean) / self.std) @ self.weights + self.bias)
+
+    def save(self, path):
+        np.savez(path, labels=np.array(self.labels), window_size=self.window_size, weights=self.weights,
+                 bias=self.bias, mean=self.mean, std=self.std)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            classifier = cls(data["labels"].tolist(), int(data["window_size"]))
+            classifier.weights = data["weights"]
+            classifier.bias = data["bias"]
+            classifier.mean = data["mean"]
+            classifier.std = data["std"]
+        return classifier
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+class RealtimeRecognizer:
+    """
+    Per-frame sign recognition over the tracker's landmark output, with debouncing and a latency budget.
+    """
+    def __init__(self, classifier, threshold=0.6, debounce_frames=5, latency_budget_ms=2.0, max_num_hands=2):
+        """
+        Args:
+            classifier (SignClassifier): Trained classifier.
+            threshold (float): Minimum probability for a frame to vote for a label.
+            debounce_frames (int): A label is only reported after winning this many consecutive frames.
+            latency_budget_ms (float): Per-frame budget for feature update and classification.
+                Frames over budget are counted in budget_overruns.
+            max_num_hands (int): Number of hand slots in the tracker output.
+        """
+        self.classifier = classifier
+        self.threshold = threshold
+        self.debounce_frames = debounce_frames
+        self.latency_budget_ms = latency_budget_ms
+        self.window = SlidingWindow(classifier.window_size, feature_size(max_num_hands))
+        self._frame_features = np.zeros(feature_size(max_num_hands), dtype=np.float32)
+
+        self.current_label = None
+        self._candidate = None
+        self._candidate_frames = 0
+        self.frames = 0
+        self.budget_overruns = 0
+        self.last_latency_ms = 0.0
+
+    def update(self, arrays):
+        """
+        Consumes the landmarks of one frame.
+
+        Args:
+            arrays (LandmarkArrays): Tracker output of the frame.
+
+        Returns:
+            str: The debounced label, or None while no sign is recognized.
+            float: Probability of the most likely label in this frame.
+        """
+        start = time.perf_counter()
+        compute_features(arrays.points, arrays.handedness, out=self._frame_features)
+        self.window.push(self._frame_features)
+
+        probability = 0.0
+        if self.window.is_full():
+            probabilities = self.classifier.predict_proba(self.window.features())
+            best = int(np.argmax(probabilities))
+            probability = float(probabilities[best])
+            candidate = self.classifier.labels[best] if probability >= self.threshold else None
+
+            if candidate == self._candidate:
+                self._candidate_frames += 1
+            else:
+                self._candidate = candidate
+                self._candidate_frames = 1
+            if self._candidate_frames >= self.debounce_frames:
+                self.current_label = self._candidate
+
+        self.frames += 1
+        self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+        if self.last_latency_ms > self.latency_budget_ms:
+            self.budget_overruns += 1
+        return self.current_label, probability
+
+    def reset(self):
+        self.window.reset()
+        self.current_label = None
+        self._candidate = None
+        self._candidate_frames = 0
+
+def load_sequences(dataset_dir):
+    """
+    Loads every landmark sequence recorded by dataset_collect (<video>.landmarks.npz) below a
+    directory. The label is the name of the directory holding the file.
+
+    Returns:
+        list: (points, handedness, label) tuples.
+    """
+    sequences = []
+    for path in sorted(glob.glob(os.path.join(dataset_dir, "**", "*.landmarks.npz"), recursive=True)):
+        sequence = load_landmark_sequence(path)
+        sequences.append((sequence["points"], sequence["handedness"], os.path.basename(os.path.dirname(path))))
+    return sequences
+
+def load_archive(archive_path):
+    """
+    Loads the sequences of an archive written by batch_extract.
+
+    Returns:
+        list: (points, handedness, label) tuples.
+    """
+    with np.load(archive_path) as data:
+        offsets = data["offsets"]
+        return [
+            (data["points"][offsets[i]:offsets[i + 1]], data["handedness"][offsets[i]:offsets[i + 1]], str(label))
+            for i, label in enumerate(data["labels"])
+        ]
+
+def train_classifier(sequences, window_size=15, stride=2):
+    """
+    Trains a SignClassifier on recorded sequences.
+
+    Args:
+        sequences (list): (points, handedness, label) tuples.
+        window_size (int): Number of frames per window.
+        stride (int): Step between training windows taken from a sequence.
+
+    Returns:
+        SignClassifier: The trained classifier.
+    """
+    if not sequences:
+        raise ValueError("No training samples.")
+
+    labels = sorted({label for _, _, label in sequences})
+    features, targets = [], []
+    for points, handedness, label in sequences:
+        windows = sequence_windows(points, handedness, window_size, stride)
+        features.append(windows)
+        targets.append(np.full(len(windows), labels.index(label)))
+
+    features = np.concatenate(features)
+    targets = np.concatenate(targets)
+    if len(features) == 0:
+        raise ValueError(f"No sequence is at least {window_size} frames long.")
+
+    print(f"Training on {len(features)} windows from {len(sequences)} sequences, labels: {labels}")
+    return SignClassifier(labels, window_size).fit(features, targets)
+
+def evaluate(classifier, sequences):
+    """
+    Evaluates a classifier on recorded sequences. Each sequence is predicted from the average
+    probabilities of all its windows.
+
+    Returns:
+        dict: Accuracy, confusion matrix (true label rows, predicted label columns) and the
+            number of sequences too short to evaluate.
+    """
+    labels = classifier.labels
+    confusion = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    skipped = 0
+
+    for points, handedness, label in sequences:
+        windows = sequence_windows(points, handedness, classifier.window_size)
+        if len(windows) == 0 or label not in labels:
+            skipped += 1
+            continue
+        predicted = int(np.argmax(classifier.predict_proba(windows).mean(axis=0)))
+        confusion[labels.index(label), predicted] += 1
+
+    total = confusion.sum()
+    return {
+        "accuracy": float(np.trace(confusion) / total) if total else 0.0,
+        "confusion": confusion.tolist(),
+        "labels": labels,
+        "skipped": skipped,
+    }
+
+def run_live(model_path, camera_index=0):
+    """Runs the recognizer on the camera feed and overlays the recognized sign."""
+    classifier = SignClassifier.load(model_path)
+    tracker = HandTracker()
+    recognizer = RealtimeRecognizer(classifier, max_num_hands=tracker.max_num_hands)
+    cap = ThreadedCapture(camera_index).start()
+
+    if not cap.isOpened():
+        print("Error: Could not access the camera.")
+        return
+
+    print("Sign recognition is running. Press 'q' to quit.")
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            print("Error: Failed to capture frame.")
+            break
+
+        annotated_frame, arrays = tracker.process_frame(frame, as_array=True, in_place=True)
+        label, probability = recognizer.update(arrays)
+        cv2.putText(annotated_frame, f"{label or '-'} ({probability:.2f})", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+        cv2.imshow("Sign Recognition", annotated_frame)
+
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    tracker.release()
+    print(f"Frames over the {recognizer.latency_budget_ms} ms budget: {recognizer.budget_overruns}/{recognizer.frames}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train, evaluate or run the sign classifier.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train on recorded landmark sequences.")
+    train_parser.add_argument("data", help="Dataset directory with .landmarks.npz files, or a batch_extract archive.")
+    train_parser.add_argument("--model", default="sign_classifier.npz")
+    train_parser.add_argument("--window", type=int, default=15)
+
+    eval_parser = subparsers.add_parser("eval", help="Evaluate on recorded landmark sequences.")
+    eval_parser.add_argument("data", help="Dataset directory with .landmarks.npz files, or a batch_extract archive.")
+    eval_parser.add_argument("--model", default="sign_classifier.npz")
+
+    live_parser = subparsers.add_parser("live", help="Recognize signs from the camera.")
+    live_parser.add_argument("--model", default="sign_classifier.npz")
+    live_parser.add_argument("--camera", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == "live":
+        run_live(args.model, args.camera)
+        return
+
+    sequences = load_archive(args.data) if args.data.endswith(".npz") else load_sequences(args.data)
+    if args.command == "train":
+        classifier = train_classifier(sequences, args.window)
+        classifier.save(args.model)
+        print(f"Model saved: {args.model}")
+    else:
+        results = evaluate(SignClassifier.load(args.model), sequences)
+        print(f"Accuracy: {results['accuracy']:.3f} on {len(sequences) - results['skipped']} sequences")
+        print(f"Labels: {results['labels']}")
+        for row in results["confusion"]:
+            print("  " + " ".join(f"{count:4d}" for count in row))
+
+if __name__ == "__main__":
+    main()
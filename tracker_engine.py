@@ -0,0 +1,169 @@
+#This script holds the MediaPipe Hands engine shared by HandTracker and HandLandmarksUtil
+import threading
+
+import numpy as np
+
+_mediapipe = None
+
+def get_mediapipe():
+    """
+    Imports MediaPipe on first use, so modules that only touch landmark arrays never pay for it.
+
+    Returns:
+        module: The mediapipe module.
+    """
+    global _mediapipe
+    if _mediapipe is None:
+        import mediapipe
+        _mediapipe = mediapipe
+    return _mediapipe
+
+class HandsPool:
+    """
+    Keyed pool of MediaPipe Hands models. Engines with identical settings share one model
+    instead of each loading their own, and the model is closed when its last user releases it.
+
+    A model in tracking mode (static_image_mode=False) carries state from one frame to the next,
+    so it should only be shared by engines that process the same stream.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, settings):
+        """
+        Returns the model for a set of settings, building it if needed.
+
+        Args:
+            settings (tuple): (static_image_mode, max_num_hands, min_detection_confidence,
+                min_tracking_confidence).
+
+        Returns:
+            tuple: The Hands model and the lock that serializes calls to it.
+        """
+        with self._lock:
+            entry = self._entries.get(settings)
+            if entry is None:
+                entry = self._entries[settings] = [_build_hands(settings), threading.Lock(), 0]
+            entry[2] += 1
+            return entry[0], entry[1]
+
+    def release(self, settings):
+        """Drops one user of a model and closes it when nobody uses it anymore."""
+        with self._lock:
+            entry = self._entries.get(settings)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self._entries[settings]
+                entry[0].close()
+
+    def __len__(self):
+        return len(self._entries)
+
+HANDS_POOL = HandsPool()
+
+def _build_hands(settings):
+    """Builds a MediaPipe Hands model from a settings tuple."""
+    static_image_mode, max_num_hands, min_detection_confidence, min_tracking_confidence = settings
+    return get_mediapipe().solutions.hands.Hands(
+        static_image_mode=static_image_mode,
+        max_num_hands=max_num_hands,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence
+    )
+
+class TrackerEngine:
+    """
+    Lazily-initialized wrapper around a MediaPipe Hands model.
+
+    Neither MediaPipe nor the model is loaded until the first frame is processed.
+    """
+    def __init__(self, static_image_mode=False, max_num_hands=2, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, shared=None, pool=None):
+        """
+        Stores the settings of the engine.
+
+        Args:
+            static_image_mode (bool): Whether to treat input images as static.
+            max_num_hands (int): Maximum number of hands to detect.
+            min_detection_confidence (float): Minimum confidence for hand detection.
+            min_tracking_confidence (float): Minimum confidence for hand tracking.
+            shared (bool): If True, the model comes from the pool and is shared with every other
+                engine that has the same settings. If False, the engine owns a private model.
+                Defaults to sharing only static image mode models, which keep no tracking state.
+            pool (HandsPool): Pool to use when shared (default: HANDS_POOL).
+        """
+        self.settings = (static_image_mode, max_num_hands, min_detection_confidence, min_tracking_confidence)
+        self.max_num_hands = max_num_hands
+        self.shared = static_image_mode if shared is None else shared
+        self.pool = pool if pool is not None else HANDS_POOL
+
+        self._hands = None
+        self._lock = None
+
+    @property
+    def hands(self):
+        """The MediaPipe Hands model, built or taken from the pool on first access."""
+        if self._hands is None:
+            if self.shared:
+                self._hands, self._lock = self.pool.acquire(self.settings)
+            else:
+                self._hands, self._lock = _build_hands(self.settings), threading.Lock()
+        return self._hands
+
+    def process(self, rgb_frame):
+        """
+        Runs the model on an RGB frame.
+
+        Args:
+            rgb_frame (numpy.ndarray): Input image frame (RGB format).
+
+        Returns:
+            The MediaPipe Hands result.
+        """
+        hands = self.hands
+        with self._lock:
+            return hands.process(rgb_frame)
+
+    def reset(self):
+        """Clears the tracking state of the model, e.g. before starting a new video."""
+        if self._hands is not None and hasattr(self._hands, "reset"):
+            with self._lock:
+                self._hands.reset()
+
+    def draw(self, frame, results, out=None):
+        """
+        Draws the detected landmarks without forcing a copy of the frame.
+
+        Args:
+            frame (numpy.ndarray): The frame the landmarks were detected on.
+            results: The MediaPipe Hands result.
+            out (numpy.ndarray): Optional buffer with the frame's shape. The frame is copied into
+                it and the landmarks are drawn there. If None, they are drawn on the frame itself.
+
+        Returns:
+            numpy.ndarray: The annotated image (out, or the frame).
+        """
+        if out is not None:
+            np.copyto(out, frame)
+            frame = out
+
+        if results.multi_hand_landmarks:
+            mp = get_mediapipe()
+            for hand_landmarks in results.multi_hand_landmarks:
+                mp.solutions.drawing_utils.draw_landmarks(frame, hand_landmarks, mp.solutions.hands.HAND_CONNECTIONS)
+        return frame
+
+    def close(self):
+        """Releases the model, closing it if no other engine uses it."""
+        if self._hands is None:
+            return
+
+        if self.shared:
+            self.pool.release(self.settings)
+        else:
+            self._hands.close()
+        self._hands = None
+        self._lock = None
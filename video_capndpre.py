@@ -1,19 +1,38 @@
 import cv2
 import os
+import struct
 import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def extract_frames(video_path, output_dir="frames", frame_interval=30):
+def extract_frames(video_path, output_dir="frames", frame_interval=30, interval_ms=None, seek=False,
+                   write_workers=4, verbose=True, dedup=None):
     """
     Extracts frames from a video at regular intervals and saves them as images.
 
+    Frames that are not saved are only grabbed, never decoded into an image, and the JPEG
+    encoding and writing runs on a thread pool while the next frames are read.
+
     Args:
         video_path (str): Path to the input video file.
         output_dir (str): Directory where extracted frames will be saved.
         frame_interval (int): Number of frames to skip between each saved frame.
+        interval_ms (float): If set, save one frame every interval_ms milliseconds of video
+            instead of every frame_interval frames.
+        seek (bool): If True, jump straight to the next frame to save instead of grabbing the
+            frames in between. Faster for large intervals, but seeking is only frame-accurate
+            for some codecs and containers.
+        write_workers (int): Number of threads encoding and writing JPEGs.
+        verbose (bool): If True, print every saved frame.
+        dedup (DedupIndex): Optional near-duplicate filter. Sampled frames too similar to a
+            frame already in output_dir or saved before are skipped.
+
+    Returns:
+        int: Number of frames saved.
     """
     if not os.path.exists(video_path):
         print(f"Error: Video file not found at {video_path}")
-        return
+        return 0
 
     # Create the output directory if it doesn't exist
     if not os.path.exists(output_dir):
@@ -23,58 +42,339 @@ def extract_frames(video_path, output_dir="frames", frame_interval=30):
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print("Error: Could not open the video file.")
-        return
+        return 0
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if interval_ms is not None and fps > 0:
+        # Convert the time interval to a (possibly fractional) number of frames
+        step = max(interval_ms * fps / 1000.0, 1.0)
+    elif interval_ms is not None:
+        print("Warning: Video FPS unknown, falling back to frame_interval.")
+        step = float(frame_interval)
+    else:
+        step = float(frame_interval)
+
+    # Frames already in the directory are compared with, so new ones are numbered after them
+    first_index = 0
+    if dedup is not None:
+        from frame_dedup import next_file_index
+
+        dedup.index_directory(output_dir)
+        first_index = next_file_index(output_dir, "frame")
 
     frame_count = 0
     saved_count = 0
+    duplicate_count = 0
+    next_frame = 0.0
+    pending_writes = deque()
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("End of video or error reading frame.")
-            break
+    with ThreadPoolExecutor(max_workers=write_workers) as executor:
+        while True:
+            target = int(round(next_frame))
+            if seek and target - frame_count > 1:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                frame_count = target
+
+            # Grab without decoding until the next frame to save
+            if not cap.grab():
+                print("End of video or error reading frame.")
+                break
+
+            if frame_count >= target:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    print("End of video or error reading frame.")
+                    break
 
-        if frame_count % frame_interval == 0:
-            frame_path = os.path.join(output_dir, f"frame_{saved_count}.jpg")
-            cv2.imwrite(frame_path, frame)
-            print(f"Frame saved: {frame_path}")
-            saved_count += 1
+                next_frame += step
+                if dedup is not None and not dedup.add_if_new(frame, output_dir):
+                    duplicate_count += 1
+                    frame_count += 1
+                    continue
 
-        frame_count += 1
+                frame_path = os.path.join(output_dir, f"frame_{first_index + saved_count}.jpg")
+                pending_writes.append(executor.submit(cv2.imwrite, frame_path, frame))
+                if verbose:
+                    print(f"Frame saved: {frame_path}")
+                saved_count += 1
+
+                # Bound the number of frames waiting to be written
+                while len(pending_writes) > 2 * write_workers:
+                    pending_writes.popleft().result()
+
+            frame_count += 1
+
+        for write in pending_writes:
+            write.result()
 
     cap.release()
+    if dedup is not None:
+        print(f"Skipped {duplicate_count} near-duplicate frames.")
     print(f"Extraction complete. Total frames saved: {saved_count}")
+    return saved_count
+
+def _extract_frames_task(args):
+    """Runs extract_frames for one video inside a worker process."""
+    video_path, output_dir, kwargs = args
+    return video_path, extract_frames(video_path, output_dir, **kwargs)
+
+def extract_frames_batch(video_paths, output_root="frames", num_workers=None, input_root=None, **kwargs):
+    """
+    Extracts frames from many videos in parallel, one worker process per video at a time.
+
+    Args:
+        video_paths (list): Paths to the input video files.
+        output_root (str): Frames of each video are saved in output_root/<path of the video
+            relative to input_root, without extension>, so videos with the same name in
+            different label or split directories do not overwrite each other.
+        num_workers (int): Number of worker processes (default: number of CPUs).
+        input_root (str): Directory the video paths are made relative to (default: the
+            deepest directory containing all the videos).
+        **kwargs: Passed on to extract_frames (frame_interval, interval_ms, seek, ...).
+
+    Returns:
+        dict: Number of frames saved for each video path.
+    """
+    if not video_paths:
+        return {}
+
+    kwargs.setdefault("verbose", False)
+    if input_root is None:
+        input_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in video_paths])
+    tasks = [
+        (video_path,
+         os.path.join(output_root, os.path.splitext(os.path.relpath(os.path.abspath(video_path), input_root))[0]),
+         kwargs)
+        for video_path in video_paths
+    ]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        results = dict(executor.map(_extract_frames_task, tasks))
+
+    print(f"Batch extraction complete. {sum(results.values())} frames saved from {len(results)} videos.")
+    return results
+
+# JPEG markers that carry the frame size (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _exif_orientation(segment):
+    """Returns the EXIF orientation (1-8) stored in an APP1 segment, or 1 if there is none."""
+    if not segment.startswith(b"Exif\x00\x00") or len(segment) < 14:
+        return 1
+
+    tiff = segment[6:]
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return 1
+
+    ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    if ifd_offset + 2 > len(tiff):
+        return 1
+    entry_count = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(entry_count):
+        entry = tiff[ifd_offset + 2 + 12 * i:ifd_offset + 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        tag, _, _ = struct.unpack(endian + "HHI", entry[:8])
+        if tag == 0x0112:
+            return struct.unpack(endian + "H", entry[8:10])[0]
+    return 1
+
+def jpeg_size(path):
+    """
+    Reads the size of a JPEG image from its header without decoding it.
+
+    The size is the one cv2.imread returns, so width and height are swapped when the EXIF
+    orientation rotates the image by 90 degrees.
+
+    Args:
+        path (str): Path to the image.
+
+    Returns:
+        tuple: (width, height), or None if the file is not a readable JPEG.
+    """
+    orientation = 1
+    with open(path, "rb") as image_file:
+        if image_file.read(2) != b"\xff\xd8":
+            return None
+
+        while True:
+            byte = image_file.read(1)
+            while byte and byte != b"\xff":
+                byte = image_file.read(1)
+            while byte == b"\xff":
+                byte = image_file.read(1)
+            if not byte:
+                return None
+
+            marker = byte[0]
+            if marker in _JPEG_SOF_MARKERS:
+                header = image_file.read(7)
+                if len(header) < 7:
+                    return None
+                height, width = struct.unpack(">HH", header[3:7])
+                # Orientations 5 to 8 transpose the image
+                return (height, width) if orientation >= 5 else (width, height)
+
+            # Markers without a length field
+            if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+                continue
+
+            length_bytes = image_file.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0] - 2
+            if marker == 0xE1:
+                orientation = _exif_orientation(image_file.read(length)) if orientation == 1 else orientation
+            else:
+                image_file.seek(length, os.SEEK_CUR)
+
+def reduced_read_flag(path, size):
+    """
+    Picks the cv2.imread flag that decodes an image at the smallest scale still at least as
+    large as the target size. JPEG decoders can skip most of the work at 1/2, 1/4 or 1/8 scale.
+
+    Args:
+        path (str): Path to the image.
+        size (tuple): Target size (width, height).
+
+    Returns:
+        int: The imread flag to use.
+    """
+    if os.path.splitext(path)[1].lower() not in (".jpg", ".jpeg"):
+        return cv2.IMREAD_COLOR
+
+    source_size = jpeg_size(path)
+    if source_size is None:
+        return cv2.IMREAD_COLOR
+
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if source_size[0] // factor >= size[0] and source_size[1] // factor >= size[1]:
+            return flag
+    return cv2.IMREAD_COLOR
+
+def _resize_one(input_path, output_path, size, incremental, array, row, previous_row=None):
+    """
+    Reads, resizes and writes one image, optionally storing it in a row of the output array.
 
-def resize_frames(input_dir, output_dir="resized_frames", size=(224, 224)):
+    The row of a skipped image is copied from the previous array when it has one, and otherwise
+    rebuilt from the source image, never from the lossy output JPEG. This keeps the array of an
+    incremental run identical to the one of a fresh run.
+
+    Returns:
+        str: "resized", "skipped" or "failed".
+    """
+    skip = incremental and os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    if skip and array is None:
+        return "skipped"
+    if skip and previous_row is not None:
+        array[row] = previous_row
+        return "skipped"
+
+    img = cv2.imread(input_path, reduced_read_flag(input_path, size))
+    if img is None:
+        return "failed"
+
+    resized_img = cv2.resize(img, size)
+    if not skip:
+        cv2.imwrite(output_path, resized_img)
+    if array is not None:
+        array[row] = resized_img
+    return "skipped" if skip else "resized"
+
+def _load_previous_rows(array_path, names_path, size):
+    """
+    Maps the file names of an array saved by an earlier resize_frames run to their rows.
+
+    Returns:
+        dict: File name to memory-mapped row, empty if there is no usable previous array.
+    """
+    if not os.path.exists(array_path) or not os.path.exists(names_path):
+        return {}
+
+    try:
+        previous = np.load(array_path, mmap_mode="r")
+        with open(names_path, "r") as names_file:
+            names = names_file.read().split("\n")
+    except (OSError, ValueError):
+        return {}
+
+    if previous.shape[1:] != (size[1], size[0], 3) or len(names) != len(previous):
+        return {}
+    return dict(zip(names, previous))
+
+def resize_frames(input_dir, output_dir="resized_frames", size=(224, 224), num_workers=4, incremental=True,
+                  array_path=None, verbose=False):
     """
     Resizes all images in a directory to the specified size.
 
+    Images are read, resized and written on a thread pool. JPEGs much larger than the target
+    are decoded at a reduced scale.
+
     Args:
         input_dir (str): Directory containing input frames.
         output_dir (str): Directory where resized frames will be saved.
         size (tuple): Desired size (width, height) for the resized images.
+        num_workers (int): Number of threads processing images.
+        incremental (bool): If True, images whose output is already newer than the input are skipped.
+        array_path (str): If set, all resized images are also stored in one contiguous uint8
+            .npy array of shape (count, height, width, 3), in sorted file name order. The file
+            names of the rows are written next to it with a .txt extension. Rows of skipped
+            images are reused from the previous array at that path, or rebuilt from their source
+            image; rows of unreadable images are left black.
+        verbose (bool): If True, print every resized image.
+
+    Returns:
+        dict: Number of images resized, skipped and failed.
     """
     if not os.path.exists(input_dir):
         print(f"Error: Input directory not found at {input_dir}")
-        return
+        return None
 
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
 
-    for filename in os.listdir(input_dir):
-        input_path = os.path.join(input_dir, filename)
-        output_path = os.path.join(output_dir, filename)
+    filenames = sorted(f for f in os.listdir(input_dir) if os.path.isfile(os.path.join(input_dir, f)))
 
-        if os.path.isfile(input_path):
-            img = cv2.imread(input_path)
-            if img is None:
-                print(f"Warning: Could not read {input_path}")
-                continue
+    array = None
+    previous_rows = {}
+    names_path = None
+    if array_path is not None:
+        names_path = os.path.splitext(array_path)[0] + ".txt"
+        if incremental:
+            previous_rows = _load_previous_rows(array_path, names_path, size)
+        # Written next to the previous array, which is still read from, and renamed at the end
+        array = np.lib.format.open_memmap(f"{array_path}.tmp", mode="w+", dtype=np.uint8,
+                                          shape=(len(filenames), size[1], size[0], 3))
+
+    counts = {"resized": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(_resize_one, os.path.join(input_dir, filename), os.path.join(output_dir, filename),
+                            size, incremental, array, row, previous_rows.get(filename))
+            for row, filename in enumerate(filenames)
+        ]
+        for filename, future in zip(filenames, futures):
+            status = future.result()
+            counts[status] += 1
+            if status == "failed":
+                print(f"Warning: Could not read {os.path.join(input_dir, filename)}")
+            elif verbose and status == "resized":
+                print(f"Resized image saved: {os.path.join(output_dir, filename)}")
+
+    if array is not None:
+        array.flush()
+        del array
+        previous_rows.clear()
+        os.replace(f"{array_path}.tmp", array_path)
+        with open(names_path, "w") as names_file:
+            names_file.write("\n".join(filenames))
+        print(f"Resized array saved: {array_path}")
 
-            resized_img = cv2.resize(img, size)
-            cv2.imwrite(output_path, resized_img)
-            print(f"Resized image saved: {output_path}")
+    print(f"Resizing complete. {counts['resized']} resized, {counts['skipped']} up to date, {counts['failed']} failed.")
+    return counts
 
 if __name__ == "__main__":
     # Example usage: